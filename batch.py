@@ -0,0 +1,281 @@
+"""
+Headless batch mode: parse many logs on a process pool and write their graphs and summaries.
+
+    python batch.py <log, glob or directory>... [-o OUTPUT_DIR] [--workers N]
+                    [--max-memory-mb MB] [--tasks-per-worker N] [--pattern *.log] [--cache]
+                    [--export parquet|arrow]
+
+Compressed logs (.gz, .zst) and the members of .zip archives are read without unpacking them.
+For every log, <name>_graph.html and <name>_summary.json are written to the output directory,
+and batch_summary.json lists all the summaries. The summaries hold the session KPIs of their log
+(see session_kpis.py) and fleet_kpis.json their percentiles across every log. --export also
+streams the events of every log, while it is parsed, to <name>_events.parquet (or .arrow), which
+can be queried together, e.g. with DuckDB:
+SELECT log, count(*) FROM 'OUTPUT_DIR/*_events.parquet' WHERE status = 'disconnected' GROUP BY log.
+No browser is opened. A log that fails, runs out of memory or crashes its worker only gets an
+error summary; the rest of the batch goes on.
+The exit code is 1 when any log failed.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+
+from event_export import EXPORT_SUFFIXES, EventExporter, check_export_format
+from event_store import KIND_EVENT
+from flow_validator import check_flow_validity, flow_violations
+from log_parser import flow_rules, parse_log
+from log_reader import COMPRESSED_SUFFIXES, MEMBER_SEPARATOR, archive_members, log_base_name
+from profiler import peak_rss_mb
+from result_cache import parse_log_cached
+from session_kpis import FleetKpis, log_kpis
+from timeline import create_timeline
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PATTERN = '*.log'
+
+
+def find_logs(inputs, pattern=DEFAULT_PATTERN):
+    """
+    Expand files, globs and directories (searched recursively for pattern) into a sorted list of
+    logs. Compressed copies of matching logs (e.g. wifi.log.gz) are included, and every .zip
+    found is opened up into its members that match pattern.
+    """
+    file_paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for name_pattern in [pattern] + [pattern + suffix for suffix in COMPRESSED_SUFFIXES] + ['*.zip']:
+                file_paths.update(glob.glob(os.path.join(item, '**', name_pattern), recursive=True))
+        elif os.path.isfile(item) or MEMBER_SEPARATOR in item:
+            file_paths.add(item)
+        else:
+            file_paths.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+
+    log_paths = set()
+    for file_path in file_paths:
+        file_path = os.path.abspath(file_path)
+        if file_path.lower().endswith('.zip'):
+            log_paths.update(file_path + MEMBER_SEPARATOR + member for member in archive_members(file_path, pattern))
+        else:
+            log_paths.add(file_path)
+    return sorted(log_paths)
+
+
+def output_names(log_paths):
+    """A unique output base name per log: the file name, numbered when two logs share one."""
+    names = {}
+    used = set()
+    for log_path in log_paths:
+        base_name = log_base_name(log_path)
+        name, n = base_name, 1
+        while name in used:
+            n += 1
+            name = f"{base_name}_{n}"
+        used.add(name)
+        names[log_path] = name
+    return names
+
+
+def limit_memory(max_memory_mb):
+    """Pool initializer: cap the worker's address space, so a huge log fails with MemoryError."""
+    if max_memory_mb and resource is not None:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def event_counts(event_store):
+    """Count the events per status and the info events per name."""
+    kinds = event_store.column("kind")
+    events = kinds == KIND_EVENT
+    statuses = np.bincount(event_store.column("status")[events], minlength=len(event_store.statuses.values))
+    names = event_store.column("name")[events]
+    names = np.bincount(names[names >= 0], minlength=len(event_store.names.values))
+    return (
+        {status: int(count) for status, count in zip(event_store.statuses.values, statuses) if count},
+        {name: int(count) for name, count in zip(event_store.names.values, names) if count},
+    )
+
+
+def process_log(log_path, output_dir, name, use_cache=False, compress=False, export_format=None):
+    """Parse one log, write its graph and return its summary dict. Never raises."""
+    summary = {"log": log_path, "name": name, "status": "ok"}
+    start = time.perf_counter()
+    export_path = exporter = None
+    try:
+        if export_format is not None:
+            export_path = os.path.join(output_dir, f"{name}_events{EXPORT_SUFFIXES[export_format]}")
+            exporter = EventExporter(export_path, name, export_format)
+
+        # The events are exported a row group at a time during the parse; after a cache hit, by close.
+        # Every log is parsed once, so no line index sidecar is written next to it.
+        def parse(log_path, start_line, end_line):
+            return parse_log(log_path, start_line, end_line, use_index=False, exporter=exporter)
+
+        if use_cache:
+            event_store, mac_registry, last_log_timestamp = parse_log_cached(log_path, 0, None, parse)
+        else:
+            event_store, mac_registry, last_log_timestamp = parse(log_path, 0, None)
+        parsed = time.perf_counter()
+
+        graph_path = os.path.join(output_dir, f"{name}_graph.html")
+        # The graphs share one plotly.js next to them, so the output directory can be moved as a whole
+        create_timeline(event_store, mac_registry, last_log_timestamp, graph_path, auto_open=False,
+                        plotlyjs='directory', compress=compress)
+        drawn = time.perf_counter()
+
+        if exporter is not None:
+            exporter.close(event_store)
+            exporter = None
+        exported = time.perf_counter()
+
+        kpis = log_kpis(event_store)
+        analyzed = time.perf_counter()
+
+        status_counts, info_counts = event_counts(event_store)
+        summary.update({
+            "graph": graph_path,
+            "events": export_path,
+            "encoding": event_store.encoding,
+            "event_count": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "info_counts": info_counts,
+            "mac_count": len(mac_registry),
+            "last_log_timestamp": last_log_timestamp.isoformat() if last_log_timestamp else None,
+            "invalid_flow": check_flow_validity(event_store),
+            "flow_violations": [{"timestamp": timestamp.isoformat() if timestamp else None, "line": line_number,
+                                 "rule": rule_id}
+                                for timestamp, line_number, rule_id in flow_violations(event_store, flow_rules)],
+            **kpis,
+            "timings": {"parse": round(parsed - start, 3), "timeline": round(drawn - parsed, 3),
+                        "export": round(exported - drawn, 3), "kpis": round(analyzed - exported, 3)},
+        })
+    except MemoryError:
+        summary.update({"status": "error", "error": "out of memory"})
+    except Exception as error:
+        summary.update({"status": "error", "error": f"{type(error).__name__}: {error}",
+                        "traceback": traceback.format_exc()})
+    finally:
+        if exporter is not None:
+            # Not closed, so the parse or the timeline failed: no partial export is left behind
+            exporter.abort()
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    summary["peak_rss_mb"] = peak_rss_mb()
+    write_summary(output_dir, summary)
+    return summary
+
+
+def write_summary(output_dir, summary):
+    with open(os.path.join(output_dir, f"{summary['name']}_summary.json"), 'w') as file:
+        json.dump(summary, file, indent=2)
+
+
+def _run_pool(log_paths, names, output_dir, workers, max_memory_mb, tasks_per_worker, use_cache, compress,
+              export_format, report):
+    """Run a pool over log_paths and return the logs whose worker died before reporting."""
+    crashed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_memory, initargs=(max_memory_mb,),
+                             max_tasks_per_child=tasks_per_worker) as executor:
+        futures = {executor.submit(process_log, log_path, output_dir, names[log_path], use_cache, compress,
+                                   export_format): log_path
+                   for log_path in log_paths}
+        for future in as_completed(futures):
+            try:
+                report(future.result())
+            except BrokenProcessPool:
+                crashed.append(futures[future])
+    return crashed
+
+
+def run_batch(log_paths, output_dir, workers=None, max_memory_mb=None, tasks_per_worker=1, use_cache=False,
+              report=None, compress=False, export_format=None, fleet=None):
+    """
+    Process every log on a pool of workers and return the summaries in log order.
+
+    With a FleetKpis as fleet, the KPI histograms of every log are added to it as the log is
+    done and then dropped from the summary kept in memory (its JSON file still has them).
+
+    Workers are recycled every tasks_per_worker logs, so memory does not pile up across logs.
+    A worker that dies (e.g. killed by the OS) breaks the whole pool, so the logs that were
+    still in flight are retried one at a time to find the one that crashed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(log_paths)
+    summaries = {}
+
+    def collect(summary):
+        if fleet is not None and summary["status"] == "ok":
+            fleet.add(summary)
+            del summary["kpi_histograms"]
+        summaries[summary["log"]] = summary
+        if report is not None:
+            report(summary)
+
+    crashed = _run_pool(log_paths, names, output_dir, workers, max_memory_mb, tasks_per_worker, use_cache, compress,
+                        export_format, collect)
+    for log_path in crashed:
+        if _run_pool([log_path], names, output_dir, 1, max_memory_mb, 1, use_cache, compress, export_format,
+                     collect):
+            summary = {"log": log_path, "name": names[log_path], "status": "error", "error": "worker crashed",
+                       "seconds": None, "peak_rss_mb": None}
+            write_summary(output_dir, summary)
+            collect(summary)
+
+    return [summaries[log_path] for log_path in log_paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw the connectivity timeline of many logs without a browser.")
+    parser.add_argument('inputs', nargs='+', help="log files, globs or directories")
+    parser.add_argument('-o', '--output-dir', default='grapholog_output')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN, help="file name pattern searched for in directories")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--max-memory-mb', type=int, default=None, help="address space limit per worker")
+    parser.add_argument('--tasks-per-worker', type=int, default=1, help="logs a worker handles before it is replaced")
+    parser.add_argument('--cache', action='store_true', help="use the on-disk parse result cache")
+    parser.add_argument('--gzip', action='store_true', help="compress the figure data inside the graphs")
+    parser.add_argument('--export', choices=('parquet', 'arrow'), default=None,
+                        help="also write the events of every log to <name>_events.parquet or .arrow")
+    args = parser.parse_args(argv)
+    if args.export is not None:
+        try:
+            check_export_format(args.export)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+
+    log_paths = find_logs(args.inputs, args.pattern)
+    if not log_paths:
+        print("No logs found", file=sys.stderr)
+        return 1
+
+    def report(summary):
+        detail = f"{summary['seconds']:.1f}s" if summary["status"] == "ok" else summary["error"]
+        print(f"[{summary['status']}] {summary['log']} ({detail})", file=sys.stderr)
+
+    fleet = FleetKpis()
+    summaries = run_batch(log_paths, args.output_dir, args.workers, args.max_memory_mb, args.tasks_per_worker,
+                          args.cache, report, args.gzip, args.export, fleet)
+    with open(os.path.join(args.output_dir, 'batch_summary.json'), 'w') as file:
+        json.dump(summaries, file, indent=2)
+    with open(os.path.join(args.output_dir, 'fleet_kpis.json'), 'w') as file:
+        json.dump(fleet.summary(), file, indent=2)
+
+    failed = sum(summary["status"] != "ok" for summary in summaries)
+    print(f"{len(summaries) - failed} of {len(summaries)} logs processed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Time every stage of drawing a log, at several log sizes, and write the results to JSON.
+
+For each size a synthetic log is generated (see log_generator.py; logs are kept in --log-dir
+and reused by later runs) and processed in a fresh worker process, stage by stage:
+encoding detection, line reading, parsing (reading plus pattern matching), timeline building
+and HTML writing. Each stage records its wall time and the peak RSS of the worker so far.
+Pass --compare with an earlier results file to print the per-stage change.
+
+    python benchmarks/benchmark_suite.py [--sizes 10 100 1024] [--density 0.05] [--macs 8]
+                                         [--log-dir DIR] [-o results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import event_counts
+from log_generator import DEFAULT_EVENT_DENSITY, DEFAULT_MAC_COUNT, generate_log
+from log_parser import parse_log
+from log_reader import _detect_encoding_cached, detect_encoding, iter_log_lines
+from profiler import peak_rss_mb
+from html_output import write_timeline_html
+from timeline import TimelineBuilder
+
+DEFAULT_SIZES_MB = (10, 100, 1024)
+STAGES = ("detect_encoding", "read_lines", "parse", "build_timeline", "write_html")
+
+
+def log_for_size(log_dir, size_mb, event_density, mac_count):
+    """The generated log for these settings, written only if an earlier run did not leave it."""
+    log_path = os.path.join(log_dir, f"synthetic_{size_mb}mb_d{event_density}_m{mac_count}.log")
+    if not os.path.exists(log_path):
+        os.makedirs(log_dir, exist_ok=True)
+        temp_path = log_path + ".tmp"
+        generate_log(temp_path, size_mb, event_density, mac_count)
+        os.replace(temp_path, log_path)
+    return log_path
+
+
+def run_stages(log_path):
+    """Run every stage on log_path in this process and return the measurements."""
+    timings = {}
+    last = time.perf_counter()
+
+    def done(stage):
+        nonlocal last
+        now = time.perf_counter()
+        timings[stage] = {"seconds": round(now - last, 3), "peak_rss_mb": peak_rss_mb()}
+        last = time.perf_counter()
+
+    _detect_encoding_cached.cache_clear()
+    encoding = detect_encoding(log_path).encoding
+    done("detect_encoding")
+
+    line_count = 0
+    for _ in iter_log_lines(log_path, encoding):
+        line_count += 1
+    done("read_lines")
+
+    event_store, mac_registry, last_log_timestamp = parse_log(log_path, use_index=False)
+    done("parse")
+
+    builder = TimelineBuilder()
+    builder.add_events(event_store)
+    fig = builder.figure(mac_registry, "WiFi Connectivity Timeline")
+    done("build_timeline")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_path = os.path.join(tmp_dir, "graph.html")
+        write_timeline_html(fig, html_path)
+        html_bytes = os.path.getsize(html_path)
+    done("write_html")
+
+    status_counts, _ = event_counts(event_store)
+    return {
+        "bytes": os.path.getsize(log_path),
+        "lines": line_count,
+        "events": sum(status_counts.values()),
+        "macs": len(mac_registry),
+        "html_bytes": html_bytes,
+        "stages": timings,
+        "total_seconds": round(sum(stage["seconds"] for stage in timings.values()), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """Print each stage's time against the same size in an earlier results file."""
+    previous_runs = {run["size_mb"]: run for run in previous["runs"]}
+    print(f"{'size_mb':>8} {'stage':>16} {'before':>9} {'after':>9} {'change':>8}")
+    for run in results["runs"]:
+        before = previous_runs.get(run["size_mb"])
+        if before is None:
+            continue
+        for stage in STAGES:
+            old, new = before["stages"][stage]["seconds"], run["stages"][stage]["seconds"]
+            change = f"{(new - old) / old * 100:+.0f}%" if old else ""
+            print(f"{run['size_mb']:>8} {stage:>16} {old:>9.3f} {new:>9.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of drawing a log.")
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES_MB, help="log sizes in MB")
+    parser.add_argument('--density', type=float, default=DEFAULT_EVENT_DENSITY, help="share of event lines")
+    parser.add_argument('--macs', type=int, default=DEFAULT_MAC_COUNT, help="number of BSSIDs")
+    parser.add_argument('--log-dir', default=os.path.join(tempfile.gettempdir(), 'grapholog_benchmark'))
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="an earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "date": datetime.now().isoformat(timespec='seconds'),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "event_density": args.density,
+        "mac_count": args.macs,
+        "runs": [],
+    }
+    for size_mb in args.sizes:
+        size_mb = int(size_mb) if size_mb == int(size_mb) else size_mb
+        log_path = log_for_size(args.log_dir, size_mb, args.density, args.macs)
+        # A fresh process per size, so the peak RSS of one size does not carry into the next
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            run = {"size_mb": size_mb, **executor.submit(run_stages, log_path).result()}
+        results["runs"].append(run)
+        stages = " ".join(f"{stage}={run['stages'][stage]['seconds']:.2f}s" for stage in STAGES)
+        print(f"{size_mb} MB: {stages} peak_rss={run['stages']['write_html']['peak_rss_mb']} MB")
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
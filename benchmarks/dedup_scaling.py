@@ -0,0 +1,54 @@
+"""
+Show that parse_log time grows linearly with the number of connectivity events.
+
+Writes logs where every line is a connectivity event, doubling the event count each step,
+and prints the time per event, which should stay flat as the count grows.
+
+    python benchmarks/dedup_scaling.py [max_events]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_parser import parse_log
+
+EVENT_LINES = [
+    "[core ] [ATTEMPT_TO_CONNECT] bssid AA:BB:CC:DD:EE:01 Rssi:-55",
+    "[mlme ] AUTH_REQ - sent to: AA:BB:CC:DD:EE:01",
+    "[mlme ] AUTH_RSP - received  from: AA:BB:CC:DD:EE:01",
+    "[wdi  ] WDI_IND_ASSOC_RESULT - WDI_ASSOC_STATUS_SUCCESS",
+    "[core ] ENCRYPTION READY!!! - For control flows only",
+    "[core ] CORE_INDICATION_DISASSOCIATION reason 3",
+]
+
+
+def write_event_log(path, event_count):
+    timestamp = datetime(2024, 1, 1)
+    with open(path, 'w') as file:
+        for i in range(event_count):
+            timestamp += timedelta(milliseconds=7)
+            text = timestamp.strftime("%m/%d/%Y-%H:%M:%S.") + f"{timestamp.microsecond // 1000:03d}"
+            file.write(f"{text} {EVENT_LINES[i % len(EVENT_LINES)]}\n")
+
+
+def main():
+    max_events = int(sys.argv[1]) if len(sys.argv) > 1 else 320000
+    event_count = 10000
+    print(f"{'events':>10} {'seconds':>10} {'us/event':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        while event_count <= max_events:
+            log_path = os.path.join(tmp_dir, f"events_{event_count}.log")
+            write_event_log(log_path, event_count)
+            start = time.perf_counter()
+            parse_log(log_path, 0, None, use_index=False)
+            elapsed = time.perf_counter() - start
+            print(f"{event_count:>10} {elapsed:>10.3f} {elapsed / event_count * 1e6:>10.2f}")
+            event_count *= 2
+
+
+if __name__ == "__main__":
+    main()
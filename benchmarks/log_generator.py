@@ -0,0 +1,169 @@
+"""
+Write synthetic driver logs that exercise every line format the parser knows.
+
+Lines use the layouts patterns.json and pattern_matcher.py match on: the timestamp prefix,
+BEACON_RX, AP_SELECTION best candidates, BSS/LINK table rows, ATTEMPT_TO_CONNECT with Rssi,
+auth/assoc/encryption, link switches, deauths, suspend/resume and the info events, strung
+together as connect/disconnect sessions over a set of BSSIDs and padded with noise lines.
+
+    python benchmarks/log_generator.py <output.log> <size_mb> [--density 0.05] [--macs 8] [--seed 0]
+"""
+import argparse
+import random
+from datetime import datetime
+
+START = datetime(2024, 3, 5, 8, 0, 0)
+MS_PER_DAY = 86400000
+
+# Share of lines that match a pattern; the rest is noise
+DEFAULT_EVENT_DENSITY = 0.05
+DEFAULT_MAC_COUNT = 8
+
+NOISE_LINES = [
+    "[misc ] tx queue {n} depth {m} credits {k}",
+    "[scan ] scan request id {n} channels {m} dwell {k}ms",
+    "[pwr  ] power table update {n} limit {m} dBm",
+    "[rate ] rate scale: lq {n} mcs {m} nss 2 bw 80 success {k}%",
+    "[misc ] dbg counters rx {n} tx {m} retries {k}",
+]
+# Continuation lines of multi-line dumps carry no timestamp
+UNTIMED_LINE = "    dump: {n:08x} {m:08x} {k:08x} 00000000"
+
+INFO_LINES = [
+    "[bcn  ] Consecutive missed beacons  (9)",
+    "[mlme ] Found channel switch announcement on channel {channel}",
+    "[roam ] indicating roaming needed, rssi -{rssi}",
+    "[sta  ] MisbehavingAP:5 counter reached",
+    "[sta  ] PoorlyDisc:25 threshold reached",
+]
+
+
+def format_timestamp(epoch_ms):
+    day, ms = divmod(epoch_ms, MS_PER_DAY)
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    date = datetime.fromordinal(START.toordinal() + day)
+    return f"{date:%m/%d/%Y}-{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+class LogGenerator:
+    """
+    Emits whole sessions of event lines (scan, select, connect, traffic, disconnect) and pads
+    every event line with noise lines so that about event_density of all lines are events.
+    """
+
+    def __init__(self, file, event_density=DEFAULT_EVENT_DENSITY, mac_count=DEFAULT_MAC_COUNT, seed=0):
+        self.file = file
+        self.random = random.Random(seed)
+        self.macs = [f"AC:12:03:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}" for i in range(mac_count)]
+        self.ssids = {mac: f"Corp-{i % 3}" for i, mac in enumerate(self.macs)}
+        self.channels = {mac: self.random.choice((1, 6, 11, 36, 44, 149)) for mac in self.macs}
+        self.noise_per_event = (1 - event_density) / event_density
+        self.clock = START.hour * 3600000
+        self.bytes_written = 0
+        self.lines_written = 0
+
+    def _write(self, text, timed=True):
+        if timed:
+            text = f"{format_timestamp(self.clock)} {text}"
+        text += "\n"
+        self.file.write(text)
+        self.bytes_written += len(text)
+        self.lines_written += 1
+
+    def _noise(self):
+        rng = self.random
+        for _ in range(int(rng.expovariate(1 / self.noise_per_event)) if self.noise_per_event else 0):
+            self.clock += rng.randint(0, 40)
+            n, m, k = rng.randint(0, 99999), rng.randint(0, 9999), rng.randint(0, 99)
+            if rng.random() < 0.03:
+                self._write(UNTIMED_LINE.format(n=n, m=m, k=k), timed=False)
+            else:
+                self._write(rng.choice(NOISE_LINES).format(n=n, m=m, k=k))
+
+    def event(self, text):
+        self.clock += self.random.randint(1, 200)
+        self._write(text)
+        self._noise()
+
+    def beacon(self, mac):
+        band = "2.4GHz" if self.channels[mac] < 14 else "5.2GHz"
+        self.event(f'[scan ] BEACON_RX - {mac}, channel {self.channels[mac]} , band {band}, '
+                   f'RSSI -{self.random.randint(35, 85)}, seq {self.random.randint(0, 4095)}  "{self.ssids[mac]}"')
+
+    def session(self):
+        rng = self.random
+        for mac in rng.sample(self.macs, min(3, len(self.macs))):
+            self.beacon(mac)
+        mac = rng.choice(self.macs)
+        rssi = rng.randint(35, 85)
+        self.event(f"[core ] [AP_SELECTION] [S] [{rng.randint(1, 99)}] [prvhApSelectionPrintBestCandidate] [BC 0]: "
+                   f"grade:{rng.randint(50, 250)} band:{1 if self.channels[mac] < 14 else 2}, "
+                   f"channel:{self.channels[mac]}, BW:80MHz, mode:<NULL>, RSSI:-{rssi}, tput:{rng.randint(50, 900)} "
+                   f"Address({mac})")
+        self.event(f"[core ] [ATTEMPT_TO_CONNECT] bssid {mac} Rssi:-{rssi}")
+        self.event(f"[mlme ] AUTH_REQ - sent to: {mac}")
+        self.event(f"[mlme ] AUTH_RSP - received  from: {mac}")
+        if rng.random() < 0.05:
+            self.event("[wdi  ] WDI_IND_ASSOC_RESULT - WDI_ASSOC_STATUS_ASSOC_REJECTED")
+            return
+        self.event("[wdi  ] WDI_IND_ASSOC_RESULT - WDI_ASSOC_STATUS_SUCCESS")
+        self.event(f"| {rng.randint(0, 9)} | 1 | 0 | BSS | LINK | Address({mac})")
+        self.event("[core ] ENCRYPTION READY!!! - For control flows only")
+
+        for _ in range(rng.randint(0, 6)):
+            choice = rng.random()
+            if choice < 0.5:
+                self.event(rng.choice(INFO_LINES).format(channel=self.channels[mac], rssi=rng.randint(60, 90)))
+            elif choice < 0.7:
+                self.event("[link ] Link switching from band 2 to band 5")
+                self.event("[link ] Roam Completed - Link switched to band 5")
+                self.event("[roam ] INDICATION_ROAM_COMPLETE")
+            elif choice < 0.85:
+                self.event("[pm   ] SUSPEND FLOW FINISHED")
+                self.clock += rng.randint(1000, 600000)
+                self.event("[pm   ] RESUME FLOW FINISHED")
+            elif choice < 0.9:
+                self.event("[fw   ] FATAL_ERROR: uCode ASSERT 0x1234")
+                self.event("[fw   ] uCode is alive")
+            else:
+                self.beacon(mac)
+
+        choice = rng.random()
+        if choice < 0.6:
+            self.event("[core ] CORE_INDICATION_DISASSOCIATION reason 3")
+        elif choice < 0.75:
+            self.event(f"[mlme ] DEAUTH_REQ - sent to: {mac}")
+            self.event("[core ] CORE_INDICATION_DISASSOCIATION reason 3")
+        elif choice < 0.9:
+            self.event(f"[mlme ] DEAUTH - received from {mac}")
+            self.event("[core ] CORE_INDICATION_DISASSOCIATION reason 7")
+        else:
+            self.event("[core ] CONNECTION FAILED")
+
+
+def generate_log(path, size_mb, event_density=DEFAULT_EVENT_DENSITY, mac_count=DEFAULT_MAC_COUNT, seed=0):
+    """Write a log of about size_mb MB (whole sessions, so slightly more) and return its line count."""
+    size = int(size_mb * 1024 * 1024)
+    with open(path, 'w', encoding='ascii', newline='\n') as file:
+        generator = LogGenerator(file, event_density, mac_count, seed)
+        while generator.bytes_written < size:
+            generator.session()
+    return generator.lines_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic driver log.")
+    parser.add_argument('output')
+    parser.add_argument('size_mb', type=float)
+    parser.add_argument('--density', type=float, default=DEFAULT_EVENT_DENSITY, help="share of event lines")
+    parser.add_argument('--macs', type=int, default=DEFAULT_MAC_COUNT, help="number of BSSIDs")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    lines = generate_log(args.output, args.size_mb, args.density, args.macs, args.seed)
+    print(f"{args.output}: {lines} lines")
+
+
+if __name__ == "__main__":
+    main()
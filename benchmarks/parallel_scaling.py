@@ -0,0 +1,64 @@
+"""
+Show how parse_log_parallel scales with the number of worker processes.
+
+Parses the same log serially and then in parallel with 1, 2, 4, ... workers up to the core
+count, checks that every parallel result matches the serial one and prints the speedup.
+Without a log path a synthetic log of the given size (in MB) is written first.
+
+    python benchmarks/parallel_scaling.py [log_path | size_mb] [chunk_size_mb]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_scaling import write_event_log
+from log_parser import parse_log
+from parallel_parser import parse_log_parallel
+
+# One "event line" from dedup_scaling is about 80 bytes
+BYTES_PER_EVENT_LINE = 80
+
+
+def same_result(serial, parallel):
+    serial_store, serial_registry, serial_last = serial
+    parallel_store, parallel_registry, parallel_last = parallel
+    return (serial_last == parallel_last
+            and serial_registry.mac_addresses == parallel_registry.mac_addresses
+            and serial_registry.mac_info == parallel_registry.mac_info
+            and all((serial_store.column(name) == parallel_store.column(name)).all()
+                    for name in ("kind", "timestamp_ms", "rssi", "line_number", "byte_offset")))
+
+
+def run(log_path, chunk_size):
+    start = time.perf_counter()
+    serial = parse_log(log_path, 0, None, use_index=False)
+    serial_time = time.perf_counter() - start
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8} {'same':>6}")
+    print(f"{'serial':>8} {serial_time:>10.3f} {1.0:>8.2f} {'':>6}")
+
+    workers = 1
+    while workers <= max(os.cpu_count(), 1):
+        start = time.perf_counter()
+        parallel = parse_log_parallel(log_path, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {elapsed:>10.3f} {serial_time / elapsed:>8.2f} {str(same_result(serial, parallel)):>6}")
+        workers *= 2
+
+
+def main():
+    target = sys.argv[1] if len(sys.argv) > 1 else "200"
+    chunk_size = int(float(sys.argv[2]) * 1024 * 1024) if len(sys.argv) > 2 else 16 * 1024 * 1024
+    if os.path.isfile(target):
+        run(target, chunk_size)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "scaling.log")
+        write_event_log(log_path, int(float(target) * 1024 * 1024) // BYTES_PER_EVENT_LINE)
+        run(log_path, chunk_size)
+
+
+if __name__ == "__main__":
+    main()
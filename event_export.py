@@ -0,0 +1,187 @@
+import json
+import os
+
+import numpy as np
+
+from event_store import KIND_END, NO_RSSI, NO_TIMESTAMP, NO_VALUE
+from log_parser import flow_rules
+
+EXPORT_FORMATS = ('parquet', 'arrow', 'excel')
+EXPORT_SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow', 'excel': '.xlsx'}
+
+# Rows per Parquet row group / Arrow record batch; only this many rows are converted at a time
+ROW_GROUP_SIZE = 500000
+# Excel is slow and stops at 1,048,576 rows, so it is only offered for windows up to this many rows
+EXCEL_MAX_ROWS = 100000
+
+# Interned columns of the store and the export column each becomes
+_LABEL_COLUMNS = (("status", "statuses", "status"), ("mac", "labels", "mac"), ("y", "labels", "y"),
+                  ("name", "names", "name"))
+
+
+def _event_rows(store):
+    """The rows of store before its trailing "end" point, which `reopen` replaces when a followed log grows."""
+    kind = store.column("kind")
+    return len(kind) - 1 if len(kind) and kind[-1] == KIND_END else len(kind)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Exporting to Parquet or Arrow needs the pyarrow package (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Exporting to Excel needs the openpyxl package (pip install openpyxl)") from None
+    return openpyxl
+
+
+def check_export_format(export_format):
+    """Raise ValueError when export_format is unknown or its package is not installed, so it fails before a parse."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"The export format must be one of {', '.join(EXPORT_FORMATS)}, not {export_format!r}")
+    if export_format == 'excel':
+        _openpyxl()
+    else:
+        _pyarrow()
+
+
+def export_schema(pa, dictionary=True):
+    label = pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    return pa.schema([
+        ("log", label),
+        ("timestamp", pa.timestamp('ms')),
+        ("status", label),
+        ("mac", label),
+        ("y", label),
+        ("rssi", pa.int32()),
+        ("name", label),
+        ("line_number", pa.int64()),
+        ("byte_offset", pa.int64()),
+        ("pattern_id", pa.int16()),
+        ("flow_violations", pa.int32()),
+    ], metadata={"flow_rules": json.dumps([rule.rule_id for rule in flow_rules])})
+
+
+class EventExporter:
+    """
+    Appends the rows of an EventStore to a Parquet or Arrow IPC file, ROW_GROUP_SIZE rows at a
+    time, so nothing but one row group is ever converted and memory does not grow with the log.
+
+    `write` exports the complete row groups among the rows added since the last call and
+    `close` the rest, so a followed log can be exported as it grows; `abort` deletes the partial
+    file instead. The "end" point is not
+    exported. Every row carries the log name, so the exports of many logs can be queried as one
+    table, e.g. pd.read_parquet(directory) or DuckDB's read_parquet('*.parquet'), and the ID of
+    the rule that found it (see PatternMatcher.pattern_table), which stays the same for as long
+    as patterns.json does. flow_violations has bit i set for a row that breaks the i-th rule
+    listed in the "flow_rules" schema metadata.
+
+    The interned columns are written as Arrow dictionaries over the store's tables; the Arrow
+    IPC file format cannot replace a dictionary between batches, so there they are plain strings.
+    """
+
+    def __init__(self, path, log_name, export_format='parquet', row_group_size=ROW_GROUP_SIZE):
+        if export_format not in ('parquet', 'arrow'):
+            raise ValueError(f"EventExporter writes parquet or arrow, not {export_format!r}")
+        self.pa = _pyarrow()
+        self.path = path
+        self.log_name = log_name
+        self.export_format = export_format
+        self.row_group_size = row_group_size
+        self.schema = export_schema(self.pa, dictionary=export_format == 'parquet')
+        if export_format == 'parquet':
+            self._writer = self.pa.parquet.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            options = self.pa.ipc.IpcWriteOptions(compression='zstd')
+            self._writer = self.pa.ipc.new_file(path, self.schema, options=options)
+        self._store = None
+        self.rows_exported = 0
+
+    def _batch(self, store, start, end):
+        pa = self.pa
+
+        def dictionary(codes, values):
+            codes = np.ascontiguousarray(codes)
+            array = pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32(), mask=codes == NO_VALUE),
+                                                   pa.array(values, pa.string()))
+            return array if self.export_format == 'parquet' else array.dictionary_decode()
+
+        timestamps = store.column("timestamp_ms")[start:end]
+        rssi = store.column("rssi")[start:end]
+        pattern_ids = store.column("pattern_id")[start:end]
+        columns = {
+            "log": dictionary(np.zeros(end - start, dtype=np.int32), [self.log_name]),
+            "timestamp": pa.array(timestamps, pa.timestamp('ms'), mask=timestamps == NO_TIMESTAMP),
+            "rssi": pa.array(rssi, pa.int32(), mask=rssi == NO_RSSI),
+            "line_number": pa.array(store.column("line_number")[start:end], pa.int64()),
+            "byte_offset": pa.array(store.column("byte_offset")[start:end], pa.int64()),
+            "pattern_id": pa.array(pattern_ids, pa.int16(), mask=pattern_ids == NO_VALUE),
+            "flow_violations": pa.array(store.column("flow_violations")[start:end], pa.int32()),
+        }
+        for column, table, name in _LABEL_COLUMNS:
+            columns[name] = dictionary(store.column(column)[start:end], getattr(store, table).values)
+        return pa.RecordBatch.from_arrays([columns[field.name] for field in self.schema], schema=self.schema)
+
+    def _export(self, store, end):
+        batch = self._batch(store, self.rows_exported, end)
+        if self.export_format == 'parquet':
+            self._writer.write_table(self.pa.Table.from_batches([batch]), row_group_size=self.row_group_size)
+        else:
+            self._writer.write_batch(batch)
+        self.rows_exported = end
+
+    def write(self, store):
+        """Export the complete row groups among the rows of store that are not exported yet."""
+        if store is not self._store:
+            # A followed log that was rotated or rewritten is parsed into a new store, whose rows
+            # are appended after the ones already exported
+            self._store = store
+            self.rows_exported = 0
+        while _event_rows(store) - self.rows_exported >= self.row_group_size:
+            self._export(store, self.rows_exported + self.row_group_size)
+
+    def close(self, store=None):
+        """Export the remaining rows of store, if given, and finish the file."""
+        if store is not None:
+            self.write(store)
+            if _event_rows(store) > self.rows_exported:
+                self._export(store, _event_rows(store))
+        self._writer.close()
+
+    def abort(self):
+        """Give up on the file after a failed parse: close the writer and delete what was written."""
+        try:
+            self._writer.close()
+        except Exception:
+            # The error that stopped the parse may have left the writer unusable
+            pass
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def export_excel(store, path):
+    """
+    The old debug dump: one sheet with the line text of every row, read back from the log.
+    Refuses stores of more than EXCEL_MAX_ROWS rows, which Excel would take minutes over.
+    """
+    import pandas as pd
+
+    _openpyxl()
+    if len(store) > EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(store)} rows are too many for Excel (at most {EXCEL_MAX_ROWS}), "
+                         f"export to parquet or arrow or pick a smaller window")
+    patterns_df = store.to_dataframe(with_text=True)
+    patterns_df = patterns_df[patterns_df['kind'] != KIND_END]
+    patterns_df = patterns_df[['timestamp', 'status', 'pattern', 'mac', 'y', 'name', 'rssi']]
+    patterns_df.columns = ['Timestamp', 'Status', 'Pattern', 'MAC', 'Y', 'Name', 'RSSI']
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        patterns_df.to_excel(writer, sheet_name='Patterns Discovered', index=False)
+    return len(patterns_df)
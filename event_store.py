@@ -0,0 +1,318 @@
+from collections import namedtuple
+import numpy as np
+
+from log_reader import read_lines_at
+from timestamp_parser import EPOCH, ONE_MS, to_epoch_ms
+
+KIND_EVENT = 0
+KIND_MAC = 1
+KIND_END = 2
+
+NO_TIMESTAMP = np.iinfo(np.int64).min  # reads back as NaT through a datetime64[ms] view
+NO_VALUE = -1
+NO_RSSI = np.iinfo(np.int32).min
+
+EventRow = namedtuple('EventRow', ['index', 'timestamp', 'status', 'mac', 'y', 'rssi', 'name', 'line_number',
+                                   'pattern_id', 'flow_violations'])
+
+
+class _Column:
+    """
+    Append-only typed column, grown by doubling. Growing moves the data to a new array, so a view
+    handed out before is a stale snapshot from then on: it sees neither new rows nor later writes.
+    """
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype, capacity=1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            grown = np.empty(2 * len(self.data), dtype=self.data.dtype)
+            grown[:self.size] = self.data
+            self.data = grown
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def pop(self):
+        self.size -= 1
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class _InternTable:
+    """Maps strings to small integer codes; NO_VALUE stands for None."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        if value is None:
+            return NO_VALUE
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code):
+        return self.values[code] if code != NO_VALUE else None
+
+
+class EventStore:
+    """
+    Columnar store of everything parse_log finds.
+
+    Each row is a connectivity/info event (KIND_EVENT), a MAC-pattern hit kept for the debug
+    export (KIND_MAC) or the trailing "end" point (KIND_END). Timestamps are epoch milliseconds,
+    statuses, MACs, y lanes and info names are interned codes, and the source line is kept only
+    as its line number and byte offset: the text is read back from the log on demand by `texts`.
+    pattern_id is the position of the rule that found the row in PatternMatcher.pattern_table
+    (NO_VALUE for the "end" point), and flow_violations has bit i set when the row breaks the
+    i-th flow rule (see flow_validator).
+    """
+
+    COLUMNS = (
+        ("kind", np.int8),
+        ("timestamp_ms", np.int64),
+        ("status", np.int32),
+        ("mac", np.int32),
+        ("y", np.int32),
+        ("rssi", np.int32),
+        ("name", np.int32),
+        ("line_number", np.int64),
+        ("byte_offset", np.int64),
+        ("pattern_id", np.int16),
+        ("flow_violations", np.int32),
+    )
+
+    def __init__(self, log_path=None, encoding=None):
+        self.log_path = log_path
+        self.encoding = encoding
+        self.statuses = _InternTable()
+        self.labels = _InternTable()  # MACs and y lanes ("disconnected" or a MAC) share one table
+        self.names = _InternTable()
+        self._columns = {name: _Column(dtype) for name, dtype in self.COLUMNS}
+        self._appenders = [self._columns[name].append for name, _ in self.COLUMNS]
+
+    def __len__(self):
+        return self._columns["kind"].size
+
+    def state(self):
+        """The store as plain lists and NumPy arrays, with only the filled part of each column."""
+        return {
+            "log_path": self.log_path,
+            "encoding": self.encoding,
+            "statuses": self.statuses.values,
+            "labels": self.labels.values,
+            "names": self.names.values,
+            "columns": {name: self.column(name) for name, _ in self.COLUMNS},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        store = cls.__new__(cls)
+        store.__setstate__(state)
+        return store
+
+    def __getstate__(self):
+        # Pickled e.g. when a worker process returns a chunk
+        return self.state()
+
+    def __setstate__(self, state):
+        self.__init__(state["log_path"], state["encoding"])
+        for table, values in ((self.statuses, state["statuses"]), (self.labels, state["labels"]),
+                              (self.names, state["names"])):
+            for value in values:
+                table.code(value)
+        for name, values in state["columns"].items():
+            self._columns[name].extend(values)
+
+    def append(self, kind, timestamp, status, mac, y, rssi, name, line_number, byte_offset, pattern_id=NO_VALUE,
+               flow_violations=0):
+        values = (
+            kind,
+            to_epoch_ms(timestamp) if timestamp is not None else NO_TIMESTAMP,
+            self.statuses.code(status),
+            self.labels.code(mac),
+            self.labels.code(y),
+            int(rssi) if rssi is not None else NO_RSSI,
+            self.names.code(name),
+            line_number,
+            byte_offset,
+            pattern_id,
+            flow_violations,
+        )
+        for append, value in zip(self._appenders, values):
+            append(value)
+
+    def extend(self, other, line_offset=0, label_overrides=None, missing_timestamp=None, keep=None):
+        """
+        Append the rows of another store, re-coding its interned values into this store's tables.
+
+        Used to stitch stores parsed from consecutive chunks of the same log: line_offset shifts
+        the chunk-relative line numbers, label_overrides replaces placeholder labels, rows without
+        a timestamp get missing_timestamp, and keep is an optional boolean row mask.
+        """
+        label_overrides = label_overrides or {}
+
+        def recode(table, other_table, codes):
+            # The extra trailing entry maps NO_VALUE (-1) to itself
+            mapping = np.array([table.code(label_overrides.get(v, v) if table is self.labels else v)
+                                for v in other_table.values] + [NO_VALUE], dtype=np.int32)
+            return mapping[codes]
+
+        rows = keep if keep is not None else slice(None)
+        timestamps = other.column("timestamp_ms")[rows].copy()
+        if missing_timestamp is not None:
+            timestamps[timestamps == NO_TIMESTAMP] = to_epoch_ms(missing_timestamp)
+        line_numbers = other.column("line_number")[rows].copy()
+        line_numbers[line_numbers != NO_VALUE] += line_offset
+
+        values = {
+            "kind": other.column("kind")[rows],
+            "timestamp_ms": timestamps,
+            "status": recode(self.statuses, other.statuses, other.column("status")[rows]),
+            "mac": recode(self.labels, other.labels, other.column("mac")[rows]),
+            "y": recode(self.labels, other.labels, other.column("y")[rows]),
+            "rssi": other.column("rssi")[rows],
+            "name": recode(self.names, other.names, other.column("name")[rows]),
+            "line_number": line_numbers,
+            "byte_offset": other.column("byte_offset")[rows],
+            "pattern_id": other.column("pattern_id")[rows],
+            "flow_violations": other.column("flow_violations")[rows],
+        }
+        for name, column in self._columns.items():
+            column.extend(values[name])
+
+    def flag_violations(self, row, bits):
+        """Mark row as breaking the flow rules of bits, once a chunk's start states are known."""
+        self._columns["flow_violations"].data[row] |= bits
+
+    def reopen(self):
+        """Drop the trailing "end" point so more rows can be appended; `finish` adds it back."""
+        if len(self) and self._columns["kind"].view()[-1] == KIND_END:
+            for column in self._columns.values():
+                column.pop()
+
+    def finish(self, last_log_timestamp):
+        """Make sure the store ends with exactly one "end" point at the last log timestamp."""
+        self.reopen()
+        event_rows = np.flatnonzero(self.column("kind") == KIND_EVENT)
+        if last_log_timestamp and len(event_rows):
+            last_y = self.labels.value(int(self.column("y")[event_rows[-1]]))
+            self.append(KIND_END, last_log_timestamp, "end", None, last_y, None, None, NO_VALUE, NO_VALUE)
+
+    def column(self, name):
+        """Zero-copy NumPy view of a column, valid until the next append (see _Column)."""
+        return self._columns[name].view()
+
+    def timestamps(self):
+        return self.column("timestamp_ms").view("datetime64[ms]")
+
+    def event_indices(self):
+        """Row indices of the plotted points: events and the end point, without MAC-pattern hits."""
+        return np.flatnonzero(self.column("kind") != KIND_MAC)
+
+    def iter_events(self, include_mac_rows=False, start=0):
+        """
+        Yield EventRow tuples with the codes decoded and the timestamp as a datetime,
+        from row start on (a follower only decodes the rows it has not seen yet).
+        """
+        kinds = self.column("kind")[start:].tolist()
+        timestamps = self.column("timestamp_ms")[start:].tolist()
+        statuses = self.column("status")[start:].tolist()
+        macs = self.column("mac")[start:].tolist()
+        ys = self.column("y")[start:].tolist()
+        rssis = self.column("rssi")[start:].tolist()
+        names = self.column("name")[start:].tolist()
+        line_numbers = self.column("line_number")[start:].tolist()
+        pattern_ids = self.column("pattern_id")[start:].tolist()
+        flow_violations = self.column("flow_violations")[start:].tolist()
+        status_value, label_value, name_value = self.statuses.value, self.labels.value, self.names.value
+        for i, kind in enumerate(kinds, start=start):
+            if kind == KIND_MAC and not include_mac_rows:
+                continue
+            j = i - start
+            timestamp = timestamps[j]
+            yield EventRow(
+                i,
+                EPOCH + timestamp * ONE_MS if timestamp != NO_TIMESTAMP else None,
+                status_value(statuses[j]),
+                label_value(macs[j]),
+                label_value(ys[j]),
+                str(rssis[j]) if rssis[j] != NO_RSSI else None,
+                name_value(names[j]),
+                line_numbers[j],
+                pattern_ids[j],
+                flow_violations[j],
+            )
+
+    def texts(self, indices):
+        """
+        Return the "Line N: <text>" string of each row, reading the lines from the log lazily.
+        The "end" point reads "End of Log".
+        """
+        indices = list(indices)
+        kinds = self.column("kind")
+        line_numbers = self.column("line_number")
+        byte_offsets = self.column("byte_offset")
+        texts = [None] * len(indices)
+        # Read in file order so the log is scanned forward once
+        to_read = sorted((int(byte_offsets[row]), position) for position, row in enumerate(indices)
+                         if kinds[row] != KIND_END)
+        lines = read_lines_at(self.log_path, self.encoding, [offset for offset, _ in to_read])
+        for (_, position), line in zip(to_read, lines):
+            texts[position] = f"Line {int(line_numbers[indices[position]])}: {line.strip()}"
+        return [text if text is not None else "End of Log" for text in texts]
+
+    def to_dataframe(self, with_text=False):
+        """
+        Build a pandas DataFrame over the columns. Numeric columns are wrapped without copying;
+        the interned columns become Categoricals sharing the code arrays.
+        """
+        import pandas as pd
+
+        def categorical(name, table):
+            return pd.Categorical.from_codes(self.column(name), categories=table.values, validate=False)
+
+        data = {
+            "kind": self.column("kind"),
+            "timestamp": self.timestamps(),
+            "status": categorical("status", self.statuses),
+            "mac": categorical("mac", self.labels),
+            "y": categorical("y", self.labels),
+            "rssi": pd.arrays.IntegerArray(self.column("rssi"), self.column("rssi") == NO_RSSI),
+            "name": categorical("name", self.names),
+            "line_number": self.column("line_number"),
+            "byte_offset": self.column("byte_offset"),
+            "pattern_id": self.column("pattern_id"),
+            "flow_violations": self.column("flow_violations"),
+        }
+        df = pd.DataFrame(data, copy=False)
+        if with_text:
+            df["pattern"] = self.texts(range(len(self)))
+        return df
+
+    def as_dicts(self):
+        """Materialize the legacy list of event dicts (meant for small windows and debugging)."""
+        rows = list(self.iter_events())
+        texts = self.texts([row.index for row in rows])
+        return [
+            {"timestamp": row.timestamp, "status": row.status, "pattern": text, "mac": row.mac, "y": row.y,
+             "rssi": row.rssi, "name": row.name}
+            for row, text in zip(rows, texts)
+        ]
@@ -0,0 +1,218 @@
+"""
+Flow validation: the rules in the flow_rules section of patterns.json, run over the connectivity
+events while the parser emits them.
+
+Each rule is a small state machine over connectivity statuses:
+
+    {"id": "auth_req_without_attempt",
+     "description": "auth_req that does not follow an Attempt_to_connect",
+     "checks": ["auth_req"],
+     "initial": "idle",
+     "transitions": {"idle": {"Attempt_to_connect": "attempted"},
+                     "attempted": {"Attempt_to_connect": "attempted", "auth_req": "attempted"}},
+     "after": ["Attempt_to_connect"],
+     "lane": "disconnected"}
+
+An event whose status has a transition from the current state moves the rule to its target.
+An event whose status is in "checks" but has no transition from the current state is a
+violation (and leaves the state as it is); with "lane", only events on that y lane are
+checked. With "after", a checked event is also a violation when its timestamp (to the
+millisecond) is not later than that of the last event with one of those statuses, i.e. when
+the log has it out of order. A rule without transitions forbids its checked statuses
+outright. Statuses the rule does not mention are ignored.
+
+Violations are stored as bits (bit i = rule i) in the flow_violations column of the event row
+that broke the rule. A chunk parsed without knowing the state before it (see parallel_parser)
+is validated from every start state at once and keeps the violations that depend on the start
+state, or on the lane it could not know yet, pending until `merge` is given the real ones. Its
+"after" checks are all decided by `merge`, from the timestamps in the stitched store.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from event_store import EPOCH, NO_TIMESTAMP, ONE_MS
+from timestamp_parser import to_epoch_ms
+
+# At most one bit per rule in the int32 flow_violations column
+MAX_FLOW_RULES = 31
+# The row of an "after" event before the chunk being validated
+BEFORE_CHUNK = -1
+
+Violation = namedtuple("Violation", "timestamp line_number rule_id")
+
+
+class FlowRule:
+    """One flow_rules entry, with its statuses resolved to the pattern IDs that emit them."""
+    __slots__ = ("bit", "rule_id", "description", "states", "initial", "checks", "transitions", "after", "lane")
+
+    def __init__(self, bit, spec, pattern_ids):
+        self.bit = bit
+        self.rule_id = spec["id"]
+        self.description = spec.get("description", "")
+        self.lane = spec.get("lane")
+
+        def ids(status):
+            if status not in pattern_ids:
+                raise ValueError(f"Flow rule {self.rule_id}: {status!r} is not a connectivity status")
+            return pattern_ids[status]
+
+        transitions = spec.get("transitions", {})
+        self.states = [spec.get("initial", "start")]
+        for state, moves in transitions.items():
+            for name in [state, *moves.values()]:
+                if name not in self.states:
+                    self.states.append(name)
+        self.initial = 0
+        self.checks = frozenset(pattern_id for status in spec["checks"] for pattern_id in ids(status))
+        self.after = frozenset(pattern_id for status in spec.get("after", ()) for pattern_id in ids(status))
+        # transitions[state][pattern_id] is the next state
+        self.transitions = [{} for _ in self.states]
+        for state, moves in transitions.items():
+            for status, target in moves.items():
+                for pattern_id in ids(status):
+                    self.transitions[self.states.index(state)][pattern_id] = self.states.index(target)
+
+
+def compile_flow_rules(specs, matcher):
+    """The FlowRules of the flow_rules section of patterns.json, for the rules of matcher."""
+    if len(specs) > MAX_FLOW_RULES:
+        raise ValueError(f"At most {MAX_FLOW_RULES} flow rules are supported, not {len(specs)}")
+    pattern_ids = {}
+    for pattern in matcher.connectivity_patterns:
+        pattern_ids.setdefault(pattern.status, []).append(pattern.pattern_id)
+    return [FlowRule(1 << i, spec, pattern_ids) for i, spec in enumerate(specs)]
+
+
+class FlowValidator:
+    """
+    The state of every flow rule, advanced one event at a time by `check`.
+
+    `for_chunk` makes one that does not know the states before its first event, nor the lane
+    (unknown_lane stands for it) before the first MAC hit or disconnect: each rule then follows
+    one path per start state until they all end in the same state, and the violations it cannot
+    decide are kept in `pending` as (row, rule index, start states or None for all of them, row
+    of the "after" event to compare timestamps with or None).
+    """
+
+    def __init__(self, rules, unknown_lane=None):
+        self.rules = rules
+        self.unknown_lane = unknown_lane
+        # The state of each rule, or None while it depends on the start state (see paths)
+        self.states = [rule.initial for rule in rules]
+        self.paths = [None] * len(rules)
+        # The epoch ms of each rule's last "after" event (None if there was none or it had no timestamp),
+        # and in a chunk its row instead (BEFORE_CHUNK until there is one)
+        self.after_timestamps = [None] * len(rules)
+        self.after_rows = None
+        self.pending = []
+
+    @classmethod
+    def for_chunk(cls, rules, unknown_lane):
+        validator = cls(rules, unknown_lane)
+        validator.states = [None] * len(rules)
+        validator.paths = [list(range(len(rule.states))) for rule in rules]
+        validator.after_rows = [BEFORE_CHUNK] * len(rules)
+        return validator
+
+    def check(self, row, pattern_id, y, timestamp=None):
+        """
+        Advance every rule over the event at row, timestamped timestamp (a datetime or None), and
+        return the bits of the rules it violates.
+        """
+        bits = 0
+        for i, rule in enumerate(self.rules):
+            transitions = rule.transitions
+            checked = pattern_id in rule.checks and (rule.lane is None or y == rule.lane or y == self.unknown_lane)
+            state = self.states[i]
+            # The start states from which the event is a violation, None for all of them
+            if state is not None:
+                starts = None if checked and pattern_id not in transitions[state] else frozenset()
+                self.states[i] = transitions[state].get(pattern_id, state)
+            else:
+                path = self.paths[i]
+                starts = frozenset()
+                if checked:
+                    starts = frozenset(start for start, current in enumerate(path)
+                                       if pattern_id not in transitions[current])
+                    if len(starts) == len(path):
+                        starts = None
+                path[:] = [transitions[current].get(pattern_id, current) for current in path]
+                if len(set(path)) == 1:
+                    self.states[i] = path[0]
+                    self.paths[i] = None
+
+            after_row = None
+            if rule.after and (checked or pattern_id in rule.after):
+                timestamp_ms = to_epoch_ms(timestamp) if timestamp is not None else None
+                if checked and starts is not None:
+                    if self.after_rows is not None:
+                        after_row = self.after_rows[i]
+                    elif None not in (timestamp_ms, self.after_timestamps[i]) and \
+                            timestamp_ms <= self.after_timestamps[i]:
+                        starts = None
+                if pattern_id in rule.after:
+                    self.after_timestamps[i] = timestamp_ms
+                    if self.after_rows is not None:
+                        self.after_rows[i] = row
+
+            if starts is None and state is not None and not (rule.lane is not None and y == self.unknown_lane):
+                bits |= rule.bit
+            elif starts is None or starts or after_row is not None:
+                self.pending.append((row, i, starts, after_row))
+        return bits
+
+    def merge(self, chunk, store, rows):
+        """
+        Continue from the end of a chunk validated by a `for_chunk` validator: decide its pending
+        violations from the states this validator is in, flag them in store, and take on the states
+        the chunk ends in. rows maps the chunk's row indices to store's (-1 for a dropped row).
+        """
+        y_codes = store.column("y")
+        timestamps = store.column("timestamp_ms")
+
+        def after_timestamp(i, after_row):
+            if after_row == BEFORE_CHUNK:
+                return self.after_timestamps[i]
+            timestamp_ms = int(timestamps[rows[after_row]])
+            return timestamp_ms if timestamp_ms != NO_TIMESTAMP else None
+
+        for row, i, starts, after_row in chunk.pending:
+            rule = self.rules[i]
+            row = int(rows[row])
+            if row < 0 or (rule.lane is not None and store.labels.value(int(y_codes[row])) != rule.lane):
+                continue
+            if starts is not None and self.states[i] not in starts:
+                if after_row is None:
+                    continue
+                after_ms = after_timestamp(i, after_row)
+                if after_ms is None or timestamps[row] == NO_TIMESTAMP or timestamps[row] > after_ms:
+                    continue
+            store.flag_violations(row, rule.bit)
+        for i, state in enumerate(chunk.states):
+            if chunk.after_rows[i] != BEFORE_CHUNK:
+                self.after_timestamps[i] = after_timestamp(i, chunk.after_rows[i])
+            self.states[i] = state if state is not None else chunk.paths[i][self.states[i]]
+
+
+def check_flow_validity(event_store):
+    """
+    Check the validity of the flow according to the flow rules.
+    If an invalid flow is detected, return True. Otherwise, return False.
+    """
+    return bool(event_store.column("flow_violations").any())
+
+
+def flow_violations(event_store, rules):
+    """Every violation in event_store as a Violation, in row order."""
+    flags = event_store.column("flow_violations")
+    rows = np.flatnonzero(flags)
+    timestamps = event_store.column("timestamp_ms")
+    line_numbers = event_store.column("line_number")
+    violations = []
+    for row in rows:
+        for rule in rules:
+            if flags[row] & rule.bit:
+                violations.append(Violation(EPOCH + int(timestamps[row]) * ONE_MS, int(line_numbers[row]),
+                                            rule.rule_id))
+    return violations
@@ -0,0 +1,155 @@
+import base64
+import gzip
+import json
+import os
+import pathlib
+import tempfile
+import uuid
+import webbrowser
+from datetime import date
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+from timeline_lod import LOD_SCRIPT
+
+# plotly.js is written here once and shared by every graph drawn with plotlyjs='local'; the page then
+# refers to it by an absolute file:// URI, so such a graph only renders on the machine that drew it
+PLOTLYJS_DIR = os.path.join(os.path.expanduser('~'), '.grapholog', 'plotlyjs')
+PLOTLYJS_NAME = f"plotly-{get_plotlyjs_version()}.min.js"
+PLOTLYJS_MODES = ('directory', 'local', 'inline', 'cdn')
+
+CONFIG = {'scrollZoom': True, 'responsive': True}
+
+_PAGE = """<!doctype html>
+<html>
+<head>
+    <meta charset="utf-8" />
+    <style>html, body {{height: 100%; margin: 0;}}</style>
+</head>
+<body>
+{div}
+</body>
+</html>
+"""
+
+_DIV = """<div style="height:100%; width:100%;">
+{load_plotlyjs}
+<div id="{plot_id}" class="plotly-graph-div" style="height:100%; width:100%;"></div>
+<script>
+function draw_{plot_id}(figure) {{
+    Plotly.newPlot('{plot_id}', figure.data, figure.layout, {config}){post_scripts};
+}}
+{load_figure}
+</script>
+</div>"""
+
+# The figure JSON of a compressed page, inflated by the browser itself
+_INFLATE = """(function () {{
+    var packed = atob('{packed}');
+    var bytes = new Uint8Array(packed.length);
+    for (var i = 0; i < packed.length; i++) {{
+        bytes[i] = packed.charCodeAt(i);
+    }}
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+    new Response(stream).json().then(draw_{plot_id});
+}})();"""
+
+
+def plotlyjs_file(directory=PLOTLYJS_DIR):
+    """The path of the PLOTLYJS_NAME copy in directory, written the first time it is asked for."""
+    path = os.path.join(directory, PLOTLYJS_NAME)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        # Batch workers may ask at the same time, so the file only ever appears complete
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w', encoding='utf-8') as file:
+            file.write(get_plotlyjs())
+        os.replace(temp_path, path)
+    return path
+
+
+def plot_array(values):
+    """
+    x or y values (datetimes or numbers, None for the breaks between line segments) as a numpy
+    array, which plotly embeds as a typed array instead of a list of strings and numbers.
+    Dates become epoch milliseconds, which a date axis reads the same as date strings, and
+    None becomes NaN. Anything else is returned unchanged.
+    """
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, date):
+        moments = np.array(values, dtype='datetime64[ms]')
+        array = moments.astype(np.int64).astype(np.float64)
+        array[np.isnat(moments)] = np.nan
+        return array
+    if isinstance(sample, (int, float, np.number)) and not isinstance(sample, bool):
+        array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        if not np.isnan(array).any() and np.abs(array).max() < 2 ** 31 and np.array_equal(array, np.round(array)):
+            return array.astype(np.int32)
+        return array
+    return values
+
+
+def figure_json(fig):
+    """
+    The figure as JSON for Plotly.newPlot; its numpy arrays are embedded as typed arrays
+    (base64 "bdata" specs, which plotly writes from version 6 on, see requirements.txt).
+    """
+    return to_json_plotly(fig.to_dict())
+
+
+def _load_plotlyjs(plotlyjs, output_dir):
+    if plotlyjs == 'local':
+        return f'<script charset="utf-8" src="{pathlib.Path(plotlyjs_file()).as_uri()}"></script>'
+    if plotlyjs == 'directory':
+        plotlyjs_file(output_dir)
+        return f'<script charset="utf-8" src="{PLOTLYJS_NAME}"></script>'
+    if plotlyjs == 'inline':
+        return f'<script>{get_plotlyjs()}</script>'
+    if plotlyjs == 'cdn':
+        return f'<script charset="utf-8" src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    raise ValueError(f"plotlyjs must be one of {', '.join(PLOTLYJS_MODES)}, not {plotlyjs!r}")
+
+
+def timeline_html(fig, plotlyjs='directory', full_html=True, post_script=None, compress=False, output_dir='.'):
+    """
+    The HTML of a figure built by TimelineBuilder, with LOD_SCRIPT when it carries a
+    level-of-detail pyramid. post_script is run after it.
+
+    plotlyjs is where the page gets plotly.js from: 'directory' (the default) is a copy next to the
+    page in output_dir, referred to by a relative path, so the page can be copied to another machine
+    along with it; 'local' is a copy shared by every graph on this machine (see plotlyjs_file),
+    'inline' embeds it and 'cdn' loads it from the plotly CDN.
+    compress gzips the figure JSON into the page, which the browser inflates before drawing.
+    """
+    plot_id = "g" + uuid.uuid4().hex
+    post_scripts = ([LOD_SCRIPT] if fig.layout.meta is not None and "lod" in fig.layout.meta else []) + (
+        [post_script] if post_script else [])
+    figure = figure_json(fig)
+    if compress:
+        packed = base64.b64encode(gzip.compress(figure.encode('utf-8'), compresslevel=6)).decode('ascii')
+        load_figure = _INFLATE.format(packed=packed, plot_id=plot_id)
+    else:
+        load_figure = f"draw_{plot_id}({figure});"
+
+    div = _DIV.format(
+        load_plotlyjs=_load_plotlyjs(plotlyjs, output_dir),
+        plot_id=plot_id,
+        config=json.dumps(CONFIG),
+        post_scripts="".join(".then(function () {\n" + script.replace('{plot_id}', plot_id) + "\n})"
+                             for script in post_scripts),
+        load_figure=load_figure,
+    )
+    return _PAGE.format(div=div) if full_html else div
+
+
+def write_timeline_html(fig, output_filename, auto_open=False, plotlyjs='directory', full_html=True, post_script=None,
+                        compress=False):
+    """Write timeline_html(fig, ...) to output_filename and open it in the browser with auto_open."""
+    output_dir = os.path.dirname(os.path.abspath(output_filename))
+    page = timeline_html(fig, plotlyjs, full_html, post_script, compress, output_dir)
+    with open(output_filename, 'w', encoding='utf-8') as file:
+        file.write(page)
+    if auto_open:
+        webbrowser.open(pathlib.Path(os.path.abspath(output_filename)).as_uri())
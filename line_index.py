@@ -0,0 +1,229 @@
+import bisect
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from mac_registry import MacRegistry
+from timestamp_parser import to_epoch_ms
+
+INDEX_VERSION = 3
+CHECKPOINT_INTERVAL = 100000
+# Lines per time block; the checkpoint interval must be a multiple of it
+TIME_BLOCK_INTERVAL = 10000
+HEAD_HASH_SIZE = 4096
+INDEX_SUFFIX = '.glidx'
+
+
+def _head_hash(log_path):
+    with open(log_path, 'rb') as file:
+        return hashlib.sha1(file.read(HEAD_HASH_SIZE)).hexdigest()
+
+
+def _fallback_index_path(log_path):
+    # Used when the log lives on a read-only share and the sidecar cannot be written next to it
+    name = hashlib.sha1(os.path.abspath(log_path).encode('utf-8')).hexdigest() + INDEX_SUFFIX
+    return os.path.join(os.path.expanduser('~'), '.grapholog', 'index', name)
+
+
+def _encode_timestamp(timestamp):
+    return timestamp.isoformat() if timestamp else None
+
+
+def _decode_timestamp(text):
+    return datetime.fromisoformat(text) if text else None
+
+
+class Checkpoint:
+    """
+    A line start every CHECKPOINT_INTERVAL lines, with the parser state reached there when
+    parsing from line 0 (current_y, last timestamp and the MAC registry with its BEACON_RX info).
+    """
+    __slots__ = ("line_number", "byte_offset", "current_y", "last_log_timestamp", "mac_registry")
+
+    def __init__(self, line_number, byte_offset, current_y="disconnected", last_log_timestamp=None,
+                 mac_registry=None):
+        self.line_number = line_number
+        self.byte_offset = byte_offset
+        self.current_y = current_y
+        self.last_log_timestamp = last_log_timestamp
+        self.mac_registry = mac_registry.copy() if mac_registry is not None else MacRegistry()
+
+    @property
+    def position(self):
+        return self.line_number, self.byte_offset
+
+    def to_json(self):
+        return [self.line_number, self.byte_offset, self.current_y, _encode_timestamp(self.last_log_timestamp),
+                self.mac_registry.to_json()]
+
+    @classmethod
+    def from_json(cls, data):
+        line_number, byte_offset, current_y, last_log_timestamp, mac_registry = data
+        return cls(line_number, byte_offset, current_y, _decode_timestamp(last_log_timestamp),
+                   MacRegistry.from_json(mac_registry))
+
+
+class LineIndex:
+    """
+    Sparse line-offset index stored in a sidecar file next to the log (<log>.glidx).
+
+    Checkpoints let parse_log seek straight to the nearest line start before a requested window
+    instead of reading every line in front of it. The index is validated against the log on
+    load: growth keeps every checkpoint and the index is extended from the last one, truncation
+    drops the checkpoints past the new end, and a changed head (rotated or rewritten log) rebuilds it.
+
+    The index also keeps a time block every TIME_BLOCK_INTERVAL lines: its first line, byte offset
+    and the smallest and largest timestamp (epoch ms) of its lines, so a timestamp window can be
+    turned into a byte range by binary search (see `time_block_range`). Only complete blocks are
+    indexed; time_indexed_to is the line and offset where the last one ends.
+    """
+
+    def __init__(self, log_path, encoding, interval=CHECKPOINT_INTERVAL):
+        self.log_path = log_path
+        self.encoding = encoding
+        self.interval = interval
+        self.checkpoints = [Checkpoint(0, 0)]
+        self.time_blocks = []
+        self.time_indexed_to = (0, 0)
+        # Log size up to which every complete time block is indexed, 0 when the index stops short of the end
+        self.indexed_size = 0
+        self.dirty = False
+        self._time_bounds = None
+
+    @classmethod
+    def load(cls, log_path, encoding, interval=CHECKPOINT_INTERVAL):
+        index = cls(log_path, encoding, interval)
+        size = os.path.getsize(log_path)
+        for index_path in (log_path + INDEX_SUFFIX, _fallback_index_path(log_path)):
+            try:
+                with open(index_path, 'r') as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if (data.get('version') != INDEX_VERSION or data.get('encoding') != encoding
+                    or data.get('interval') != interval or data.get('head_hash') != _head_hash(log_path)):
+                break
+            checkpoints = [Checkpoint.from_json(c) for c in data['checkpoints']]
+            time_blocks = data['time_blocks']
+            time_indexed_to = tuple(data['time_indexed_to'])
+            index.indexed_size = data['indexed_size']
+            if size < data.get('size', 0):
+                # Truncated in place: everything past the new end is gone
+                checkpoints = [c for c in checkpoints if c.byte_offset < size]
+                ends = [block[1] for block in time_blocks[1:]] + [time_indexed_to[1]]
+                kept = sum(1 for end in ends if end <= size)
+                if kept < len(time_blocks):
+                    time_indexed_to = tuple(time_blocks[kept][:2])
+                    time_blocks = time_blocks[:kept]
+                index.indexed_size = 0
+                index.dirty = True
+            index.checkpoints = checkpoints or index.checkpoints
+            index.time_blocks = time_blocks
+            index.time_indexed_to = time_indexed_to
+            break
+        return index
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {
+            'version': INDEX_VERSION,
+            'encoding': self.encoding,
+            'interval': self.interval,
+            'size': os.path.getsize(self.log_path),
+            'head_hash': _head_hash(self.log_path),
+            'checkpoints': [c.to_json() for c in self.checkpoints],
+            'time_blocks': self.time_blocks,
+            'time_indexed_to': self.time_indexed_to,
+            'indexed_size': self.indexed_size,
+        }
+        for index_path in (self.log_path + INDEX_SUFFIX, _fallback_index_path(self.log_path)):
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+                with open(index_path, 'w') as file:
+                    json.dump(data, file)
+            except OSError:
+                continue
+            self.dirty = False
+            return
+
+    @property
+    def last_checkpoint(self):
+        return self.checkpoints[-1]
+
+    def next_checkpoint_line(self):
+        return self.last_checkpoint.line_number + self.interval
+
+    def add_checkpoint(self, line_number, byte_offset, current_y, last_log_timestamp, mac_registry):
+        if line_number <= self.last_checkpoint.line_number:
+            return
+        self.checkpoints.append(Checkpoint(line_number, byte_offset, current_y, last_log_timestamp, mac_registry))
+        self.dirty = True
+
+    def checkpoint_before(self, line_number):
+        """Return the last checkpoint at or before line_number."""
+        i = bisect.bisect_right([c.line_number for c in self.checkpoints], line_number)
+        return self.checkpoints[max(i - 1, 0)]
+
+    def next_time_block_line(self):
+        """The first line of the first time block that is not indexed yet."""
+        return len(self.time_blocks) * TIME_BLOCK_INTERVAL
+
+    def add_time_block(self, line_number, byte_offset, min_timestamp, max_timestamp, end_position):
+        """
+        Index the block of lines from (line_number, byte_offset) up to end_position. A block that
+        is already indexed or does not start where the next one is expected is ignored.
+        min_timestamp/max_timestamp are None when no line of the block has a timestamp.
+        """
+        if line_number != self.next_time_block_line():
+            return
+        if min_timestamp is not None:
+            min_timestamp, max_timestamp = to_epoch_ms(min_timestamp), to_epoch_ms(max_timestamp)
+        self.time_blocks.append([line_number, byte_offset, min_timestamp, max_timestamp])
+        self.time_indexed_to = tuple(end_position)
+        self._time_bounds = None
+        self.dirty = True
+
+    def set_indexed_size(self, size):
+        """Record that the log was indexed to its end when it was size bytes long."""
+        if size != self.indexed_size:
+            self.indexed_size = size
+            self.dirty = True
+
+    def time_block_end(self, i):
+        """The byte offset where time block i ends."""
+        return self.time_blocks[i + 1][1] if i + 1 < len(self.time_blocks) else self.time_indexed_to[1]
+
+    def time_block_range(self, start_ms, end_ms):
+        """
+        Return (first, last), the indexes of the first and last time block that can hold a line
+        timestamped within [start_ms, end_ms], or None when no block can.
+
+        Timestamps are mostly increasing, but clock jumps and suspend/resume make some stretches go
+        backwards, so the per-block bounds are not sorted. Their running maximum (from the front)
+        and running minimum (from the back) are, and the first block whose maximum reaches start_ms
+        is the first block where the running maximum does; likewise for the last block whose
+        minimum is at most end_ms. Blocks in between that miss the window are still read, so the
+        parser state flows through them, but none of their lines is kept.
+        """
+        if self._time_bounds is None:
+            running_max, running_min = [], []
+            highest, lowest = float('-inf'), float('inf')
+            for _, _, _, block_max in self.time_blocks:
+                if block_max is not None and block_max > highest:
+                    highest = block_max
+                running_max.append(highest)
+            for _, _, block_min, _ in reversed(self.time_blocks):
+                if block_min is not None and block_min < lowest:
+                    lowest = block_min
+                running_min.append(lowest)
+            running_min.reverse()
+            self._time_bounds = running_max, running_min
+
+        running_max, running_min = self._time_bounds
+        first = bisect.bisect_left(running_max, start_ms)
+        last = bisect.bisect_right(running_min, end_ms) - 1
+        if first > last:
+            return None
+        return first, last
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import uuid
+from collections import namedtuple
+
+from line_index import HEAD_HASH_SIZE, LineIndex
+from log_parser import LogParser
+from log_reader import complete_lines_end, detect_encoding, is_compressed, iter_log_lines
+from html_output import write_timeline_html
+from timeline import LIVE_LINE_STYLES, WEBGL_POINT_THRESHOLD, LiveProgress, TimelineBuilder
+
+# Seconds between two looks at a followed log
+DEFAULT_POLL_INTERVAL = 2.0
+
+# reset: the log was rotated or truncated and the store was started over
+# first_row: the first store row added by this poll
+FollowUpdate = namedtuple('FollowUpdate', ['reset', 'first_row'])
+
+# After this many chunks the live page is written again with all its data, so that the chunk files do
+# not pile up (and a reopened page does not replay all of them)
+LIVE_CHUNK_LIMIT = 500
+
+# Draws the live page from its chunk files (see LiveTimeline) and keeps the x-axis zoom across reloads.
+# A chunk that is not there yet is tried again after POLL_MS; the page reloads when generation.js
+# names another page.
+_LIVE_SCRIPT = """
+var plot = document.getElementById('{plot_id}');
+var savedRange = sessionStorage.getItem('grapholog-xrange');
+if (savedRange) {
+    Plotly.relayout(plot, {'xaxis.range': JSON.parse(savedRange)});
+}
+plot.on('plotly_relayout', function (update) {
+    if (update['xaxis.range[0]'] !== undefined) {
+        var range = [update['xaxis.range[0]'], update['xaxis.range[1]']];
+        sessionStorage.setItem('grapholog-xrange', JSON.stringify(range));
+    } else if (update['xaxis.autorange']) {
+        sessionStorage.removeItem('grapholog-xrange');
+    }
+});
+
+var nextChunk = 0;
+var applied = Promise.resolve();
+
+function loadScript(src, onload, onerror) {
+    var script = document.createElement('script');
+    script.src = src + '?' + Date.now();
+    script.onload = function () { script.remove(); if (onload) onload(); };
+    script.onerror = function () { script.remove(); if (onerror) onerror(); };
+    document.head.appendChild(script);
+}
+
+function pollChunk() {
+    loadScript(LIVE_DIR + GENERATION + '_' + nextChunk + '.js', null, function () {
+        var wait = function () { setTimeout(pollChunk, POLL_MS); };
+        loadScript(LIVE_DIR + 'generation.js', wait, wait);
+    });
+}
+
+// Appends updates[i] to trace first + i, in one call for all the traces with new points
+function extend(updates, first) {
+    var extension = {};
+    var traces = [];
+    updates.forEach(function (update, i) {
+        if (!update.x.length) {
+            return;
+        }
+        traces.push(first + i);
+        for (var key in update) {
+            (extension[key] = extension[key] || []).push(update[key]);
+        }
+    });
+    return traces.length ? Plotly.extendTraces(plot, extension, traces) : Promise.resolve();
+}
+
+// Cuts the line traces back to the given lengths, before the segments after them are sent again
+function truncate(lengths) {
+    var update = {x: [], y: []};
+    var traces = [];
+    (lengths || []).forEach(function (length, i) {
+        if (length < plot.data[i].x.length) {
+            traces.push(i);
+            update.x.push(plot.data[i].x.slice(0, length));
+            update.y.push(plot.data[i].y.slice(0, length));
+        }
+    });
+    return traces.length ? Plotly.restyle(plot, update, traces) : Promise.resolve();
+}
+
+function applyChunk(chunk) {
+    var tail = {};
+    for (var key in chunk.tail) {
+        tail[key] = [chunk.tail[key]];
+    }
+    return truncate(chunk.truncate)
+        .then(function () { return extend(chunk.lines, 0); })
+        .then(function () { return extend([chunk.markers], LINE_COUNT); })
+        .then(function () { return Plotly.restyle(plot, tail, [LINE_COUNT + 1]); })
+        .then(function () { return extend([chunk.violations].concat(chunk.info), LINE_COUNT + 2); })
+        .then(function () { return Plotly.relayout(plot, chunk.layout); });
+}
+
+window.graphologLive = function (chunk) {
+    nextChunk += 1;
+    applied = applied.then(function () { return applyChunk(chunk); }).then(pollChunk);
+};
+window.graphologGeneration = function (generation) {
+    if (generation !== GENERATION) {
+        location.reload();
+    }
+};
+pollChunk();
+"""
+
+
+def _write_atomically(path, text):
+    """Write text to path through a temporary file, so the page never loads half of it."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+def _head_hash(log_path, length):
+    with open(log_path, 'rb') as file:
+        return hashlib.sha1(file.read(length)).hexdigest()
+
+
+class LogFollower:
+    """
+    Follows a growing log: every `poll` parses only the complete lines appended since the last one.
+
+    The LogParser state (current_y, MAC registry, last timestamp) is kept between polls. A line
+    the writer has not finished is left for the next poll. A rotated log (a new file at the path),
+    a truncated one or one whose head was rewritten is parsed again from the top.
+    """
+
+    def __init__(self, log_path, start_line=0, time_window=None):
+        if is_compressed(log_path):
+            raise ValueError(f"{log_path} is compressed and cannot be followed")
+        self.log_path = log_path
+        self.start_line = start_line
+        # (start, end) datetimes: only the lines timestamped within it are kept, see LogParser
+        self.time_window = time_window
+        self._reset()
+
+    def _reset(self):
+        self.encoding = None
+        self.parser = None
+        self.position = (0, 0)
+        self._identity = None
+        self._started_empty = False
+        self._head_length = 0
+        self._head_hash = None
+
+    def _start(self, stat):
+        self.encoding = detect_encoding(self.log_path).encoding
+        self.parser = LogParser(self.log_path, self.encoding, time_window=self.time_window)
+        self.position = (0, 0)
+        self._identity = (stat.st_dev, stat.st_ino)
+        # The encoding of an empty log is only a guess, so it is detected again once text arrives
+        self._started_empty = stat.st_size == 0
+        if self.start_line:
+            # Seek to the nearest indexed line start before the window, if the index has one
+            self.position = LineIndex.load(self.log_path, self.encoding).checkpoint_before(self.start_line).position
+
+    def _replaced(self, stat):
+        if (stat.st_dev, stat.st_ino) != self._identity or stat.st_size < self.position[1]:
+            return True
+        return bool(self._head_length) and _head_hash(self.log_path, self._head_length) != self._head_hash
+
+    def _update_head(self, stat):
+        # The head hash covers up to HEAD_HASH_SIZE bytes, so it grows with a log that is still short
+        if self._head_length < HEAD_HASH_SIZE and stat.st_size > self._head_length:
+            self._head_length = min(stat.st_size, HEAD_HASH_SIZE)
+            self._head_hash = _head_hash(self.log_path, self._head_length)
+
+    def poll(self):
+        """
+        Parse the lines appended since the last poll. Returns a FollowUpdate, or None when there
+        is nothing new (or the log does not exist right now, e.g. in the middle of a rotation).
+        """
+        try:
+            stat = os.stat(self.log_path)
+        except OSError:
+            return None
+
+        reset = False
+        if self.parser is not None and self._replaced(stat):
+            self._reset()
+            reset = True
+        if self.parser is None or (self._started_empty and stat.st_size > 0):
+            self._start(stat)
+        self._update_head(stat)
+
+        offset = self.position[1]
+        end_offset = complete_lines_end(self.log_path, self.encoding, offset)
+        if end_offset <= offset and not reset:
+            return None
+
+        store = self.parser.store
+        store.reopen()
+        first_row = len(store)
+        consumed_before = self.parser.next_line_number
+        self.parser.consume(iter_log_lines(self.log_path, self.encoding, self.start_line, None,
+                                           self.position, end_offset))
+        if self.parser.next_line_number > consumed_before:
+            # Until a start_line window is reached, its lines are skipped again from the same position
+            self.position = (self.parser.next_line_number, end_offset)
+        store.finish(self.parser.end_timestamp)
+        return FollowUpdate(reset, first_row)
+
+    def result(self):
+        """Return (event_store, mac_registry, last_log_timestamp) for everything parsed so far."""
+        if self.parser is None:
+            return LogParser(self.log_path).result()
+        return self.parser.result()
+
+
+class LiveTimeline:
+    """
+    A LogFollower feeding a TimelineBuilder: each `update` adds the new events to the timeline
+    and sends them to the page at output_filename.
+
+    The page is written once, as the empty frame of TimelineBuilder.live_figure. Its points come in
+    chunk files in the <name>_live directory next to it, one per update, which hold only what that
+    update added (see TimelineBuilder.live_update); the page loads them in turn and appends them
+    with Plotly.extendTraces, looking for the next one every refresh_seconds. The page is only
+    written again, as a new generation that the open page reloads to, when the log was rotated,
+    when the points grow past WEBGL_POINT_THRESHOLD, or after LIVE_CHUNK_LIMIT chunks.
+    """
+
+    def __init__(self, log_path, output_filename, start_line=0, title="WiFi Connectivity Timeline",
+                 refresh_seconds=DEFAULT_POLL_INTERVAL, time_window=None):
+        self.follower = LogFollower(log_path, start_line, time_window)
+        self.builder = TimelineBuilder()
+        self.output_filename = output_filename
+        self.title = title
+        self.refresh_seconds = refresh_seconds
+        self.chunk_dir = os.path.splitext(output_filename)[0] + '_live'
+        self.generation = None
+        self.chunk_count = 0
+        # What the page has been sent, None until it is written
+        self.progress = None
+
+    def update(self, auto_open=False):
+        """
+        Poll the log and send the page what changed. Returns True when the page or a chunk was
+        written; auto_open opens the page in the browser when it is written.
+        """
+        update = self.follower.poll()
+        if update is None:
+            return False
+        if update.reset:
+            self.builder = TimelineBuilder()
+        self.builder.add_events(self.follower.parser.store, update.first_row)
+
+        progress = self.progress
+        if (progress is None or update.reset or self.chunk_count >= LIVE_CHUNK_LIMIT
+                or (not progress.webgl and len(self.builder.connectivity_x_values) > WEBGL_POINT_THRESHOLD)):
+            self._write_page(auto_open)
+        else:
+            self._write_chunk(self.builder.live_update(self.follower.parser.mac_registry, progress))
+        return True
+
+    def _write_page(self, auto_open):
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        for name in os.listdir(self.chunk_dir):
+            os.remove(os.path.join(self.chunk_dir, name))
+        self.generation = uuid.uuid4().hex
+        self.chunk_count = 0
+        self.progress = LiveProgress(webgl=len(self.builder.connectivity_x_values) > WEBGL_POINT_THRESHOLD)
+
+        fig = self.builder.live_figure(self.title, self.progress.webgl)
+        live_script = (_LIVE_SCRIPT.replace('POLL_MS', str(int(self.refresh_seconds * 1000)))
+                       .replace('LIVE_DIR', json.dumps(os.path.basename(self.chunk_dir) + '/'))
+                       .replace('GENERATION', json.dumps(self.generation))
+                       .replace('LINE_COUNT', str(len(LIVE_LINE_STYLES))))
+        self._write_chunk(self.builder.live_update(self.follower.parser.mac_registry, self.progress))
+        write_timeline_html(fig, self.output_filename, auto_open=auto_open, post_script=live_script)
+        # Written last: a page still showing the previous generation reloads once it sees this
+        _write_atomically(os.path.join(self.chunk_dir, 'generation.js'),
+                          f"graphologGeneration({json.dumps(self.generation)});\n")
+
+    def _write_chunk(self, chunk):
+        path = os.path.join(self.chunk_dir, f"{self.generation}_{self.chunk_count}.js")
+        _write_atomically(path, f"graphologLive({json.dumps(chunk, separators=(',', ':'))});\n")
+        self.chunk_count += 1
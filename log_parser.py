@@ -0,0 +1,398 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+from event_store import EventStore, KIND_EVENT, KIND_MAC
+from flow_validator import FlowValidator, compile_flow_rules
+from line_index import LineIndex, TIME_BLOCK_INTERVAL
+from mac_registry import MacRegistry
+from log_reader import detect_encoding, is_compressed, iter_log_lines, log_stat
+from profiler import profile_stage, profiled_matcher
+from progress import tracked
+from pattern_matcher import PatternMatcher, TIMESTAMP_REGEX, RSSI_REGEX
+from timestamp_parser import TimestampParser, parse_time_bound, to_epoch_ms
+
+
+# Load patterns from JSON file
+def load_patterns():
+    pattern_dirs = [os.path.dirname(os.path.abspath(__file__))]
+    if getattr(sys, 'frozen', False):
+        pattern_dirs.append(os.path.dirname(sys.executable))
+
+    for pattern_dir in pattern_dirs:
+        pattern_path = os.path.join(pattern_dir, 'patterns.json')
+        if os.path.exists(pattern_path):
+            break
+
+    with open(pattern_path, 'r') as file:
+        return json.load(file)
+
+patterns = load_patterns()
+connectivity_patterns = patterns['connectivity_patterns']
+info_patterns = patterns['info_patterns']
+# (color, marker symbol) of each connectivity status on the timeline, see timeline.pattern_styles
+status_styles = patterns['status_styles']
+matcher = PatternMatcher(patterns)
+flow_rules = compile_flow_rules(patterns['flow_rules'], matcher)
+
+
+class LogParser:
+    """
+    Incremental parser state: feed it lines with `consume` and collect the result with `result`.
+
+    The state (current_y, MAC registry, last timestamp) survives between calls,
+    so a parse can be resumed from a line-index checkpoint or continued as the log grows.
+
+    With a time_window (start, end), every line still drives the state but only the lines
+    timestamped within the window (lines without a timestamp take the last one) add rows and
+    lanes; window_last_timestamp is the last such timestamp.
+
+    The flow rules are checked on every connectivity event as it is parsed (see flow_validator),
+    those before a time window included, so the violations are in the store when the parse ends.
+
+    With an exporter (an event_export.EventExporter), every complete row group is exported as soon
+    as the parse has added it; the caller closes the exporter with the final store.
+    """
+
+    def __init__(self, log_path=None, encoding=None, checkpoint=None, time_window=None, exporter=None):
+        self.store = EventStore(log_path, encoding)
+        self.seen_ap_PD_timestamps = set()
+        self.current_y = "disconnected"
+        self.mac_registry = MacRegistry()
+        self.last_log_timestamp = None
+        self.next_line_number = 0
+        self.timestamp_parser = TimestampParser()
+        self.time_window = time_window
+        self.window_last_timestamp = None
+        self.matcher = profiled_matcher(matcher)
+        self.validator = FlowValidator(flow_rules)
+        self.exporter = exporter
+        if checkpoint is not None:
+            self.current_y = checkpoint.current_y
+            self.mac_registry = checkpoint.mac_registry.copy()
+            self.last_log_timestamp = checkpoint.last_log_timestamp
+
+    def consume(self, lines, index=None):
+        """
+        Parse (line_number, byte_offset, line) tuples. When an index is given, a checkpoint with
+        the current state is added to it every time a checkpoint line is reached, and a time block
+        every TIME_BLOCK_INTERVAL lines.
+        """
+        store = self.store
+        append_row = store.append if self.exporter is None else self._append_and_export
+        check_flow = self.validator.check
+        mac_registry = self.mac_registry
+        current_y = self.current_y
+        last_log_timestamp = self.last_log_timestamp
+        seen_ap_PD_timestamps = self.seen_ap_PD_timestamps
+        line_number = None
+
+        track_blocks = index is not None
+        if track_blocks:
+            next_checkpoint_line = index.next_checkpoint_line()
+            next_block_line = index.next_time_block_line()
+            block_start = None
+            block_min, block_max = datetime.max, datetime.min
+        else:
+            next_block_line = None
+
+        time_window = self.time_window
+        recording = True
+        if time_window is not None:
+            window_start, window_end = time_window
+            window_last_timestamp = self.window_last_timestamp
+            recording = False
+
+        matcher = self.matcher
+        is_candidate = matcher.is_candidate
+        parse_timestamp = self.timestamp_parser.parse
+
+        for line_number, byte_offset, line in lines:
+            if next_block_line is not None and line_number >= next_block_line:
+                if block_start is not None:
+                    if block_min > block_max:
+                        block_min = block_max = None
+                    index.add_time_block(*block_start, block_min, block_max, (line_number, byte_offset))
+                if line_number >= next_checkpoint_line:
+                    index.add_checkpoint(line_number, byte_offset, current_y, last_log_timestamp, mac_registry)
+                    next_checkpoint_line = index.next_checkpoint_line()
+                block_start = line_number, byte_offset
+                block_min, block_max = datetime.max, datetime.min
+                if last_log_timestamp is not None:
+                    block_min = block_max = last_log_timestamp
+                next_block_line = line_number + TIME_BLOCK_INTERVAL
+
+            # The line timestamp is parsed once and reused by every pattern that captures the same text.
+            line_timestamp_text = None
+            timestamp_match = TIMESTAMP_REGEX.search(line)
+            if timestamp_match:
+                line_timestamp_text = timestamp_match.group(1)
+                last_log_timestamp = parse_timestamp(line_timestamp_text)
+                if track_blocks:
+                    if last_log_timestamp < block_min:
+                        block_min = last_log_timestamp
+                    if last_log_timestamp > block_max:
+                        block_max = last_log_timestamp
+
+            if time_window is not None:
+                in_window = last_log_timestamp is not None and window_start <= last_log_timestamp <= window_end
+                if in_window:
+                    window_last_timestamp = last_log_timestamp
+                    # The BSSID connected when the window is entered needs its lane even if its hit was outside
+                    if not recording and current_y != "disconnected" and current_y not in mac_registry:
+                        mac_registry.touch(current_y, last_log_timestamp)
+                recording = in_window
+
+            # Almost every line carries none of the pattern anchors, so skip them after a single scan.
+            if not is_candidate(line):
+                continue
+
+            for pattern in matcher.mac_patterns:
+                match = pattern.search(line)
+                if match:
+                    mac = match.group(1)
+                    if recording:
+                        append_row(KIND_MAC, last_log_timestamp, "MAC Address Detected", mac, current_y, None,
+                                   "MAC Address", line_number, byte_offset, pattern.pattern_id)
+                        mac_registry.touch(mac, last_log_timestamp)
+
+                    current_y = mac
+
+            match = matcher.beacon_pattern.search(line)
+            if match:
+                mac = match.group("mac")
+                mac_registry.set_info(mac, match.group("ssid"), match.group("band"), match.group("channel"))
+
+            # Events are de-duplicated on (line number, timestamp). Only events of the current
+            # line can share its line number, so the key set is scoped to the line.
+            line_event_timestamps = set()
+            for pattern in matcher.connectivity_patterns:
+                match = pattern.search(line)
+                if match:
+                    timestamp_text = match.group(1)
+                    if timestamp_text == line_timestamp_text:
+                        timestamp = last_log_timestamp
+                    else:
+                        timestamp = parse_timestamp(timestamp_text)
+                    mac = current_y
+
+                    rssi_value = None
+                    if pattern.status == "Attempt_to_connect":
+                        rssi_match = RSSI_REGEX.search(line)
+                        if rssi_match:
+                            rssi_value = rssi_match.group(1)
+
+                    if timestamp not in line_event_timestamps:
+                        line_event_timestamps.add(timestamp)
+                        current_y = "disconnected" if mac is None or pattern.status == "disconnected" or pattern.status == "connection_failed" else mac
+                        # The flow rules follow the events before a time window too, only the rows are not kept
+                        violations = check_flow(len(store), pattern.pattern_id, current_y, timestamp)
+                        if recording:
+                            append_row(KIND_EVENT, timestamp, pattern.status, mac, current_y, rssi_value, None,
+                                       line_number, byte_offset, pattern.pattern_id, violations)
+
+            for pattern in matcher.info_patterns:
+                match = pattern.search(line)
+                if match:
+                    timestamp_text = match.group(1)
+                    if timestamp_text == line_timestamp_text:
+                        timestamp = last_log_timestamp
+                    else:
+                        timestamp = parse_timestamp(timestamp_text)
+
+                    if current_y is not None and recording:
+                        if pattern.name != "AP poorly disc":
+                            append_row(KIND_EVENT, timestamp, pattern.status, current_y, current_y, None, pattern.name,
+                                       line_number, byte_offset, pattern.pattern_id)
+                        elif timestamp not in seen_ap_PD_timestamps:
+                            # "AP poorly disc" is reported once per timestamp
+                            append_row(KIND_EVENT, timestamp, pattern.status, current_y, current_y, None, pattern.name,
+                                       line_number, byte_offset, pattern.pattern_id)
+                            seen_ap_PD_timestamps.add(timestamp)
+
+        self.current_y = current_y
+        self.last_log_timestamp = last_log_timestamp
+        if time_window is not None:
+            self.window_last_timestamp = window_last_timestamp
+        if line_number is not None:
+            self.next_line_number = line_number + 1
+
+    def _append_and_export(self, *row):
+        self.store.append(*row)
+        exporter = self.exporter
+        if len(self.store) - exporter.rows_exported >= exporter.row_group_size:
+            exporter.write(self.store)
+
+    @property
+    def end_timestamp(self):
+        """Where the "end" point goes: the last timestamp parsed, or the last one in the time window."""
+        return self.last_log_timestamp if self.time_window is None else self.window_last_timestamp
+
+    def result(self):
+        """Return (event_store, mac_registry, last_log_timestamp), with the "end" point in place."""
+        self.store.finish(self.end_timestamp)
+        return self.store, self.mac_registry, self.end_timestamp
+
+
+def parse_log(log_path, start_line=0, end_line=None, use_index=True, start_time=None, end_time=None, progress=None,
+              exporter=None):
+    """
+    Parse lines start_line <= n < end_line of the log (end_line=None parses to the end).
+    The file is streamed line by line, so memory grows with the events found, not the file size.
+
+    With use_index, a sidecar line index is used to seek to the nearest checkpoint before
+    start_line; it is built or extended as a side effect of parsing. Compressed logs have to be
+    decompressed up to the window anyway, so they are not indexed.
+
+    start_time/end_time (datetimes, either may be None for an open end) parse a timestamp window
+    of the whole log instead, see parse_time_window; start_line and end_line are ignored then.
+
+    progress (a ParseProgress) is told how far the parse got and can cancel it. exporter (an
+    EventExporter) is given the rows a row group at a time while they are parsed, see LogParser.
+    """
+    if start_time is not None or end_time is not None:
+        return parse_time_window(log_path, start_time, end_time, use_index, progress, exporter)
+
+    with profile_stage("detect_encoding"):
+        encoding = detect_encoding(log_path).encoding
+    with profile_stage("parse"):
+        return _parse_line_window(log_path, encoding, start_line, end_line, use_index, progress, exporter)
+
+
+def _parse_line_window(log_path, encoding, start_line, end_line, use_index, progress=None, exporter=None):
+    parser = LogParser(log_path, encoding, exporter=exporter)
+    if not use_index or is_compressed(log_path):
+        parser.consume(tracked(iter_log_lines(log_path, encoding, start_line, end_line), progress, parser.store,
+                               log_path))
+        return parser.result()
+
+    index = LineIndex.load(log_path, encoding)
+    if start_line == 0:
+        # Parsing from the top yields exactly the state the checkpoints describe, so index along the way
+        size = log_stat(log_path).st_size
+        parser.consume(tracked(iter_log_lines(log_path, encoding, 0, end_line), progress, parser.store, log_path),
+                       index=index)
+        if end_line is None:
+            index.set_indexed_size(size)
+    else:
+        if index.next_checkpoint_line() <= start_line:
+            extend_index(index, start_line, progress)
+        checkpoint = index.checkpoint_before(start_line)
+        # A window is still parsed from a fresh state, as if the log started at start_line
+        parser.consume(tracked(iter_log_lines(log_path, encoding, start_line, end_line, checkpoint.position),
+                               progress, parser.store, log_path))
+    index.save()
+
+    return parser.result()
+
+
+def parse_time_window(log_path, start_time=None, end_time=None, use_index=True, progress=None, exporter=None):
+    """
+    Parse the lines of the log timestamped within [start_time, end_time].
+
+    Unlike a line window, the state is not started fresh: current_y is rebuilt by parsing from the
+    checkpoint before the window, so the first event in the window lands on the BSSID the
+    driver was connected to. Lanes are only made for the BSSIDs seen in the window.
+
+    The time blocks of the line index bound the bytes read to the blocks that can hold window
+    lines (see LineIndex.time_block_range), so a window is found by binary search and only the
+    stretch from the checkpoint before it to its end is parsed. A log that is not fully indexed yet
+    is indexed first, once. Lines outside the window inside that stretch (a clock that jumped
+    back, timestamps reset by suspend/resume) still move the state but are not kept.
+    """
+    with profile_stage("detect_encoding"):
+        encoding = detect_encoding(log_path).encoding
+    with profile_stage("parse"):
+        return _parse_time_window(log_path, encoding, (start_time or datetime.min, end_time or datetime.max),
+                                  use_index, progress, exporter)
+
+
+def _parse_time_window(log_path, encoding, time_window, use_index, progress=None, exporter=None):
+    if not use_index or is_compressed(log_path):
+        parser = LogParser(log_path, encoding, time_window=time_window, exporter=exporter)
+        parser.consume(tracked(iter_log_lines(log_path, encoding), progress, parser.store, log_path))
+        return parser.result()
+
+    index = LineIndex.load(log_path, encoding)
+    if index.indexed_size != log_stat(log_path).st_size:
+        extend_index(index, None, progress)
+    index.save()
+
+    byte_range = find_time_range(index, *time_window)
+    if byte_range is None:
+        return LogParser(log_path, encoding, time_window=time_window).result()
+    start_line, end_offset = byte_range
+
+    checkpoint = index.checkpoint_before(start_line)
+    parser = LogParser(log_path, encoding, checkpoint, time_window, exporter)
+    parser.mac_registry = checkpoint.mac_registry.info_copy()
+    lines = iter_log_lines(log_path, encoding, checkpoint.line_number, None, checkpoint.position, end_offset)
+    parser.consume(tracked(lines, progress, parser.store, log_path))
+    return parser.result()
+
+
+def find_time_range(index, start_time, end_time):
+    """
+    Return (start_line, end_offset), the first line and the end (None for the end of the log) of
+    the part of an indexed log that holds the lines timestamped within [start_time, end_time], or
+    None when no line is. The few lines past the last time block are not indexed, so their
+    timestamps are read directly.
+    """
+    block_range = index.time_block_range(to_epoch_ms(start_time), to_epoch_ms(end_time))
+
+    tail_line, tail_offset = index.time_indexed_to
+    timestamp_parser = TimestampParser()
+    tail_in_window = False
+    for _, _, line in iter_log_lines(index.log_path, index.encoding, tail_line, None, index.time_indexed_to):
+        timestamp_match = TIMESTAMP_REGEX.search(line)
+        if timestamp_match and start_time <= timestamp_parser.parse(timestamp_match.group(1)) <= end_time:
+            tail_in_window = True
+            break
+
+    if block_range is None:
+        return (tail_line, None) if tail_in_window else None
+    first, last = block_range
+    return index.time_blocks[first][0], None if tail_in_window else index.time_block_end(last)
+
+
+def parse_window_input(log_path, start_text, end_text):
+    """
+    Turn the window typed in the CLI or the GUI into (start_line, end_line, start_time, end_time).
+    Each end is a line number or a time (anything with a ":", see parse_time_bound) and may be
+    left empty; a window is either in lines or in time. Raises ValueError.
+    """
+    start_text, end_text = start_text.strip(), end_text.strip()
+    if ':' not in start_text and ':' not in end_text:
+        return int(start_text) if start_text else 0, int(end_text) if end_text else None, None, None
+    if (start_text and ':' not in start_text) or (end_text and ':' not in end_text):
+        raise ValueError("give both ends of the window as times, or both as line numbers")
+    log_start = first_log_timestamp(log_path)
+    start_time = parse_time_bound(start_text, log_start) if start_text else None
+    end_time = parse_time_bound(end_text, start_time or log_start) if end_text else None
+    return 0, None, start_time, end_time
+
+
+def first_log_timestamp(log_path, encoding=None):
+    """The first timestamp in the log, or None when it has none."""
+    encoding = encoding or detect_encoding(log_path).encoding
+    timestamp_parser = TimestampParser()
+    for _, _, line in iter_log_lines(log_path, encoding):
+        timestamp_match = TIMESTAMP_REGEX.search(line)
+        if timestamp_match:
+            return timestamp_parser.parse(timestamp_match.group(1))
+    return None
+
+
+def extend_index(index, up_to_line, progress=None):
+    """
+    Parse from the last checkpoint to up_to_line, only to add the checkpoints and time blocks in
+    between. up_to_line=None indexes the whole log.
+    """
+    checkpoint = index.last_checkpoint
+    size = log_stat(index.log_path).st_size
+    parser = LogParser(index.log_path, index.encoding, checkpoint)
+    lines = iter_log_lines(index.log_path, index.encoding, checkpoint.line_number, up_to_line, checkpoint.position)
+    parser.consume(tracked(lines, progress, parser.store, index.log_path), index=index)
+    if up_to_line is None:
+        index.set_indexed_size(size)
@@ -0,0 +1,414 @@
+import codecs
+import fnmatch
+import functools
+import gzip
+import io
+import os
+import re
+import zipfile
+from collections import namedtuple
+import chardet
+
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+COMPRESSED_SUFFIXES = ('.gz', '.zst', '.zip')
+# Names a log inside an archive: "bundle.zip::logs/wifi.log"
+MEMBER_SEPARATOR = '::'
+
+# The lines of a b"\n"-terminated chunk that also holds lone b"\r" line breaks
+_CR_LINES = re.compile(rb"[^\r\n]*(?:\r\n?|\n)|[^\r\n]+")
+_TEXT_LINE_BREAK = re.compile(r"\r\n|\r(?=[^\n])|\n")
+
+EncodingResult = namedtuple('EncodingResult', ['encoding', 'confidence', 'method'])
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def split_member(log_path):
+    """Split "archive.zip::member" into (archive path, member name); member is None for a plain path."""
+    archive_path, separator, member = log_path.partition(MEMBER_SEPARATOR)
+    return archive_path, (member if separator else None)
+
+
+def is_compressed(log_path):
+    """True for logs read through a decompressor: .gz and .zst files and archive members."""
+    archive_path, member = split_member(log_path)
+    return member is not None or archive_path.lower().endswith(COMPRESSED_SUFFIXES)
+
+
+def archive_members(archive_path, pattern=None):
+    """The file members of a .zip archive (optionally only those whose name matches pattern)."""
+    with zipfile.ZipFile(archive_path) as archive:
+        members = [info.filename for info in archive.infolist() if not info.is_dir()]
+    if pattern is not None:
+        members = [member for member in members if fnmatch.fnmatch(os.path.basename(member), pattern)]
+    return members
+
+
+def log_stat(log_path):
+    """os.stat of the file holding the log, i.e. of the archive for an archive member."""
+    return os.stat(split_member(log_path)[0])
+
+
+def log_exists(log_path):
+    return os.path.isfile(split_member(log_path)[0])
+
+
+def log_base_name(log_path):
+    """The log file name without its directory, archive and extensions, used to name outputs."""
+    name = os.path.basename(split_member(log_path)[1] or log_path)
+    if name.lower().endswith(COMPRESSED_SUFFIXES):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+
+class _ZstdLogFile(io.RawIOBase):
+    """
+    A .zst log as a seekable raw stream. Forward seeks decompress and discard,
+    backward seeks start decompressing over, so memory use stays at one window.
+    """
+
+    def __init__(self, path):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(f"Reading {path} needs the zstandard package (pip install zstandard)") from None
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._path = path
+        self._file = None
+        self._rewind()
+
+    def _rewind(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._path, 'rb')
+        self._reader = self._decompressor.stream_reader(self._file, read_across_frames=True)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._reader.readinto(buffer)
+        self._position += count
+        return count
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("the decompressed size of a .zst log is not known")
+        if offset < self._position:
+            self._rewind()
+        while self._position < offset:
+            skipped = len(self._reader.read(min(offset - self._position, 1024 * 1024)))
+            if not skipped:
+                break
+            self._position += skipped
+        return self._position
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+def open_log(log_path):
+    """
+    Open the log as a binary file of its decompressed text. Plain files are opened directly;
+    .gz, .zst and zip members are decompressed as they are read, never in full. The streams can
+    seek, but a seek decompresses everything up to the target, so readers should move forward.
+    """
+    archive_path, member = split_member(log_path)
+    lower_path = archive_path.lower()
+    if lower_path.endswith('.zip'):
+        archive = zipfile.ZipFile(archive_path)
+        if member is None:
+            members = archive_members(archive_path)
+            if len(members) != 1:
+                archive.close()
+                raise ValueError(f"{archive_path} holds {len(members)} files, "
+                                 f"open one of them as {archive_path}{MEMBER_SEPARATOR}<member>")
+            member = members[0]
+        # The member keeps the archive file open until the member itself is closed
+        file = archive.open(member)
+        archive.close()
+        return file
+    if lower_path.endswith('.gz'):
+        return gzip.open(archive_path, 'rb')
+    if lower_path.endswith('.zst'):
+        return io.BufferedReader(_ZstdLogFile(archive_path), buffer_size=1024 * 1024)
+    return open(archive_path, 'rb')
+
+
+def detect_encoding(log_path):
+    """
+    Detect the log encoding from a bounded sample of the file.
+
+    BOMs are checked first, then the head, middle and tail blocks are validated as UTF-8 and
+    UTF-16, and chardet only runs on the sample when neither fits. Results are cached per
+    (path, size, mtime), so re-plotting an unchanged log skips detection entirely.
+    Returns an EncodingResult(encoding, confidence, method).
+    """
+    stat = log_stat(log_path)
+    return _detect_encoding_cached(os.path.abspath(log_path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _detect_encoding_cached(log_path, size, mtime_ns):
+    with open_log(log_path) as file:
+        head = file.read(4)
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                return EncodingResult(encoding, 1.0, 'bom')
+        if is_compressed(log_path):
+            # The decompressed size is not known without decompressing it all, so sample the head
+            file.seek(0)
+            blocks = [file.read(3 * SAMPLE_BLOCK_SIZE)]
+            cut_at_end = bool(file.read(1))
+        else:
+            blocks = _read_sample_blocks(file, size)
+            cut_at_end = False
+
+    if not any(blocks):
+        return EncodingResult('utf-8', 1.0, 'empty')
+
+    # UTF-16 goes first: its NUL-padded ASCII is also valid UTF-8
+    utf16_encoding = _guess_utf16_without_bom(blocks)
+    if utf16_encoding:
+        return EncodingResult(utf16_encoding, 0.95, 'utf-16-validation')
+
+    if all(_is_valid_utf8_block(block, i > 0, i < len(blocks) - 1 or cut_at_end) for i, block in enumerate(blocks)):
+        return EncodingResult('utf-8', 1.0, 'utf-8-validation')
+
+    result = chardet.detect(b''.join(blocks))
+    return EncodingResult(result['encoding'] or 'utf-8', result['confidence'] or 0.0, 'chardet-sample')
+
+
+def _read_sample_blocks(file, size):
+    if size <= 3 * SAMPLE_BLOCK_SIZE:
+        file.seek(0)
+        return [file.read()]
+
+    # Offsets are kept 4-byte aligned so UTF-16/32 code units are not split at the block start
+    file.seek(0)
+    head = file.read(SAMPLE_BLOCK_SIZE)
+    file.seek((size // 2) & ~3)
+    middle = file.read(SAMPLE_BLOCK_SIZE)
+    file.seek((size - SAMPLE_BLOCK_SIZE) & ~3)
+    tail = file.read()
+    return [head, middle, tail]
+
+
+def _is_valid_utf8_block(block, cut_at_start, cut_at_end):
+    if cut_at_start:
+        # Skip continuation bytes of a character that started before the block
+        skip = 0
+        while skip < 3 and skip < len(block) and 0x80 <= block[skip] <= 0xBF:
+            skip += 1
+        block = block[skip:]
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        # final=False tolerates a character cut at the end of the block
+        decoder.decode(block, final=not cut_at_end)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _guess_utf16_without_bom(blocks):
+    sample = b''.join(block[:len(block) & ~1] for block in blocks)
+    if len(sample) < 2:
+        return None
+    even_zeros = sample[0::2].count(0)
+    odd_zeros = sample[1::2].count(0)
+    half = len(sample) // 2
+    # Mostly-ASCII text in UTF-16 has a zero high byte in nearly every code unit
+    if odd_zeros > 0.4 * half and even_zeros < 0.05 * half:
+        encoding = 'utf-16-le'
+    elif even_zeros > 0.4 * half and odd_zeros < 0.05 * half:
+        encoding = 'utf-16-be'
+    else:
+        return None
+    try:
+        for block in blocks:
+            codecs.getincrementaldecoder(encoding)().decode(block, final=False)
+    except UnicodeDecodeError:
+        return None
+    return encoding
+
+
+def is_ascii_compatible(encoding):
+    # Encodings such as UTF-16 spread "\n" over several bytes, so lines cannot be split on b"\n".
+    return "a\n".encode(encoding).endswith(b"a\n")
+
+
+def iter_log_lines(log_path, encoding, start_line=0, end_line=None, start_position=(0, 0), end_offset=None):
+    """
+    Lazily yield (line_number, byte_offset, line) for lines start_line <= line_number < end_line.
+
+    Lines are split on "\n", "\r\n" and a lone "\r", as text mode does, and decoded one at a
+    time, so memory use does not depend on the file size. Reading stops at end_line;
+    end_line=None reads to the end of the file.
+    start_position is a known (line_number, byte_offset) line start to seek to before reading,
+    e.g. a checkpoint from the line index. end_offset stops before the first line starting at
+    or after that byte, which is how a byte range from split_line_ranges is read.
+    """
+    if end_line is not None and end_line <= start_line:
+        return
+
+    if not is_ascii_compatible(encoding):
+        yield from _iter_decoded_lines(log_path, encoding, start_line, end_line, start_position, end_offset)
+        return
+
+    first_line_number, offset = start_position
+    with open_log(log_path) as file:
+        file.seek(offset)
+        for line_number, raw_line in enumerate(_split_lone_cr(file), start=first_line_number):
+            if end_line is not None and line_number >= end_line:
+                break
+            if end_offset is not None and offset >= end_offset:
+                break
+            if line_number >= start_line:
+                yield line_number, offset, raw_line.decode(encoding, errors='replace')
+            offset += len(raw_line)
+
+
+def _split_lone_cr(raw_lines):
+    # Iterating a binary file only breaks lines at b"\n"; the rare line holding a "\r" anywhere
+    # but before its "\n" is split again with a regex, so the common line costs one find.
+    for raw_line in raw_lines:
+        cr = raw_line.find(b"\r")
+        if cr < 0 or cr == len(raw_line) - 2 and raw_line[-1:] == b"\n":
+            yield raw_line
+        else:
+            yield from _CR_LINES.findall(raw_line)
+
+
+def _iter_decoded_lines(log_path, encoding, start_line, end_line, start_position, end_offset):
+    # Fallback for multi-byte newline encodings: decode in text mode and recompute the byte
+    # offsets from the encoded length of each line.
+    first_line_number, offset = start_position
+    with open_log(log_path) as raw_file:
+        encoding, bom_length = _pin_byte_order(raw_file, encoding)
+        offset = max(offset, bom_length)
+        raw_file.seek(offset)
+
+        file = io.TextIOWrapper(raw_file, encoding=encoding, errors='replace', newline='')
+        for line_number, line in enumerate(file, start=first_line_number):
+            if end_line is not None and line_number >= end_line:
+                break
+            if end_offset is not None and offset >= end_offset:
+                break
+            if line_number >= start_line:
+                yield line_number, offset, line
+            offset += len(line.encode(encoding))
+
+
+def split_line_ranges(log_path, chunk_size):
+    """
+    Split the file into consecutive (start_offset, end_offset) byte ranges of about chunk_size
+    bytes, each starting at a line start. Only valid for uncompressed logs in ASCII-compatible encodings.
+    """
+    size = os.path.getsize(log_path)
+    boundaries = [0]
+    with open(log_path, 'rb') as file:
+        while boundaries[-1] + chunk_size < size:
+            # Move the cut to the start of the next line
+            file.seek(boundaries[-1] + chunk_size - 1)
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def complete_lines_end(log_path, encoding, start_offset):
+    """
+    Return the byte offset just past the last "\n" at or after start_offset, i.e. the end of the
+    complete lines. A line the writer has not finished yet lies past it and is left for later.
+    Returns start_offset when no complete line follows it. Only valid for uncompressed logs.
+    """
+    with open(log_path, 'rb') as file:
+        newline, base = b"\n", 0
+        if not is_ascii_compatible(encoding):
+            encoding, base = _pin_byte_order(file, encoding)
+            newline = "\n".encode(encoding)
+        unit = len(newline)
+        start_offset = max(start_offset, base)
+        end = file.seek(0, io.SEEK_END)
+
+        # Scan backwards from the end in blocks aligned to the code unit size
+        while end > start_offset:
+            block_start = max(start_offset, end - SAMPLE_BLOCK_SIZE)
+            block_start -= (block_start - base) % unit
+            file.seek(block_start)
+            block = file.read(end - block_start)
+            position = block.rfind(newline)
+            while position >= 0 and (block_start + position - base) % unit:
+                # A match straddling two code units is not a newline
+                position = block.rfind(newline, 0, position + unit - 1)
+            if position >= 0:
+                return block_start + position + unit
+            end = block_start
+    return start_offset
+
+
+def _pin_byte_order(raw_file, encoding):
+    # A BOM-detected UTF-16/32 file cannot be decoded from the middle with the BOM codec,
+    # so pin the byte order from the BOM and report its length so it can be skipped.
+    raw_file.seek(0)
+    bom = raw_file.read(4)
+    for bom_bytes, bom_encoding in _BOMS:
+        if bom.startswith(bom_bytes) and codecs.lookup(bom_encoding) == codecs.lookup(encoding):
+            little_endian = bom_bytes in (codecs.BOM_UTF16_LE, codecs.BOM_UTF32_LE)
+            return bom_encoding + ('-le' if little_endian else '-be'), len(bom_bytes)
+    return encoding, 0
+
+
+def read_lines_at(log_path, encoding, byte_offsets):
+    """
+    Yield the line starting at each of byte_offsets, in order, from a single open handle.
+    Used to fetch line text lazily for the few lines that are actually displayed or exported.
+    Ascending offsets keep a compressed log to a single forward pass.
+    """
+    with open_log(log_path) as raw_file:
+        if is_ascii_compatible(encoding):
+            for offset in byte_offsets:
+                raw_file.seek(offset)
+                raw_line = raw_file.readline()
+                yield next(_split_lone_cr([raw_line]), raw_line).decode(encoding, errors='replace')
+            return
+
+        encoding, bom_length = _pin_byte_order(raw_file, encoding)
+        for offset in byte_offsets:
+            raw_file.seek(max(offset, bom_length))
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            line = ''
+            while True:
+                chunk = raw_file.read(4096)
+                line += decoder.decode(chunk, final=not chunk)
+                # A "\r" at the end of what is decoded so far may be half of a "\r\n"
+                newline = _TEXT_LINE_BREAK.search(line)
+                if newline:
+                    line = line[:newline.end()]
+                    break
+                if not chunk:
+                    break
+            yield line
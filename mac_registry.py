@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from datetime import datetime
+
+
+class MacEntry:
+    """One BSSID: its stable lane id, first/last sighting and the BEACON_RX details, if any."""
+    __slots__ = ("mac", "lane_id", "first_seen", "last_seen", "ssid", "band", "channel")
+
+    def __init__(self, mac):
+        self.mac = mac
+        self.lane_id = None
+        self.first_seen = None
+        self.last_seen = None
+        self.ssid = None
+        self.band = None
+        self.channel = None
+
+    @property
+    def info(self):
+        if self.ssid is None:
+            return None
+        return {"ssid": self.ssid, "band": self.band, "channel": self.channel}
+
+
+class MacRegistry:
+    """
+    Ordered MAC/BSSID registry shared by the parser and the timeline builder.
+
+    `touch` records a MAC-pattern hit and moves the MAC to the end of the lane order in O(1),
+    which is the order the timeline stacks its y lanes in. Every MAC also gets a lane id on
+    its first hit that never changes, for compact per-event storage. `set_info` keeps the
+    latest SSID/band/channel seen in BEACON_RX, including for MACs that never get a lane.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._order = OrderedDict()
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, mac):
+        return mac in self._order
+
+    def __iter__(self):
+        # MACs with a lane, least recently seen first
+        return iter(self._order)
+
+    def get(self, mac):
+        return self._entries.get(mac)
+
+    def _entry(self, mac):
+        entry = self._entries.get(mac)
+        if entry is None:
+            entry = self._entries[mac] = MacEntry(mac)
+        return entry
+
+    def touch(self, mac, timestamp):
+        entry = self._entry(mac)
+        if entry.lane_id is None:
+            entry.lane_id = len(self._order)
+            entry.first_seen = timestamp
+            self._order[mac] = entry
+        else:
+            self._order.move_to_end(mac)
+        entry.last_seen = timestamp
+        return entry
+
+    def set_info(self, mac, ssid, band, channel):
+        entry = self._entry(mac)
+        entry.ssid = ssid
+        entry.band = band
+        entry.channel = channel
+
+    def lane_of(self, mac):
+        entry = self._entries.get(mac)
+        return entry.lane_id if entry is not None else None
+
+    def y_labels(self):
+        return ["disconnected"] + list(self._order)
+
+    def label(self, mac):
+        entry = self._entries.get(mac)
+        if entry is None or entry.ssid is None:
+            return mac
+        return f"{mac} ({entry.ssid}, {entry.band}, {entry.channel})"
+
+    @property
+    def mac_addresses(self):
+        """The legacy [(last_seen, mac), ...] list, least recently seen first."""
+        return [(entry.last_seen, mac) for mac, entry in self._order.items()]
+
+    @property
+    def mac_info(self):
+        """The legacy {mac: {"ssid", "band", "channel"}} dict of BEACON_RX details."""
+        return {mac: entry.info for mac, entry in self._entries.items() if entry.ssid is not None}
+
+    def merge(self, other, missing_timestamp=None):
+        """
+        Replay the registry of a later chunk of the same log on top of this one, as if its MAC hits
+        had been touched here in order. Sightings the chunk could not timestamp get missing_timestamp.
+        """
+        # New MACs get lane ids in the order the chunk first saw them
+        for entry in sorted(other._order.values(), key=lambda e: e.lane_id):
+            if entry.mac not in self._order:
+                mine = self._entry(entry.mac)
+                mine.lane_id = len(self._order)
+                mine.first_seen = entry.first_seen or missing_timestamp
+                self._order[entry.mac] = mine
+        # The chunk's lane order is its last-touch order, so moving in that order reproduces it
+        for mac, entry in other._order.items():
+            self._order.move_to_end(mac)
+            self._entries[mac].last_seen = entry.last_seen or missing_timestamp
+        for mac, entry in other._entries.items():
+            if entry.ssid is not None:
+                self.set_info(mac, entry.ssid, entry.band, entry.channel)
+
+    def copy(self):
+        registry = MacRegistry()
+        for mac, entry in self._entries.items():
+            clone = registry._entries[mac] = MacEntry(mac)
+            for name in MacEntry.__slots__[1:]:
+                setattr(clone, name, getattr(entry, name))
+        for mac in self._order:
+            registry._order[mac] = registry._entries[mac]
+        return registry
+
+    def info_copy(self):
+        """A registry with the BEACON_RX details of this one but no lanes yet."""
+        registry = MacRegistry()
+        for mac, entry in self._entries.items():
+            if entry.ssid is not None:
+                registry.set_info(mac, entry.ssid, entry.band, entry.channel)
+        return registry
+
+    def to_json(self):
+        def encode(timestamp):
+            return timestamp.isoformat() if timestamp else None
+
+        return {
+            "order": list(self._order),
+            "entries": [[e.mac, e.lane_id, encode(e.first_seen), encode(e.last_seen), e.ssid, e.band, e.channel]
+                        for e in self._entries.values()],
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        def decode(text):
+            return datetime.fromisoformat(text) if text else None
+
+        registry = cls()
+        for mac, lane_id, first_seen, last_seen, ssid, band, channel in data["entries"]:
+            entry = registry._entries[mac] = MacEntry(mac)
+            entry.lane_id = lane_id
+            entry.first_seen = decode(first_seen)
+            entry.last_seen = decode(last_seen)
+            entry.ssid = ssid
+            entry.band = band
+            entry.channel = channel
+        for mac in data["order"]:
+            registry._order[mac] = registry._entries[mac]
+        return registry
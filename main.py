@@ -1,440 +1,170 @@
-import re
-import pandas as pd
-import json
-import os
+import multiprocessing
 import sys
+import time
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.offline as pyo
-import chardet
 
-# Load patterns from JSON file
-def load_patterns():
-    if getattr(sys, 'frozen', False):
-        exe_dir = os.path.dirname(sys.executable)
-    else:
-        exe_dir = os.path.dirname(__file__)
-
-    with open(os.path.join(exe_dir, 'patterns.json'), 'r') as file:
-        return json.load(file)
-
-patterns = load_patterns()
-connectivity_patterns = patterns['connectivity_patterns']
-info_patterns = patterns['info_patterns']
-mac_patterns = [re.compile(p) for p in patterns['mac_patterns']]
-
-beacon_rx_pattern = re.compile(
-    r'BEACON_RX - (?P<mac>[0-9A-F:]+), channel (?P<channel>\d+)\s*, band (?P<band>[\d._]+GHz), RSSI (?P<rssi>-?\d+), seq \d+\s+"(?P<ssid>[^"]+)"'
-)
-
-def parse_log(log_path, start_line, end_line):
-    events = []
-    mac_info = {}
-    mac_addresses = []
-    current_y = "disconnected"
-    discovered_patterns = []
-    scanned_lines = []
-    last_log_timestamp = None
-    seen_ap_PD_timestamps = set()
-
-    with open(log_path, 'rb') as file:
-        raw_data = file.read()
-        result = chardet.detect(raw_data)
-        encoding = result['encoding']
-        #print(f"Detected encoding: {encoding}")
-
-    with open(log_path, 'r', encoding=encoding) as file:
-        lines = file.readlines()[start_line:end_line]
-
-    for line_number, line in enumerate(lines, start=start_line):
-        scanned_lines.append((line_number, line.strip()))
-
-        timestamp_match = re.search(r"(\d{2}/\d{2}/\d{2,4}-\d{2}:\d{2}:\d{2}\.\d{3})", line)
-        if timestamp_match:
-            last_log_timestamp = datetime.strptime(timestamp_match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-
-        for pattern in mac_patterns:
-            match = pattern.search(line)
-            if match:
-                mac = match.group(1)
-                mac_event_details = [last_log_timestamp, "MAC Address Detected", f"Line {line_number}: {line.strip()}", mac,
-                                     current_y, "MAC Address"]
-                discovered_patterns.append(mac_event_details)
-                mac_addresses = [(ts, m) for ts, m in mac_addresses if m != mac]
-                mac_addresses.append((last_log_timestamp, mac))
-
-                current_y = mac
-
-        match = beacon_rx_pattern.search(line)
-        if match:
-            mac = match.group("mac")
-            mac_info[mac] = {
-                "ssid": match.group("ssid"),
-                "band": match.group("band"),
-                "channel": match.group("channel")
-            }
-
-        for pattern in connectivity_patterns:
-            match = re.search(pattern["pattern"], line)
-            if match:
-                timestamp = datetime.strptime(match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-                mac = current_y
-
-                rssi_value = None
-                if pattern["status"] == "Attempt_to_connect":
-                    rssi_match = re.search(r"Rssi:(-?\d+)", line)
-                    if rssi_match:
-                        rssi_value = rssi_match.group(1)
-
-                if not any(e["timestamp"] == timestamp and e["pattern"].startswith(f"Line {line_number}:") for e in events):
-                    current_y = "disconnected" if mac is None or pattern["status"] == "disconnected" or pattern["status"] == "connection_failed" else mac
-                    event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}", mac, current_y, rssi_value]
-                    discovered_patterns.append(event_details)
-                    events.append(
-                        {"timestamp": timestamp, "status": pattern["status"], "pattern": f"Line {line_number}: {line.strip()}", "mac": mac, "y": current_y, "rssi": rssi_value})
-
-        for pattern in info_patterns:
-            match = re.search(pattern["pattern"], line)
-            if match:
-                timestamp = datetime.strptime(match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-                event = pattern['status']
-
-                if current_y is not None:
-                    if pattern["name"] != "AP poorly disc":
-                        event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}", current_y,
-                                         current_y, pattern['name']]
-                        discovered_patterns.append(event_details)
-                        events.append(
-                            {"timestamp": timestamp, "status": pattern["status"],
-                             "pattern": f"Line {line_number}: {line.strip()}", "mac": current_y, "y": current_y,
-                             "name": pattern["name"]})
-                    else:
-                        # Check if the event is "AP poorly disc" and if the timestamp has been seen
-                        if pattern["name"] == "AP poorly disc":
-                            if timestamp not in seen_ap_PD_timestamps:
-                                # Check for "PoorlyDisc:25" in the line
-                                event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}",
-                                                 current_y, current_y, pattern['name'], ]
-                                discovered_patterns.append(event_details)
-                                events.append(
-                                    {"timestamp": timestamp, "status": pattern["status"],
-                                     "pattern": f"Line {line_number}: {line.strip()}", "mac": current_y, "y": current_y,
-                                     "name": pattern["name"]})
-                                seen_ap_PD_timestamps.add(timestamp)
-                            else:
-                                continue
-    # Add the "end" point to the events list
-    if last_log_timestamp and events:
-        last_event_y = events[-1]["y"]
-        events.append({
-            "timestamp": last_log_timestamp,
-            "status": "end",
-            "pattern": "End of Log",
-            "mac": None,
-            "y": last_event_y,
-            "rssi": None
-        })
-
-    return events, mac_addresses, mac_info, discovered_patterns, scanned_lines, last_log_timestamp
-
-
-def check_flow_validity(events):
-    """
-    Check the validity of the flow according to specified flow rules.
-    If an invalid flow is detected, return True. Otherwise, return False.
-    """
-    invalid_flow_detected = False
-    last_attempt_to_connect_timestamp = None
-
-    for event in events:
-        status = event["status"]
-        y = event["y"]
-
-        # Rule 1: If a connected pattern appears in the "disconnected" mac level.
-        if status == "connected" and y == "disconnected":
-            invalid_flow_detected = True
-            break
-
-        # Rule 2: If "auth_req" pattern is not following "Attempt_to_connect" pattern.
-        if status == "Attempt_to_connect":
-            last_attempt_to_connect_timestamp = event["timestamp"]
-        elif status == "auth_req":
-            if last_attempt_to_connect_timestamp is None or event["timestamp"] <= last_attempt_to_connect_timestamp:
-                invalid_flow_detected = True
-                break
-    return invalid_flow_detected
-
-
-def create_timeline(events, mac_addresses, mac_info, last_log_timestamp, output_filename):
-    invalid_flow_detected = check_flow_validity(events)
-    y_labels = ["disconnected"] + [mac for _, mac in mac_addresses]
-    y_positions = {label: i for i, label in enumerate(y_labels)}
-
-    connectivity_x_values = []
-    connectivity_y_values = []
-    connectivity_colors = []
-    connectivity_hover_texts = []
-    connectivity_symbols = []
-    connectivity_line_styles = []
-    connectivity_rssi_texts = []
-
-    info_x_values = [[] for _ in info_patterns]
-    info_y_values = [[] for _ in info_patterns]
-    info_hover_texts = [[] for _ in info_patterns]
-
-    info_symbols = [str(i) for i in range(len(info_patterns))]
-
-    suspend_resume_pairs = []
-
-    vertical_line_timestamps = []
-
-    for event in events:
-        timestamp = event["timestamp"]
-        status = event["status"]
-        pattern = event["pattern"]
-        y = y_positions[event["y"]]
-        rssi_text = event.get("rssi", None) if status == "Attempt_to_connect" else ""
-
-        if status == "info":
-            for i, info_pattern in enumerate(info_patterns):
-                if re.search(info_pattern["pattern"], pattern):
-                    info_x_values[i].append(timestamp)
-                    info_y_values[i].append(y)
-                    info_hover_texts[i].append(pattern)
-            continue
-
-        if status == "Driver disable":
-            connectivity_symbols.append('diamond')
-            vertical_line_timestamps.append(timestamp)
-        elif status == "uCode alive":
-            connectivity_symbols.append('diamond')
-            vertical_line_timestamps.append(timestamp)
-
-        connectivity_x_values.append(timestamp)
-        connectivity_y_values.append(y)
-        connectivity_hover_texts.append(pattern)
-        connectivity_rssi_texts.append(f"RSSI: {rssi_text}" if rssi_text else "")
-
-        connectivity_symbols.append('circle')
-        if status == "disconnected" or status == "connection_failed":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "Deauth by Driver" or status == "connect_failure":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "Deauth from Peer":
-            connectivity_colors.append('darkred')
-            connectivity_line_styles.append('solid')
-        elif status == "auth_req":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "associated":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "link_switch_start":
-            connectivity_colors.append('magenta')
-            connectivity_line_styles.append('solid')
-        elif status == "Attempt_to_connect":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "link_switch_end":
-            connectivity_colors.append('green')
-            connectivity_line_styles.append('solid')
-        elif status == "connected":
-            connectivity_colors.append('green')
-            connectivity_line_styles.append('solid')
-        elif status == "Driver disable":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "uCode alive":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "auth_rsp":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "suspend":
-            connectivity_colors.append('purple')
-            connectivity_line_styles.append('solid')
-            suspend_resume_pairs.append((timestamp, timestamp))
-        elif status == "resume":
-            connectivity_colors.append('blue')
-            connectivity_line_styles.append('solid')
-            if suspend_resume_pairs:
-                suspend_resume_pairs[-1] = (suspend_resume_pairs[-1][0], timestamp)
-        elif status == "end":
-            connectivity_colors.append('black')
-            connectivity_line_styles.append('solid')
-
-    fig = go.Figure()
-
-    for i in range(len(connectivity_x_values)):
-        if i < len(connectivity_x_values) - 1:
-            line_style = 'solid'
-            for start, end in suspend_resume_pairs:
-                if start <= connectivity_x_values[i] < end:
-                    line_style = 'dash'
-                    break
-
-            fig.add_trace(go.Scatter(
-                x=[connectivity_x_values[i], connectivity_x_values[i + 1]],
-                y=[connectivity_y_values[i], connectivity_y_values[i + 1]],
-                mode='lines+markers+text',
-                marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
-                line=dict(shape='hv', dash=line_style),
-                hovertext=connectivity_hover_texts[i],
-                hoverinfo="text",
-                text=["", connectivity_rssi_texts[i]],
-                textposition="top center",
-                name='Connectivity Events',
-                showlegend=False
-            ))
-        else:
-            fig.add_trace(go.Scatter(
-                x=[connectivity_x_values[i]],
-                y=[connectivity_y_values[i]],
-                mode='markers+text',
-                marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
-                hovertext=connectivity_hover_texts[i],
-                hoverinfo="text",
-                text=["", connectivity_rssi_texts[i]],
-                textposition="top center",
-                name='Connectivity Events',
-                showlegend=False
-            ))
-
-    for i, info_pattern in enumerate(info_patterns):
-        fig.add_trace(go.Scatter(
-            x=info_x_values[i],
-            y=info_y_values[i],
-            mode='markers',
-            marker=dict(color='black', symbol=info_symbols[i % len(info_symbols)]),
-            hovertext=info_hover_texts[i],
-            hoverinfo="text",
-            name=f'Info Events: {info_pattern["name"]}',
-            visible=True,
-            showlegend=True
-        ))
-
-    for timestamp in vertical_line_timestamps:
-        fig.add_shape(type="line",
-                      x0=timestamp, x1=timestamp,
-                      y0=0, y1=-0.1,
-                      line=dict(color="black", width=2))
-
-    # Update the plot title based on flow validity
-    if invalid_flow_detected:
-        fig.add_annotation(
-            text="***Please note,possible log corruption!***",
-            xref="paper", yref="paper",
-            x=0.5, y=1.1,  # Positioning the text above the main title
-            showarrow=False,
-            font=dict(size=16,color="red")
-        )
-
-    fig.update_layout(
-        title="WiFi Connectivity Timeline",
-        xaxis_title="Time",
-        yaxis_title="Connectivity State",
-        yaxis=dict(
-            tickvals=list(y_positions.values()),
-            ticktext=[
-                f"{mac} ({mac_info[mac]['ssid']}, {mac_info[mac]['band']}, {mac_info[mac]['channel']})" if mac in mac_info else mac
-                for mac in y_labels]
-        ),
-        legend_title_text="Click an event to toggle it off/on",
-        updatemenus=[
-            {
-                'type': 'buttons',
-                'buttons': [
-                    {
-                        'label': 'Show All Info Events',
-                        'method': 'update',
-                        'args': [
-                            {'visible': [True] * len(connectivity_x_values) + [True] * len(info_patterns)},
-                        ]
-                    },
-                    {
-                        'label': 'Hide All Info Events',
-                        'method': 'update',
-                        'args': [
-                            {'visible': [True] * len(connectivity_x_values) + [False] * len(info_patterns)},
-                        ]
-                    }
-                ],
-                'direction': 'down',
-                'x': 1.1,
-                'y': 1.1,
-                'xanchor': 'left',
-                'yanchor': 'top'
-            }
-        ],
-        legend=dict(
-            x=1.05,
-            y=0.95,
-            traceorder='normal',
-            itemclick='toggle',
-            itemdoubleclick='toggle'
-        ),
-        dragmode='zoom',
-    )
-
-    fig.update_layout(
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1m", step="minute", stepmode="backward"),
-                    dict(count=5, label="5m", step="minute", stepmode="backward"),
-                    dict(count=1, label="1h", step="hour", stepmode="backward"),
-                    dict(step="all")
-                ])
-            ),
-            rangeslider=dict(visible=True),
-            type="date"
-        )
-    )
-
-    # Use the output_filename for the HTML file
-    fig.write_html(output_filename, auto_open=True, include_plotlyjs='cdn', full_html=False, config={'scrollZoom': True})
-
-    return fig
+from event_export import EXPORT_SUFFIXES, EventExporter, check_export_format, export_excel
+from log_follower import DEFAULT_POLL_INTERVAL, LiveTimeline
+from log_parser import parse_log, parse_window_input
+from log_reader import MEMBER_SEPARATOR, archive_members, is_compressed, log_base_name, split_member
+from parallel_parser import DEFAULT_CHUNK_SIZE, parse_log_parallel
+from profiler import Profiler, profile_stage
+from result_cache import parse_log_cached
+from timeline import create_timeline
+
+
+def option_value(name, default=None):
+    """Value of a "--name=value" command-line option, or default when it is not given."""
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+def choose_archive_member(log_path):
+    """Ask which log to open when log_path is a .zip holding several files."""
+    archive_path, member = split_member(log_path)
+    if member is not None or not archive_path.lower().endswith('.zip'):
+        return log_path
+    members = archive_members(archive_path)
+    if len(members) <= 1:
+        return log_path
+    for i, name in enumerate(members, start=1):
+        print(f"{i}: {name}")
+    choice = int(input("Enter the number of the log to open: "))
+    return archive_path + MEMBER_SEPARATOR + members[choice - 1]
 
 
 def main():
     debug_mode = '-d' in sys.argv
+    # --workers=N parses the log on N processes (0 = one per core), --chunk-size=MB sets the bytes per task
+    workers = option_value('workers')
+    workers = int(workers) if workers is not None else None
+    chunk_size = int(float(option_value('chunk-size', DEFAULT_CHUNK_SIZE / (1024 * 1024))) * 1024 * 1024)
+    # --follow keeps parsing what is appended to the log and redraws the graph until Ctrl+C
+    follow_mode = '--follow' in sys.argv
+    follow_interval = float(option_value('interval', DEFAULT_POLL_INTERVAL))
+    # --profile prints the time and memory of every stage and the cost of every pattern, and writes them
+    # to <log>_profile.json. A cache hit would skip the parse, so profiling always parses.
+    profile_mode = '--profile' in sys.argv
+    # --plotlyjs=directory|local|inline|cdn picks where the graph loads plotly.js from (see html_output.py):
+    # by default a copy next to the graph, to be copied along with it; --gzip compresses the figure data
+    plotlyjs = option_value('plotlyjs', 'directory')
+    compress = '--gzip' in sys.argv
+    # -d exports every event to <log>_events.parquet as it is parsed; --export=arrow writes an Arrow IPC file
+    # instead and --export=excel the old patterns_discovered.xlsx, for windows of up to EXCEL_MAX_ROWS rows
+    export_format = option_value('export', 'parquet')
+    if debug_mode:
+        try:
+            check_export_format(export_format)
+        except ValueError as error:
+            print(error)
+            return
+    stream_export = debug_mode and export_format != 'excel'
+    # Parse results are cached on disk per log and line window; --no-cache always parses. A cache hit would
+    # skip the parse the events are exported from, so a streamed export always parses too.
+    use_cache = '--no-cache' not in sys.argv and not profile_mode and not stream_export
+    positional_args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
     #lines_mode = '-l' in sys.argv
     lines_mode = 1
 
     while True:
-        if len(sys.argv) > 1:
-            log_path = sys.argv[1]
+        if positional_args:
+            log_path = positional_args[0]
         else:
             log_path = input("Enter the log file path: ")
-
-        with open(log_path, 'r', encoding='utf-8', errors='ignore') as file:
-            lines = file.readlines()
+        # .gz/.zst logs and zip members ("bundle.zip::logs/wifi.log") are read without unpacking them
+        log_path = choose_archive_member(log_path)
 
         if lines_mode:
-            start_line_input = input("Enter the start line number (leave empty for first line): ")
-            end_line_input = input("Enter the end line number (leave empty for last line): ")
+            start_line_input = input("Enter the start line number or time (leave empty for first line): ")
+            end_line_input = input("Enter the end line number or time (leave empty for last line): ")
         else:
-            start_line_input = 0
-            end_line_input = len(lines)
-
-        start_line = int(start_line_input) if start_line_input else 0
-        end_line = int(end_line_input) if end_line_input else len(lines)
+            start_line_input = ""
+            end_line_input = ""
+
+        # An empty end line means "to the end of the file", so the log does not need to be pre-read to count lines.
+        # A time ("14:03:12" or "03/05/2024-14:03:12") selects the lines timestamped within the window instead.
+        try:
+            start_line, end_line, start_time, end_time = parse_window_input(log_path, start_line_input,
+                                                                            end_line_input)
+        except ValueError as error:
+            print(error)
+            continue
+        time_window = None
+        if start_time is not None or end_time is not None:
+            time_window = (start_time or datetime.min, end_time or datetime.max)
 
-        events, mac_addresses, mac_info, discovered_patterns, scanned_lines, last_log_timestamp = parse_log(log_path,start_line,end_line)
         # Extract the base name of the input file and append "graph"
-        base_name = os.path.splitext(os.path.basename(log_path))[0]
+        base_name = log_base_name(log_path)
         output_filename = f"{base_name}_graph.html"
-        fig = create_timeline(events, mac_addresses, mac_info, last_log_timestamp,output_filename)
-
-        pyo.plot(fig, filename=output_filename, auto_open=True)
 
-        if debug_mode:
-            with pd.ExcelWriter('patterns_discovered.xlsx', engine='openpyxl') as writer:
-                patterns_df = pd.DataFrame(discovered_patterns, columns=['Timestamp', 'Status', 'Pattern', 'MAC', 'Y', 'Name'])
-                patterns_df.to_excel(writer, sheet_name='Patterns Discovered', index=False)
+        profiler = Profiler() if profile_mode else None
+        if profiler is not None:
+            profiler.start()
+
+        # Parquet and Arrow are written a row group at a time while the log is parsed (or followed)
+        exporter = None
+        if stream_export:
+            exporter = EventExporter(f"{base_name}_events{EXPORT_SUFFIXES[export_format]}", base_name, export_format)
+
+        if follow_mode and is_compressed(log_path):
+            print(f"{log_path} is compressed and cannot be followed, drawing it once")
+        if follow_mode and not is_compressed(log_path):
+            live_timeline = LiveTimeline(log_path, output_filename, start_line, refresh_seconds=follow_interval,
+                                         time_window=time_window)
+            print(f"Following {log_path}, press Ctrl+C to stop")
+            opened = False
+            try:
+                while True:
+                    if live_timeline.update(auto_open=not opened):
+                        opened = True
+                    if exporter is not None and live_timeline.follower.parser is not None:
+                        exporter.write(live_timeline.follower.parser.store)
+                    time.sleep(follow_interval)
+            except KeyboardInterrupt:
+                pass
+            event_store, mac_registry, last_log_timestamp = live_timeline.follower.result()
+        else:
+            # A time window is found through the line index, which the parallel parser does not use
+            if workers is not None and time_window is None:
+                def parse(log_path, start_line, end_line, exporter=None):
+                    return parse_log_parallel(log_path, start_line, end_line, workers or None, chunk_size,
+                                              exporter)
+            else:
+                parse = parse_log
+            if use_cache:
+                event_store, mac_registry, last_log_timestamp = parse_log_cached(log_path, start_line, end_line, parse,
+                                                                                 start_time=start_time,
+                                                                                 end_time=end_time)
+            elif time_window is not None:
+                event_store, mac_registry, last_log_timestamp = parse(log_path, start_line, end_line,
+                                                                      start_time=start_time, end_time=end_time,
+                                                                      exporter=exporter)
+            else:
+                event_store, mac_registry, last_log_timestamp = parse(log_path, start_line, end_line,
+                                                                      exporter=exporter)
+            create_timeline(event_store, mac_registry, last_log_timestamp, output_filename, plotlyjs=plotlyjs,
+                            compress=compress)
+
+        if exporter is not None:
+            with profile_stage("export"):
+                exporter.close(event_store)
+            print(f"Exported {exporter.rows_exported} rows to {exporter.path}")
+        elif debug_mode:
+            # Excel cannot be appended to, so the sheet is written once the window is parsed
+            try:
+                with profile_stage("export"):
+                    rows = export_excel(event_store, 'patterns_discovered.xlsx')
+                print(f"Exported {rows} rows to patterns_discovered.xlsx")
+            except ValueError as error:
+                print(error)
+
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.report())
+            profiler.save(f"{base_name}_profile.json")
 
 
         choice = input("Do you want to run the program again? (y/n): ").strip().lower()
@@ -442,4 +172,5 @@ def main():
             break
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,402 +1,27 @@
-import re
-import json
+import html
 import os
 import sys
-from datetime import datetime
-import plotly.graph_objects as go
-import plotly.offline as pyo
 import subprocess
-from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog, QLineEdit, QLabel
+from collections import deque, namedtuple
+from datetime import datetime
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog, QLineEdit,
+                             QLabel, QCheckBox, QInputDialog, QMessageBox, QProgressBar)
 from PyQt5.QtGui import QIcon
-import chardet
-
-# Load patterns from JSON file
-def load_patterns():
-    exe_dir = os.path.join(os.path.dirname(__file__), 'patterns.json')
-    with open(os.path.join(exe_dir), 'r') as file:
-        return json.load(file)
-
-patterns = load_patterns()
-connectivity_patterns = patterns['connectivity_patterns']
-info_patterns = patterns['info_patterns']
-mac_patterns = [re.compile(p) for p in patterns['mac_patterns']]
-
-beacon_rx_pattern = re.compile(
-    r'BEACON_RX - (?P<mac>[0-9A-F:]+), channel (?P<channel>\d+)\s*, band (?P<band>[\d._]+GHz), RSSI (?P<rssi>-?\d+), seq \d+\s+"(?P<ssid>[^"]+)"'
-)
-
-def parse_log(log_path, start_line, end_line):
-    events = []
-    mac_info = {}
-    mac_addresses = []
-    current_y = "disconnected"
-    discovered_patterns = []
-    scanned_lines = []
-    last_log_timestamp = None
-    seen_ap_PD_timestamps = set()
-
-
-    with open(log_path, 'rb') as file:
-       raw_data = file.read()
-       result = chardet.detect(raw_data)
-       encoding = result['encoding']
-       #print(f"Detected encoding: {encoding}")
-
-    with open(log_path, 'r', encoding=encoding) as file:
-        lines = file.readlines()[start_line:end_line]
-        
-
-    for line_number, line in enumerate(lines, start=start_line):
-        scanned_lines.append((line_number, line.strip()))
-
-        timestamp_match = re.search(r"(\d{2}/\d{2}/\d{2,4}-\d{2}:\d{2}:\d{2}\.\d{3})", line)
-        if timestamp_match:
-            last_log_timestamp = datetime.strptime(timestamp_match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-
-        for pattern in mac_patterns:
-            match = pattern.search(line)
-            if match:
-                mac = match.group(1)
-                mac_event_details = [last_log_timestamp, "MAC Address Detected", f"Line {line_number}: {line.strip()}", mac,
-                                     current_y, "MAC Address"]
-                discovered_patterns.append(mac_event_details)
-                mac_addresses = [(ts, m) for ts, m in mac_addresses if m != mac]
-                mac_addresses.append((last_log_timestamp, mac))
-
-                current_y = mac
-
-        match = beacon_rx_pattern.search(line)
-        if match:
-            mac = match.group("mac")
-            mac_info[mac] = {
-                "ssid": match.group("ssid"),
-                "band": match.group("band"),
-                "channel": match.group("channel")
-            }
-
-        for pattern in connectivity_patterns:
-            match = re.search(pattern["pattern"], line)
-            if match:
-                timestamp = datetime.strptime(match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-                mac = current_y
-
-                rssi_value = None
-                if pattern["status"] == "Attempt_to_connect":
-                    rssi_match = re.search(r"Rssi:(-?\d+)", line)
-                    if rssi_match:
-                        rssi_value = rssi_match.group(1)
-
-                if not any(e["timestamp"] == timestamp and e["pattern"].startswith(f"Line {line_number}:") for e in events):
-                    current_y = "disconnected" if mac is None or pattern["status"] == "disconnected" or pattern["status"] == "connection_failed" else mac
-                    event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}", mac, current_y, rssi_value]
-                    discovered_patterns.append(event_details)
-                    events.append(
-                        {"timestamp": timestamp, "status": pattern["status"], "pattern": f"Line {line_number}: {line.strip()}", "mac": mac, "y": current_y, "rssi": rssi_value})
-
-        for pattern in info_patterns:
-            match = re.search(pattern["pattern"], line)
-            if match:
-                timestamp = datetime.strptime(match.group(1), "%m/%d/%Y-%H:%M:%S.%f")
-                event = pattern['status']
-
-                if current_y is not None:
-                    if pattern["name"] != "AP poorly disc":
-                        event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}", current_y,
-                                         current_y, pattern['name']]
-                        discovered_patterns.append(event_details)
-                        events.append(
-                            {"timestamp": timestamp, "status": pattern["status"],
-                             "pattern": f"Line {line_number}: {line.strip()}", "mac": current_y, "y": current_y,
-                             "name": pattern["name"]})
-                    else:
-                        # Check if the event is "AP poorly disc" and if the timestamp has been seen
-                        if pattern["name"] == "AP poorly disc":
-                            if timestamp not in seen_ap_PD_timestamps:
-                                # Check for "PoorlyDisc:25" in the line
-                                event_details = [timestamp, pattern['status'], f"Line {line_number}: {line.strip()}",
-                                                 current_y, current_y, pattern['name'], ]
-                                discovered_patterns.append(event_details)
-                                events.append(
-                                    {"timestamp": timestamp, "status": pattern["status"],
-                                     "pattern": f"Line {line_number}: {line.strip()}", "mac": current_y, "y": current_y,
-                                     "name": pattern["name"]})
-                                seen_ap_PD_timestamps.add(timestamp)
-                            else:
-                                continue
-    # Add the "end" point to the events list
-    if last_log_timestamp and events:
-        last_event_y = events[-1]["y"]
-        events.append({
-            "timestamp": last_log_timestamp,
-            "status": "end",
-            "pattern": "End of Log",
-            "mac": None,
-            "y": last_event_y,
-            "rssi": None
-        })
-
-    return events, mac_addresses, mac_info, discovered_patterns, scanned_lines, last_log_timestamp
-
-
-def check_flow_validity(events):
-    """
-    Check the validity of the flow according to specified flow rules.
-    If an invalid flow is detected, return True. Otherwise, return False.
-    """
-    invalid_flow_detected = False
-    last_attempt_to_connect_timestamp = None
 
-    for event in events:
-        status = event["status"]
-        y = event["y"]
+from log_follower import DEFAULT_POLL_INTERVAL, LiveTimeline
+from log_parser import parse_log, parse_window_input
+from log_reader import MEMBER_SEPARATOR, archive_members, is_compressed, log_base_name, log_exists
+from profiler import Profiler
+from progress import ParseCancelled, ParseProgress
+from result_cache import parse_log_cached
+from timeline import create_timeline
 
-        # Rule 1: If a connected pattern appears in the "disconnected" mac level.
-        if status == "connected" and y == "disconnected":
-            invalid_flow_detected = True
-            break
+# A log to draw, with the window as typed (see parse_window_input) and the options it was submitted with
+LogJob = namedtuple("LogJob", "log_path start_text end_text output_filename profile_path")
+# A log to follow, with the window as typed
+FollowJob = namedtuple("FollowJob", "log_path start_text end_text output_filename")
 
-        # Rule 2: If "auth_req" pattern is not following "Attempt_to_connect" pattern.
-        if status == "Attempt_to_connect":
-            last_attempt_to_connect_timestamp = event["timestamp"]
-        elif status == "auth_req":
-            if last_attempt_to_connect_timestamp is None or event["timestamp"] <= last_attempt_to_connect_timestamp:
-                invalid_flow_detected = True
-                break
-    return invalid_flow_detected
-
-
-def create_timeline(events, mac_addresses, mac_info, last_log_timestamp, output_filename):
-    invalid_flow_detected = check_flow_validity(events)
-    y_labels = ["disconnected"] + [mac for _, mac in mac_addresses]
-    y_positions = {label: i for i, label in enumerate(y_labels)}
-
-    connectivity_x_values = []
-    connectivity_y_values = []
-    connectivity_colors = []
-    connectivity_hover_texts = []
-    connectivity_symbols = []
-    connectivity_line_styles = []
-    connectivity_rssi_texts = []
-
-    info_x_values = [[] for _ in info_patterns]
-    info_y_values = [[] for _ in info_patterns]
-    info_hover_texts = [[] for _ in info_patterns]
-
-    info_symbols = [str(i) for i in range(len(info_patterns))]
-
-    suspend_resume_pairs = []
-
-    vertical_line_timestamps = []
-
-    for event in events:
-        timestamp = event["timestamp"]
-        status = event["status"]
-        pattern = event["pattern"]
-        y = y_positions[event["y"]]
-        rssi_text = event.get("rssi", None) if status == "Attempt_to_connect" else ""
-
-        if status == "info":
-            for i, info_pattern in enumerate(info_patterns):
-                if re.search(info_pattern["pattern"], pattern):
-                    info_x_values[i].append(timestamp)
-                    info_y_values[i].append(y)
-                    info_hover_texts[i].append(pattern)
-            continue
-
-        if status == "Driver disable":
-            connectivity_symbols.append('diamond')
-            vertical_line_timestamps.append(timestamp)
-        elif status == "uCode alive":
-            connectivity_symbols.append('diamond')
-            vertical_line_timestamps.append(timestamp)
-
-        connectivity_x_values.append(timestamp)
-        connectivity_y_values.append(y)
-        connectivity_hover_texts.append(pattern)
-        connectivity_rssi_texts.append(f"RSSI: {rssi_text}" if rssi_text else "")
-
-        connectivity_symbols.append('circle')
-        if status == "disconnected" or status == "connection_failed":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "Deauth by Driver" or status == "connect_failure":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "Deauth from Peer":
-            connectivity_colors.append('darkred')
-            connectivity_line_styles.append('solid')
-        elif status == "auth_req":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "associated":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "link_switch_start":
-            connectivity_colors.append('magenta')
-            connectivity_line_styles.append('solid')
-        elif status == "Attempt_to_connect":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "link_switch_end":
-            connectivity_colors.append('green')
-            connectivity_line_styles.append('solid')
-        elif status == "connected":
-            connectivity_colors.append('green')
-            connectivity_line_styles.append('solid')
-        elif status == "Driver disable":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "uCode alive":
-            connectivity_colors.append('red')
-            connectivity_line_styles.append('solid')
-        elif status == "auth_rsp":
-            connectivity_colors.append('orange')
-            connectivity_line_styles.append('solid')
-        elif status == "suspend":
-            connectivity_colors.append('purple')
-            connectivity_line_styles.append('solid')
-            suspend_resume_pairs.append((timestamp, timestamp))
-        elif status == "resume":
-            connectivity_colors.append('blue')
-            connectivity_line_styles.append('solid')
-            if suspend_resume_pairs:
-                suspend_resume_pairs[-1] = (suspend_resume_pairs[-1][0], timestamp)
-        elif status == "end":
-            connectivity_colors.append('black')
-            connectivity_line_styles.append('solid')
-
-    fig = go.Figure()
-
-    for i in range(len(connectivity_x_values)):
-        if i < len(connectivity_x_values) - 1:
-            line_style = 'solid'
-            for start, end in suspend_resume_pairs:
-                if start <= connectivity_x_values[i] < end:
-                    line_style = 'dash'
-                    break
-
-            fig.add_trace(go.Scatter(
-                x=[connectivity_x_values[i], connectivity_x_values[i + 1]],
-                y=[connectivity_y_values[i], connectivity_y_values[i + 1]],
-                mode='lines+markers+text',
-                marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
-                line=dict(shape='hv', dash=line_style),
-                hovertext=connectivity_hover_texts[i],
-                hoverinfo="text",
-                text=["", connectivity_rssi_texts[i]],
-                textposition="top center",
-                name='Connectivity Events',
-                showlegend=False
-            ))
-        else:
-            fig.add_trace(go.Scatter(
-                x=[connectivity_x_values[i]],
-                y=[connectivity_y_values[i]],
-                mode='markers+text',
-                marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
-                hovertext=connectivity_hover_texts[i],
-                hoverinfo="text",
-                text=["", connectivity_rssi_texts[i]],
-                textposition="top center",
-                name='Connectivity Events',
-                showlegend=False
-            ))
-
-    for i, info_pattern in enumerate(info_patterns):
-        fig.add_trace(go.Scatter(
-            x=info_x_values[i],
-            y=info_y_values[i],
-            mode='markers',
-            marker=dict(color='black', symbol=info_symbols[i % len(info_symbols)]),
-            hovertext=info_hover_texts[i],
-            hoverinfo="text",
-            name=f'Info Events: {info_pattern["name"]}',
-            visible=True,
-            showlegend=True
-        ))
-
-    for timestamp in vertical_line_timestamps:
-        fig.add_shape(type="line",
-                      x0=timestamp, x1=timestamp,
-                      y0=0, y1=-0.1,
-                      line=dict(color="black", width=2))
-
-    # Update the plot title based on flow validity
-    if invalid_flow_detected:
-        fig.add_annotation(
-            text="***Please note,possible log corruption!***",
-            xref="paper", yref="paper",
-            x=0.5, y=1.1,  # Positioning the text above the main title
-            showarrow=False,
-            font=dict(size=16,color="red")
-        )
-
-    fig.update_layout(
-        title="WiFi timeline",
-        xaxis_title="Time",
-        yaxis_title="Connectivity State",
-        yaxis=dict(
-            tickvals=list(y_positions.values()),
-            ticktext=[
-                f"{mac} ({mac_info[mac]['ssid']}, {mac_info[mac]['band']}, {mac_info[mac]['channel']})" if mac in mac_info else mac
-                for mac in y_labels]
-        ),
-        legend_title_text="Click an event to toggle it off/on",
-        updatemenus=[
-            {
-                'type': 'buttons',
-                'buttons': [
-                    {
-                        'label': 'Show All Info Events',
-                        'method': 'update',
-                        'args': [
-                            {'visible': [True] * len(connectivity_x_values) + [True] * len(info_patterns)},
-                        ]
-                    },
-                    {
-                        'label': 'Hide All Info Events',
-                        'method': 'update',
-                        'args': [
-                            {'visible': [True] * len(connectivity_x_values) + [False] * len(info_patterns)},
-                        ]
-                    }
-                ],
-                'direction': 'down',
-                'x': 1.1,
-                'y': 1.1,
-                'xanchor': 'left',
-                'yanchor': 'top'
-            }
-        ],
-        legend=dict(
-            x=1.05,
-            y=0.95,
-            traceorder='normal',
-            itemclick='toggle',
-            itemdoubleclick='toggle'
-        ),
-        dragmode='zoom',
-    )
-
-    fig.update_layout(
-        xaxis=dict(
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1m", step="minute", stepmode="backward"),
-                    dict(count=5, label="5m", step="minute", stepmode="backward"),
-                    dict(count=1, label="1h", step="hour", stepmode="backward"),
-                    dict(step="all")
-                ])
-            ),
-            rangeslider=dict(visible=True),
-            type="date"
-        )
-    )
-
-    # Use the output_filename for the HTML file
-    fig.write_html(output_filename, auto_open=True, include_plotlyjs='cdn', full_html=False, config={'scrollZoom': True})
-
-    return fig
 
 def open_text_analyser(log_path):
     script_path = os.path.join(os.path.dirname(__file__), 'TextAnalysisTool.NET.exe')
@@ -410,6 +35,109 @@ def open_text_analyser(log_path):
             filter_path=""
     subprocess.Popen([script_path, log_path, f'/filters:{filter_path}'])
 
+class LogWorker(QThread):
+    """
+    Parses and draws one LogJob off the GUI thread, reporting progress through signals.
+    `cancel` stops the parse at the next progress report, or before the drawing starts.
+    """
+    progress = pyqtSignal(object)
+    stage_changed = pyqtSignal(str)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.parse_progress = ParseProgress(self.progress.emit)
+
+    def cancel(self):
+        self.parse_progress.cancel()
+
+    def run(self):
+        job = self.job
+        # A time window reads the log up to its first timestamp, so it is resolved here too
+        try:
+            start_line, end_line, start_time, end_time = parse_window_input(job.log_path, job.start_text, job.end_text)
+        except ValueError as error:
+            self.failed.emit(f"Invalid window: {error}")
+            return
+
+        profiler = Profiler() if job.profile_path else None
+        try:
+            if profiler is not None:
+                # A cache hit would skip the parse that is being profiled
+                profiler.start()
+                parse = parse_log
+            else:
+                parse = parse_log_cached
+
+            self.stage_changed.emit("Parsing")
+            event_store, mac_registry, last_log_timestamp = parse(job.log_path, max(0, start_line), end_line,
+                                                                  start_time=start_time, end_time=end_time,
+                                                                  progress=self.parse_progress)
+            self.parse_progress.check_cancelled()
+
+            self.stage_changed.emit("Drawing")
+            create_timeline(event_store, mac_registry, last_log_timestamp, job.output_filename, title="WiFi timeline")
+        except ParseCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as error:
+            self.failed.emit(f"{type(error).__name__}: {error}")
+            return
+        finally:
+            if profiler is not None:
+                profiler.stop()
+
+        if profiler is not None:
+            profiler.save(job.profile_path)
+        self.succeeded.emit(profiler)
+
+
+class FollowWorker(QThread):
+    """
+    Runs one LiveTimeline.update of a FollowJob off the GUI thread. The first one, given no
+    live_timeline yet, resolves the window, makes the LiveTimeline and parses the whole log.
+    """
+    updated = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, job, live_timeline, auto_open, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.live_timeline = live_timeline
+        self.auto_open = auto_open
+
+    def run(self):
+        if self.live_timeline is None:
+            job = self.job
+            try:
+                start_line, _, start_time, end_time = parse_window_input(job.log_path, job.start_text, job.end_text)
+            except ValueError as error:
+                self.failed.emit(str(error))
+                return
+            time_window = None
+            if start_time is not None or end_time is not None:
+                time_window = (start_time or datetime.min, end_time or datetime.max)
+            self.live_timeline = LiveTimeline(job.log_path, job.output_filename, max(0, start_line),
+                                              title="WiFi timeline", time_window=time_window)
+        self.updated.emit(self.live_timeline.update(auto_open=self.auto_open))
+
+
+def format_progress(update):
+    done_mb = update.bytes_done / (1024 * 1024)
+    if update.total_bytes is None:
+        text = f"{done_mb:.0f} MB read"
+    else:
+        text = f"{done_mb:.0f} / {update.total_bytes / (1024 * 1024):.0f} MB"
+    text += f", {update.events} events"
+    if update.eta_seconds is not None:
+        minutes, seconds = divmod(int(update.eta_seconds + 0.5), 60)
+        text += f", about {minutes}:{seconds:02d} left"
+    return text
+
+
 class LogAnalyzerApp(QWidget):
     def __init__(self, initial_log_path=None):
         super().__init__()
@@ -437,22 +165,59 @@ class LogAnalyzerApp(QWidget):
 
         line_input_layout = QHBoxLayout()
 
-        self.start_line_label = QLabel('Start Line (Optional)')
+        # Either end takes a line number or a time, e.g. "14:03:12" or "03/05/2024-14:03:12"
+        self.start_line_label = QLabel('Start Line/Time (Optional)')
         line_input_layout.addWidget(self.start_line_label)
 
         self.start_line_input = QLineEdit()
-        self.start_line_input.setFixedWidth(100)
+        self.start_line_input.setFixedWidth(160)
         line_input_layout.addWidget(self.start_line_input)
 
-        self.end_line_label = QLabel('End Line (Optional)')
+        self.end_line_label = QLabel('End Line/Time (Optional)')
         line_input_layout.addWidget(self.end_line_label)
 
         self.end_line_input = QLineEdit()
-        self.end_line_input.setFixedWidth(100)
+        self.end_line_input.setFixedWidth(160)
         line_input_layout.addWidget(self.end_line_input)
 
         layout.addLayout(line_input_layout)
 
+        # Follow mode keeps adding what is appended to the log to the open graph
+        self.follow_checkbox = QCheckBox('Follow log (live update)')
+        self.follow_checkbox.toggled.connect(self.toggle_follow)
+        layout.addWidget(self.follow_checkbox)
+
+        # Profiling reports the time and memory of every stage and the cost of every pattern
+        self.profile_checkbox = QCheckBox('Profile (stage times and pattern costs)')
+        layout.addWidget(self.profile_checkbox)
+
+        self.follow_job = None
+        self.live_timeline = None
+        self.follow_worker = None
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self.update_live_timeline)
+
+        # Logs are drawn one at a time by a LogWorker; logs submitted meanwhile wait in the queue
+        self.worker = None
+        self.pending_jobs = deque()
+
+        progress_layout = QHBoxLayout()
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        progress_layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_job)
+        progress_layout.addWidget(self.cancel_button)
+
+        layout.addLayout(progress_layout)
+
+        self.status_label = QLabel('')
+        self.status_text = ''
+        layout.addWidget(self.status_label)
+
         self.open_button = QPushButton('Open in Text Analyser')
         self.open_button.clicked.connect(self.open_text_analyser)
         layout.addWidget(self.open_button)
@@ -465,49 +230,182 @@ class LogAnalyzerApp(QWidget):
 
     def select_log_file(self):
         log_path = self.path_input.text().strip()
-        if log_path and os.path.exists(log_path):
-            self.process_log_file(log_path)
+        if log_path and log_exists(log_path):
+            log_path = self.choose_archive_member(log_path)
+            if log_path:
+                self.process_log_file(log_path)
         else:
             options = QFileDialog.Options()
             options |= QFileDialog.ReadOnly
-            log_path, _ = QFileDialog.getOpenFileName(self, "Select Log File", "", "All Files (*);;Log Files (*.log)",
+            log_path, _ = QFileDialog.getOpenFileName(self, "Select Log File", "",
+                                                      "All Files (*);;Log Files (*.log);;"
+                                                      "Compressed Logs (*.gz *.zst *.zip)",
                                                       options=options)
+            if log_path:
+                log_path = self.choose_archive_member(log_path)
             if log_path:
                 self.path_input.setText(log_path)
                 self.process_log_file(log_path)
 
-    def process_log_file(self, log_path):
-        with open(log_path, 'r', encoding='utf-8', errors='ignore') as file:
-            lines = file.readlines()
+    def choose_archive_member(self, log_path):
+        """Let the user pick the log inside a .zip holding several files; None when cancelled."""
+        if MEMBER_SEPARATOR in log_path or not log_path.lower().endswith('.zip'):
+            return log_path
+        members = archive_members(log_path)
+        if len(members) <= 1:
+            return log_path
+        member, ok = QInputDialog.getItem(self, "Select Log", "The archive holds several files:", members, 0, False)
+        return log_path + MEMBER_SEPARATOR + member if ok else None
 
-        try:
-            start_line = int(self.start_line_input.text()) if self.start_line_input.text() else 0
-        except ValueError:
-            start_line = 0
-
-        try:
-            end_line = int(self.end_line_input.text()) if self.end_line_input.text() else len(lines)
-        except ValueError:
-            end_line = len(lines)
-
-        start_line = max(0, start_line)
-        end_line = min(len(lines), end_line)
-
-        events, mac_addresses, mac_info, discovered_patterns, scanned_lines, last_log_timestamp = parse_log(log_path, start_line, end_line)
+    def process_log_file(self, log_path):
+        # The window is resolved by the worker: a time window reads the log up to its first timestamp.
+        # No end line means "to the end of the file", so the log is not pre-read just to count its lines.
+        start_text, end_text = self.start_line_input.text(), self.end_line_input.text()
 
         # Extract the base name of the input file and append "graph"
-        base_name = os.path.splitext(os.path.basename(log_path))[0]
+        base_name = log_base_name(log_path)
         output_filename = f"{base_name}_graph.html"
 
-        fig = create_timeline(events, mac_addresses, mac_info, last_log_timestamp, output_filename)
-
-        pyo.plot(fig, filename=output_filename, auto_open=True)
-
         self.log_path = log_path
 
+        # Compressed logs cannot grow in place, so they are always drawn once
+        if self.follow_checkbox.isChecked() and not is_compressed(log_path):
+            self.start_following(FollowJob(log_path, start_text, end_text, output_filename))
+            return
+
+        profile_path = f"{base_name}_profile.json" if self.profile_checkbox.isChecked() else None
+        self.pending_jobs.append(LogJob(log_path, start_text, end_text, output_filename, profile_path))
+        self.start_next_job()
+
+    def start_next_job(self):
+        if self.worker is not None:
+            self.show_status(self.status_text)
+            return
+        if not self.pending_jobs:
+            self.cancel_button.setEnabled(False)
+            return
+
+        job = self.pending_jobs.popleft()
+        self.worker = LogWorker(job, self)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.stage_changed.connect(self.show_stage)
+        self.worker.succeeded.connect(self.job_succeeded)
+        self.worker.failed.connect(self.job_failed)
+        self.worker.cancelled.connect(lambda: self.show_status("Cancelled"))
+        self.worker.finished.connect(self.job_finished)
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.show_status("Starting")
+        self.worker.start()
+
+    def show_status(self, text):
+        self.status_text = text
+        name = log_base_name(self.worker.job.log_path) if self.worker is not None else ""
+        queued = f" ({len(self.pending_jobs)} queued)" if self.pending_jobs else ""
+        self.status_label.setText(f"{name}: {text}{queued}" if name else text + queued)
+
+    def show_stage(self, stage):
+        if stage != "Parsing":
+            # Drawing reports no progress of its own
+            self.progress_bar.setRange(0, 0)
+        self.show_status(stage)
+
+    def show_progress(self, update):
+        if update.total_bytes:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(1000 * min(update.bytes_done / update.total_bytes, 1)))
+        else:
+            self.progress_bar.setRange(0, 0)
+        self.show_status(format_progress(update))
+
+    def job_succeeded(self, profiler):
+        self.show_status("Done")
+        if profiler is not None:
+            self.show_profile(profiler, self.worker.job.profile_path)
+
+    def job_failed(self, message):
+        self.show_status("Failed")
+        QMessageBox.warning(self, "Processing failed", f"{self.worker.job.log_path}\n\n{message}")
+
+    def job_finished(self):
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.worker.deleteLater()
+        self.worker = None
+        self.start_next_job()
+
+    def cancel_job(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.show_status("Cancelling")
+
+    def closeEvent(self, event):
+        self.pending_jobs.clear()
+        self.follow_timer.stop()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        if self.follow_worker is not None:
+            self.follow_worker.wait()
+        super().closeEvent(event)
+
+    def show_profile(self, profiler, profile_path):
+        message = QMessageBox(self)
+        message.setWindowTitle("Profile")
+        message.setText(f"<pre>{html.escape(profiler.report())}</pre>")
+        message.setInformativeText(f"Saved to {profile_path}")
+        message.exec_()
+
+    def start_following(self, follow_job):
+        self.follow_timer.stop()
+        self.follow_job = follow_job
+        # Made by the first FollowWorker
+        self.live_timeline = None
+        self.live_timeline_opened = False
+        self.update_live_timeline()
+        self.follow_timer.start(int(DEFAULT_POLL_INTERVAL * 1000))
+
+    def update_live_timeline(self):
+        # A poll that is still running (the first one parses the whole log) is not started twice
+        if self.follow_job is None or self.follow_worker is not None:
+            return
+        # The browser is opened on the first update that actually writes the graph
+        self.follow_worker = FollowWorker(self.follow_job, self.live_timeline, not self.live_timeline_opened, self)
+        self.follow_worker.updated.connect(self.live_timeline_updated)
+        self.follow_worker.failed.connect(self.follow_failed)
+        self.follow_worker.finished.connect(self.follow_update_finished)
+        self.follow_worker.start()
+
+    def live_timeline_updated(self, written):
+        # Following may have been stopped or restarted on another log meanwhile
+        if self.follow_worker.job is not self.follow_job:
+            return
+        self.live_timeline = self.follow_worker.live_timeline
+        if written:
+            self.live_timeline_opened = True
+
+    def follow_failed(self, message):
+        if self.follow_worker.job is self.follow_job:
+            self.follow_timer.stop()
+            self.follow_job = None
+            QMessageBox.warning(self, "Invalid window", message)
+
+    def follow_update_finished(self):
+        self.follow_worker.deleteLater()
+        self.follow_worker = None
+
+    def toggle_follow(self, checked):
+        if not checked:
+            self.follow_timer.stop()
+            self.follow_job = None
+            self.live_timeline = None
+        elif getattr(self, 'log_path', None):
+            self.process_log_file(self.log_path)
+
     def open_text_analyser(self):
         log_path = self.path_input.text()
-        if log_path and os.path.exists(log_path):
+        if log_path and os.path.exists(log_path) and not is_compressed(log_path):
             open_text_analyser(log_path)
 
 def main():
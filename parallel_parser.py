@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from event_store import EventStore
+from flow_validator import FlowValidator
+from log_parser import LogParser, flow_rules, parse_log
+from log_reader import detect_encoding, is_ascii_compatible, is_compressed, iter_log_lines, split_line_ranges
+from mac_registry import MacRegistry
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Stands for "whatever current_y the previous chunk ended with" until the chunks are stitched
+CARRIED_Y = "\0carried"
+
+
+class ChunkResult:
+    """What one worker returns for its byte range; the state it could not know is left as placeholders."""
+    __slots__ = ("store", "mac_registry", "current_y", "last_log_timestamp", "line_count", "validator")
+
+    def __init__(self, store, mac_registry, current_y, last_log_timestamp, line_count, validator):
+        self.store = store
+        self.mac_registry = mac_registry
+        self.current_y = current_y
+        self.last_log_timestamp = last_log_timestamp
+        self.line_count = line_count
+        self.validator = validator
+
+    def __getstate__(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def parse_chunk(log_path, encoding, start_offset, end_offset):
+    """
+    Parse the lines starting in [start_offset, end_offset) with line numbers relative to the chunk.
+
+    current_y starts as the CARRIED_Y placeholder, the last timestamp as None and the flow rules in
+    every state at once; stitch_chunks substitutes the real values once the previous chunks are known.
+    """
+    parser = LogParser(log_path, encoding)
+    parser.current_y = CARRIED_Y
+    parser.validator = FlowValidator.for_chunk(flow_rules, CARRIED_Y)
+    parser.consume(iter_log_lines(log_path, encoding, 0, None, (0, start_offset), end_offset))
+    return ChunkResult(parser.store, parser.mac_registry, parser.current_y, parser.last_log_timestamp,
+                       parser.next_line_number, parser.validator)
+
+
+def stitch_chunks(log_path, encoding, chunks, exporter=None):
+    """
+    Join chunk results in file order into exactly what a serial parse_log would have produced.
+
+    The sequential state is rebuilt chunk by chunk: the carried current_y replaces the placeholder
+    up to the chunk's first MAC hit or disconnect, the carried last timestamp fills rows and MAC
+    sightings the chunk could not timestamp, MAC touches are replayed in order, "AP poorly disc"
+    events are de-duplicated across chunks, the flow violations that depend on the state before the
+    chunk are decided, and the final "end" point is added. With an exporter, the complete row
+    groups are exported as each chunk is stitched.
+    """
+    store = EventStore(log_path, encoding)
+    mac_registry = MacRegistry()
+    validator = FlowValidator(flow_rules)
+    current_y = "disconnected"
+    last_log_timestamp = None
+    seen_ap_PD_timestamps = set()
+    line_offset = 0
+
+    for chunk in chunks:
+        chunk_store = chunk.store
+
+        keep = None
+        ap_PD_code = chunk_store.names.codes.get("AP poorly disc")
+        if ap_PD_code is not None:
+            timestamps = chunk_store.column("timestamp_ms")
+            ap_PD_rows = np.flatnonzero(chunk_store.column("name") == ap_PD_code)
+            keep = np.ones(len(chunk_store), dtype=bool)
+            for row in ap_PD_rows:
+                timestamp = int(timestamps[row])
+                if timestamp in seen_ap_PD_timestamps:
+                    keep[row] = False
+                seen_ap_PD_timestamps.add(timestamp)
+
+        first_row = len(store)
+        store.extend(chunk_store, line_offset, {CARRIED_Y: current_y}, last_log_timestamp, keep)
+        if keep is None:
+            rows = np.arange(first_row, len(store))
+        else:
+            rows = np.where(keep, first_row + np.cumsum(keep) - 1, -1)
+        validator.merge(chunk.validator, store, rows)
+        if exporter is not None:
+            exporter.write(store)
+        mac_registry.merge(chunk.mac_registry, last_log_timestamp)
+
+        if chunk.current_y != CARRIED_Y:
+            current_y = chunk.current_y
+        if chunk.last_log_timestamp is not None:
+            last_log_timestamp = chunk.last_log_timestamp
+        line_offset += chunk.line_count
+
+    store.finish(last_log_timestamp)
+    return store, mac_registry, last_log_timestamp
+
+
+def parse_log_parallel(log_path, start_line=0, end_line=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                       exporter=None):
+    """
+    Parse the whole log on a process pool, chunk_size bytes per task, and return the same
+    (event_store, mac_registry, last_log_timestamp) as parse_log.
+
+    Line windows, compressed logs (a stream cannot be entered in the middle) and encodings whose
+    newline is not a single "\\n" byte (UTF-16/32) fall back to the serial parser, as does a log
+    that fits in a single chunk. exporter is handled as by parse_log.
+    """
+    encoding = detect_encoding(log_path).encoding
+    if start_line != 0 or end_line is not None or is_compressed(log_path) or not is_ascii_compatible(encoding):
+        return parse_log(log_path, start_line, end_line, exporter=exporter)
+
+    ranges = split_line_ranges(log_path, chunk_size)
+    if len(ranges) <= 1 or workers == 1:
+        return parse_log(log_path, start_line, end_line, exporter=exporter)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        chunks = executor.map(parse_chunk, [log_path] * len(ranges), [encoding] * len(ranges),
+                              [start for start, _ in ranges], [end for _, end in ranges])
+        return stitch_chunks(log_path, encoding, chunks, exporter)
@@ -0,0 +1,109 @@
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+TIMESTAMP_REGEX = re.compile(r"(\d{2}/\d{2}/\d{2,4}-\d{2}:\d{2}:\d{2}\.\d{3})")
+
+BEACON_RX_REGEX = re.compile(
+    r'BEACON_RX - (?P<mac>[0-9A-F:]+), channel (?P<channel>\d+)\s*, band (?P<band>[\d._]+GHz), RSSI (?P<rssi>-?\d+), seq \d+\s+"(?P<ssid>[^"]+)"'
+)
+
+RSSI_REGEX = re.compile(r"Rssi:(-?\d+)")
+
+
+def literal_anchor(regex):
+    """
+    Return the longest literal substring that every match of the regex must contain,
+    or None when no such literal can be proven (top-level alternation, ignore-case, ...).
+    Only the top level of the pattern is inspected, which is enough for the
+    "<timestamp>.*<literal text>" layout used by patterns.json.
+    """
+    if regex.flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return None
+
+    best = ""
+    current = []
+    for op, value in parsed:
+        if op == sre_parse.LITERAL:
+            current.append(chr(value))
+            continue
+        if op == sre_parse.BRANCH:
+            return None
+        if len(current) > len(best):
+            best = "".join(current)
+        current = []
+    if len(current) > len(best):
+        best = "".join(current)
+    return best or None
+
+
+class CompiledPattern:
+    """
+    A single patterns.json rule with its regex compiled and its literal anchor extracted.
+    pattern_id is its position in PatternMatcher.pattern_table (None for the beacon regex).
+    """
+    __slots__ = ("index", "kind", "regex", "anchor", "status", "name", "pattern_id")
+
+    def __init__(self, index, kind, pattern, status=None, name=None, pattern_id=None):
+        self.index = index
+        self.kind = kind
+        self.regex = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+        self.anchor = literal_anchor(self.regex)
+        self.status = status
+        self.name = name
+        self.pattern_id = pattern_id
+
+    def search(self, line):
+        # The anchor test is a plain substring search; the regex only runs on candidate lines.
+        if self.anchor is not None and self.anchor not in line:
+            return None
+        return self.regex.search(line)
+
+
+class PatternMatcher:
+    """
+    All patterns.json rules compiled once, with a single literal prefilter in front of them.
+
+    A line that contains none of the rule anchors cannot match any rule, so
+    `is_candidate` rejects it with one regex scan instead of one scan per rule.
+
+    pattern_table lists the connectivity, info and MAC rules in that order. The parser stores
+    the position of the rule that found a row as its pattern ID, so later stages look the rule
+    up instead of matching the line again.
+    """
+
+    def __init__(self, patterns, beacon_regex=BEACON_RX_REGEX):
+        self.mac_patterns = [CompiledPattern(i, "mac", p) for i, p in enumerate(patterns["mac_patterns"])]
+        self.beacon_pattern = CompiledPattern(0, "beacon", beacon_regex)
+        self.connectivity_patterns = [
+            CompiledPattern(i, "connectivity", p["pattern"], p["status"])
+            for i, p in enumerate(patterns["connectivity_patterns"])
+        ]
+        self.info_patterns = [
+            CompiledPattern(i, "info", p["pattern"], p["status"], p["name"])
+            for i, p in enumerate(patterns["info_patterns"])
+        ]
+
+        self.pattern_table = self.connectivity_patterns + self.info_patterns + self.mac_patterns
+        for pattern_id, pattern in enumerate(self.pattern_table):
+            pattern.pattern_id = pattern_id
+
+        all_patterns = self.mac_patterns + [self.beacon_pattern] + self.connectivity_patterns + self.info_patterns
+        anchors = [p.anchor for p in all_patterns]
+        if None in anchors:
+            # At least one rule can match without a known literal, so every line is a candidate.
+            self.prefilter = None
+        else:
+            # Longest first so overlapping anchors do not shadow each other in the alternation.
+            unique_anchors = sorted(set(anchors), key=len, reverse=True)
+            self.prefilter = re.compile("|".join(re.escape(a) for a in unique_anchors))
+
+    def is_candidate(self, line):
+        return self.prefilter is None or self.prefilter.search(line) is not None
@@ -0,0 +1,285 @@
+import ctypes
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The profiler stages and matchers report into, None when profiling is off
+_active = None
+
+# Seconds between two looks at the process memory while profiling
+RSS_SAMPLE_INTERVAL = 0.01
+MB = 1024 * 1024
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_rss():
+    """The resident set size of this process in bytes, or None where it cannot be read cheaply."""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'rb') as file:
+                return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        return _windows_working_set()
+    return None
+
+
+def _windows_working_set():
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_current_process.restype = wintypes.HANDLE
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(get_current_process(), ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def profile_stage(name):
+    """Time the block as a stage of the active profiler; a no-op context when profiling is off."""
+    return _active.stage(name) if _active is not None else nullcontext()
+
+
+def profiled_matcher(matcher):
+    """The matcher to parse with: matcher itself, or an instrumented copy while profiling."""
+    return _active.wrap_matcher(matcher) if _active is not None else matcher
+
+
+class ProfiledPattern:
+    """
+    Stands in for a CompiledPattern and counts the lines it was tried on, the lines its regex
+    actually ran on (those that passed the literal anchor), its matches and the regex time.
+    """
+    __slots__ = ("index", "kind", "regex", "anchor", "status", "name", "pattern_id", "tried", "searched", "matched",
+                 "seconds")
+
+    def __init__(self, index, kind, regex, anchor=None, status=None, name=None, pattern_id=None):
+        self.index = index
+        self.kind = kind
+        self.regex = regex
+        self.anchor = anchor
+        self.status = status
+        self.name = name
+        self.pattern_id = pattern_id
+        self.tried = 0
+        self.searched = 0
+        self.matched = 0
+        self.seconds = 0.0
+
+    def search(self, line):
+        self.tried += 1
+        if self.anchor is not None and self.anchor not in line:
+            return None
+        self.searched += 1
+        start = time.perf_counter()
+        match = self.regex.search(line)
+        self.seconds += time.perf_counter() - start
+        if match:
+            self.matched += 1
+        return match
+
+    @classmethod
+    def wrap(cls, pattern):
+        return cls(pattern.index, pattern.kind, pattern.regex, pattern.anchor, pattern.status, pattern.name,
+                   pattern.pattern_id)
+
+
+class ProfiledMatcher:
+    """A PatternMatcher whose patterns and prefilter are all ProfiledPatterns."""
+
+    def __init__(self, matcher):
+        self.mac_patterns = [ProfiledPattern.wrap(p) for p in matcher.mac_patterns]
+        self.beacon_pattern = ProfiledPattern.wrap(matcher.beacon_pattern)
+        self.connectivity_patterns = [ProfiledPattern.wrap(p) for p in matcher.connectivity_patterns]
+        self.info_patterns = [ProfiledPattern.wrap(p) for p in matcher.info_patterns]
+        self.prefilter = matcher.prefilter
+        # The prefilter's "matches" are the candidate lines
+        self.prefilter_stats = ProfiledPattern(0, "prefilter", matcher.prefilter)
+
+    def is_candidate(self, line):
+        stats = self.prefilter_stats
+        stats.tried += 1
+        if self.prefilter is None:
+            stats.matched += 1
+            return True
+        stats.searched += 1
+        start = time.perf_counter()
+        candidate = self.prefilter.search(line) is not None
+        stats.seconds += time.perf_counter() - start
+        stats.matched += candidate
+        return candidate
+
+    def patterns(self):
+        return ([self.prefilter_stats, self.beacon_pattern] + self.mac_patterns + self.connectivity_patterns
+                + self.info_patterns)
+
+
+class Profiler:
+    """
+    Collects the wall time and memory of each stage (see profile_stage) and the per-pattern
+    counters of every parse that runs between `start` and `stop`:
+
+        profiler = Profiler()
+        profiler.start()
+        ...
+        profiler.stop()
+        print(profiler.report())
+
+    Memory is the process RSS, sampled every RSS_SAMPLE_INTERVAL seconds by a background thread:
+    a stage reports the highest RSS seen while it ran and how far that is above the RSS it
+    started with. Where the current RSS cannot be read (macOS), only the process high-water
+    mark is reported. Stages can nest. Parses running in other processes (parse_log_parallel,
+    batch workers) only show up in the stage times.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.matchers = []
+        self._stack = []
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        global _active
+        _active = self
+        if current_rss() is not None:
+            self._stopped.clear()
+            self._sampler = threading.Thread(target=self._sample_rss, name="profiler-rss", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample_rss(self):
+        while not self._stopped.wait(RSS_SAMPLE_INTERVAL):
+            self._record_rss(current_rss())
+
+    def _record_rss(self, rss):
+        if rss is None:
+            return
+        for frame in list(self._stack):
+            if rss > frame[3]:
+                frame[3] = rss
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def wrap_matcher(self, matcher):
+        profiled = ProfiledMatcher(matcher)
+        self.matchers.append(profiled)
+        return profiled
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def _enter_stage(self, name):
+        rss = current_rss() or 0
+        self._record_rss(rss)
+        # [name, start time, RSS at the start, highest RSS seen]
+        self._stack.append([name, time.perf_counter(), rss, rss])
+
+    def _exit_stage(self):
+        seconds = time.perf_counter() - self._stack[-1][1]
+        self._record_rss(current_rss())
+        name, _, start_rss, peak_rss = self._stack.pop()
+        if start_rss:
+            memory = {"peak_rss_mb": round(peak_rss / MB, 1), "added_mb": round((peak_rss - start_rss) / MB, 1)}
+        else:
+            memory = {"peak_rss_mb": peak_rss_mb(), "added_mb": None}
+        self.stages.append({"stage": name, "depth": len(self._stack), "seconds": round(seconds, 4), **memory})
+
+    def pattern_stats(self):
+        """Counters per pattern, summed over every parse, most regex time first."""
+        totals = {}
+        for matcher in self.matchers:
+            for pattern in matcher.patterns():
+                key = (pattern.kind, pattern.index)
+                stats = totals.get(key)
+                if stats is None:
+                    stats = totals[key] = {
+                        "kind": pattern.kind,
+                        "index": pattern.index,
+                        "label": pattern.name or pattern.status or "",
+                        "pattern": pattern.regex.pattern if pattern.regex is not None else None,
+                        "tried": 0, "searched": 0, "matched": 0, "seconds": 0.0,
+                    }
+                stats["tried"] += pattern.tried
+                stats["searched"] += pattern.searched
+                stats["matched"] += pattern.matched
+                stats["seconds"] += pattern.seconds
+        return sorted(totals.values(), key=lambda stats: stats["seconds"], reverse=True)
+
+    def to_json(self):
+        return {"stages": self.stages, "patterns": self.pattern_stats()}
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_json(), file, indent=2)
+
+    def report(self):
+        def number(value):
+            return "" if value is None else f"{value:.1f}"
+
+        lines = [f"{'stage':<28} {'seconds':>9} {'peak RSS MB':>12} {'added MB':>9}"]
+        # Stages are recorded as they finish, so enclosing ones come after their parts
+        for stage in self.stages:
+            label = "  " * stage["depth"] + stage["stage"]
+            lines.append(f"{label:<28} {stage['seconds']:>9.3f} {number(stage['peak_rss_mb']):>12} "
+                         f"{number(stage['added_mb']):>9}")
+        pattern_stats = self.pattern_stats()
+        if pattern_stats:
+            lines.append("")
+            lines.append(f"{'pattern':<34} {'tried':>10} {'regex runs':>10} {'matched':>9} {'regex ms':>9}")
+            for stats in pattern_stats:
+                label = f"{stats['kind']}[{stats['index']}] {stats['label']}"[:34]
+                lines.append(f"{label:<34} {stats['tried']:>10} {stats['searched']:>10} {stats['matched']:>9} "
+                             f"{stats['seconds'] * 1000:>9.1f}")
+        return "\n".join(lines)
+
+
+class _Stage:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter_stage(self.name)
+
+    def __exit__(self, *exc_info):
+        self.profiler._exit_stage()
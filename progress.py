@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import namedtuple
+
+from log_reader import is_compressed, log_stat
+
+# Lines between two progress reports (and two looks at the cancel flag)
+PROGRESS_INTERVAL = 20000
+
+# total_bytes and eta_seconds are None for compressed logs, whose line offsets count uncompressed bytes
+ProgressUpdate = namedtuple("ProgressUpdate", "bytes_done total_bytes events eta_seconds")
+
+
+class ParseCancelled(Exception):
+    pass
+
+
+class ParseProgress:
+    """
+    Reports how far a parse got and lets another thread stop it.
+
+    The parse functions run their lines through `track`, which every PROGRESS_INTERVAL lines
+    calls callback with a ProgressUpdate and raises ParseCancelled once `cancel` was called.
+    Stopping at a line boundary this way leaves nothing half written: the line index and the
+    result cache are only saved after a parse completes.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise ParseCancelled()
+
+    def track(self, lines, store, log_path):
+        """Yield the (line_number, byte_offset, line) tuples of lines, reporting the rows in store."""
+        total_bytes = None if is_compressed(log_path) else log_stat(log_path).st_size
+        started = time.perf_counter()
+        first_offset = None
+        countdown = PROGRESS_INTERVAL
+        for item in lines:
+            yield item
+            countdown -= 1
+            if countdown:
+                continue
+            countdown = PROGRESS_INTERVAL
+            self.check_cancelled()
+
+            offset = item[1]
+            if first_offset is None:
+                first_offset = offset
+                started = time.perf_counter()
+                continue
+            if self.callback is None:
+                continue
+            eta_seconds = None
+            elapsed = time.perf_counter() - started
+            if total_bytes is not None and offset > first_offset:
+                eta_seconds = max(0.0, (total_bytes - offset) * elapsed / (offset - first_offset))
+            self.callback(ProgressUpdate(offset, total_bytes, len(store), eta_seconds))
+
+
+def tracked(lines, progress, store, log_path):
+    """lines, run through progress.track when there is a progress to report to."""
+    return lines if progress is None else progress.track(lines, store, log_path)
@@ -0,0 +1,167 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+import numpy as np
+
+from event_store import EventStore
+from log_parser import parse_log, patterns
+from log_reader import log_stat, split_member
+from mac_registry import MacRegistry
+from pattern_matcher import BEACON_RX_REGEX, RSSI_REGEX, TIMESTAMP_REGEX
+
+# Bump when the parser starts producing different results for the same log and patterns
+CACHE_VERSION = 3
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.grapholog', 'cache')
+CACHE_SUFFIX = '.glcache'
+DEFAULT_MAX_CACHE_BYTES = 1024 * 1024 * 1024
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+
+
+def log_fingerprint(log_path):
+    """
+    (size, mtime, hash of the first and last FINGERPRINT_BLOCK_SIZE bytes, archive member) of the
+    log. For a compressed log these describe the compressed file, which is cheaper to read.
+    """
+    file_path, member = split_member(log_path)
+    stat = log_stat(log_path)
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(FINGERPRINT_BLOCK_SIZE))
+        file.seek(max(0, stat.st_size - FINGERPRINT_BLOCK_SIZE))
+        digest.update(file.read(FINGERPRINT_BLOCK_SIZE))
+    return stat.st_size, stat.st_mtime_ns, digest.hexdigest(), member
+
+
+def patterns_hash():
+    """Hash of everything the parser matches with: patterns.json and the built-in regexes."""
+    regexes = [TIMESTAMP_REGEX.pattern, BEACON_RX_REGEX.pattern, RSSI_REGEX.pattern]
+    text = json.dumps([patterns, regexes], sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(log_path, start_line=0, end_line=None, start_time=None, end_time=None):
+    time_window = [t.isoformat() if t else None for t in (start_time, end_time)]
+    key = json.dumps([CACHE_VERSION, log_fingerprint(log_path), start_line, end_line, time_window, patterns_hash()])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent cache of parse results, one file per (log fingerprint, line or time window, patterns hash).
+
+    Each entry is an uncompressed NumPy .npz archive holding the event store columns as raw
+    arrays plus a small JSON header (interned tables, MAC registry, last timestamp), so a hit
+    is a handful of array reads. Entries are evicted least recently used first once the cache
+    grows past max_bytes; a hit refreshes the entry's mtime, which is the LRU clock.
+    A changed log or patterns.json simply produces a different key.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def load(self, key, log_path):
+        """Return the cached (event_store, mac_registry, last_log_timestamp), or None on a miss."""
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as archive:
+                header = json.loads(archive["header"].tobytes().decode('utf-8'))
+                columns = {name: archive[name] for name, _ in EventStore.COLUMNS}
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+        store = EventStore.from_state({
+            "log_path": log_path,
+            "encoding": header["encoding"],
+            "statuses": header["statuses"],
+            "labels": header["labels"],
+            "names": header["names"],
+            "columns": columns,
+        })
+        last_log_timestamp = header["last_log_timestamp"]
+        last_log_timestamp = datetime.fromisoformat(last_log_timestamp) if last_log_timestamp else None
+        return store, MacRegistry.from_json(header["mac_registry"]), last_log_timestamp
+
+    def save(self, key, result):
+        event_store, mac_registry, last_log_timestamp = result
+        state = event_store.state()
+        header = {
+            "encoding": state["encoding"],
+            "statuses": state["statuses"],
+            "labels": state["labels"],
+            "names": state["names"],
+            "mac_registry": mac_registry.to_json(),
+            "last_log_timestamp": last_log_timestamp.isoformat() if last_log_timestamp else None,
+        }
+        buffer = io.BytesIO()
+        np.savez(buffer, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8),
+                 **state["columns"])
+
+        entry_path = self._entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                file.write(buffer.getbuffer())
+            # Readers never see a half-written entry
+            os.replace(temp_path, entry_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(CACHE_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def parse_log_cached(log_path, start_line=0, end_line=None, parse=parse_log, cache=None, start_time=None,
+                     end_time=None, progress=None):
+    """
+    parse_log through the result cache: a hit skips encoding detection and parsing entirely,
+    a miss parses with parse (e.g. parse_log_parallel) and stores the result. A time window
+    (start_time/end_time) and a progress are passed on to parse as keywords.
+    """
+    def parse_window():
+        options = {}
+        if start_time is not None or end_time is not None:
+            options.update(start_time=start_time, end_time=end_time)
+        if progress is not None:
+            options["progress"] = progress
+        return parse(log_path, start_line, end_line, **options)
+
+    cache = cache or ResultCache()
+    try:
+        key = cache_key(log_path, start_line, end_line, start_time, end_time)
+    except OSError:
+        return parse_window()
+
+    result = cache.load(key, log_path)
+    if result is None:
+        result = parse_window()
+        cache.save(key, result)
+    return result
@@ -0,0 +1,237 @@
+"""
+Connection-session KPIs: the durations the timeline only shows as gaps, per log and across a fleet.
+
+The "durations" of the session_kpis section of patterns.json pair a start status with an end
+status, e.g. Attempt_to_connect with connected. An end is paired with the latest start since the
+previous end or abort (the first such start with "from_first_start", so time-to-connect counts
+the retries), and a start aborted before its end is not paired. The pairing runs on whole
+columns of the EventStore with NumPy, in log order; durations of pairs the clock jumped back
+across are dropped. Next to them come the disconnects per BSSID and the RSSI at each attempt.
+
+For fleet numbers every log also yields fixed-bin histograms (log-spaced for durations, one bin
+per dBm for RSSI), which FleetKpis adds up, so the percentiles of thousands of logs take the
+memory of one histogram per KPI, whatever the number of sessions.
+"""
+import math
+
+import numpy as np
+
+from event_store import KIND_EVENT, NO_RSSI, NO_TIMESTAMP
+from log_parser import patterns
+
+DURATION_KPIS = patterns['session_kpis']['durations']
+DISCONNECT_STATUSES = patterns['session_kpis']['disconnects']
+# The parser only reads the RSSI of "Attempt_to_connect" lines
+RSSI_KPI = "rssi_at_attempt"
+PERCENTILES = (50, 90, 95, 99)
+
+# Duration bins: bin 0 holds durations under 1 ms, bin k >= 1 those in [RATIO**(k-1), RATIO**k) ms,
+# so a fleet percentile is off by less than 2%. The last bin takes everything above ~10 days.
+DURATION_BIN_RATIO = 1.02
+DURATION_BIN_COUNT = 1 + math.ceil(math.log(10 * 24 * 3600 * 1000) / math.log(DURATION_BIN_RATIO))
+# RSSI bins: one per dBm from RSSI_BIN_MIN up
+RSSI_BIN_MIN = -128
+RSSI_BIN_COUNT = 129
+
+
+def duration_bins(durations_ms):
+    durations_ms = np.asarray(durations_ms, dtype=np.float64)
+    bins = np.zeros(len(durations_ms), dtype=np.int64)
+    positive = durations_ms >= 1
+    bins[positive] = np.floor(np.log(durations_ms[positive]) / math.log(DURATION_BIN_RATIO)).astype(np.int64) + 1
+    return np.minimum(bins, DURATION_BIN_COUNT - 1)
+
+
+def duration_bin_values(bins):
+    """The value a duration bin stands for: the geometric middle of its range (0 for bin 0)."""
+    bins = np.asarray(bins, dtype=np.float64)
+    return np.where(bins > 0, DURATION_BIN_RATIO ** (bins - 0.5), 0.0)
+
+
+def rssi_bins(rssi):
+    return np.clip(np.asarray(rssi, dtype=np.int64) - RSSI_BIN_MIN, 0, RSSI_BIN_COUNT - 1)
+
+
+def rssi_bin_values(bins):
+    return np.asarray(bins, dtype=np.float64) + RSSI_BIN_MIN
+
+
+def _status_mask(store, statuses, rows=None):
+    """Which rows (all, or the given ones) have one of statuses; statuses the store never saw match nothing."""
+    codes = [store.statuses.codes[status] for status in statuses if status in store.statuses.codes]
+    status_codes = store.column("status")
+    return np.isin(status_codes if rows is None else status_codes[rows], codes)
+
+
+def pair_rows(store, kpi):
+    """
+    The (start rows, end rows) of the sessions of one DURATION_KPIS entry, in log order.
+
+    Only the rows with one of the kpi's statuses take part. For each end, the last end or abort
+    before it is found with a running maximum, and the start paired with it is the latest start
+    after that (running maximum) or, with from_first_start, the first (a searchsorted).
+    """
+    events = np.flatnonzero(store.column("kind") == KIND_EVENT)
+    is_start = _status_mask(store, kpi["start"], events)
+    is_end = _status_mask(store, kpi["end"], events)
+    is_abort = _status_mask(store, kpi.get("abort", ()), events)
+    relevant = is_start | is_end | is_abort
+    events, is_start, is_end, is_abort = events[relevant], is_start[relevant], is_end[relevant], is_abort[relevant]
+
+    positions = np.arange(len(events))
+    last_close = np.maximum.accumulate(np.where(is_end | is_abort, positions, -1)) if len(events) else positions
+    # The last end or abort strictly before each position
+    close_before = np.concatenate(([-1], last_close[:-1])) if len(events) else positions
+    ends = np.flatnonzero(is_end)
+    if kpi.get("from_first_start"):
+        starts = np.flatnonzero(is_start)
+        next_start = np.searchsorted(starts, close_before[ends], side="right")
+        paired = next_start < len(starts)
+        paired[paired] = starts[next_start[paired]] < ends[paired]
+        start_positions = starts[next_start[paired]]
+    else:
+        last_start = np.maximum.accumulate(np.where(is_start, positions, -1)) if len(events) else positions
+        paired = last_start[ends] > close_before[ends]
+        start_positions = last_start[ends][paired]
+    return events[start_positions], events[ends[paired]]
+
+
+def session_rows(store, kpi):
+    """
+    The (start rows, end rows, durations in ms) of the sessions of one DURATION_KPIS entry,
+    without the pairs missing a timestamp or across a clock jump back.
+    """
+    starts, ends = pair_rows(store, kpi)
+    timestamps = store.column("timestamp_ms")
+    start_ms, end_ms = timestamps[starts], timestamps[ends]
+    valid = (start_ms != NO_TIMESTAMP) & (end_ms >= start_ms)
+    return starts[valid], ends[valid], end_ms[valid] - start_ms[valid]
+
+
+def sessions(store):
+    """
+    Every paired session of store as a pandas DataFrame: kpi, start, end, duration_ms, start_line,
+    end_line and the BSSID lane the end event is on (None on the disconnected lane).
+    """
+    import pandas as pd
+
+    timestamps = store.column("timestamp_ms")
+    line_numbers = store.column("line_number")
+    lanes = store.column("y")
+    disconnected = store.labels.codes.get("disconnected", -2)
+    frames = []
+    for kpi in DURATION_KPIS:
+        starts, ends, durations = session_rows(store, kpi)
+        end_lanes = lanes[ends]
+        frames.append(pd.DataFrame({
+            "kpi": kpi["id"],
+            "start": timestamps[starts].view("datetime64[ms]"),
+            "end": timestamps[ends].view("datetime64[ms]"),
+            "duration_ms": durations,
+            "start_line": line_numbers[starts],
+            "end_line": line_numbers[ends],
+            "bssid": pd.Categorical.from_codes(np.where(end_lanes == disconnected, -1, end_lanes),
+                                               categories=store.labels.values, validate=False),
+        }))
+    table = pd.concat(frames, ignore_index=True)
+    table["kpi"] = pd.Categorical(table["kpi"], categories=[kpi["id"] for kpi in DURATION_KPIS])
+    return table
+
+
+def rssi_at_attempt(store):
+    """The RSSI (dBm) read at each Attempt_to_connect, in log order."""
+    rssi = store.column("rssi")[(store.column("kind") == KIND_EVENT) & _status_mask(store, ["Attempt_to_connect"])]
+    return rssi[rssi != NO_RSSI]
+
+
+def disconnects_per_bssid(store):
+    """
+    How many disconnects happened on each BSSID lane, most first: one per move of the lane onto the
+    disconnected lane by a DISCONNECT_STATUSES event. A deauth keeps its BSSID lane, so the
+    "disconnected" row after it is the move and the pair counts once.
+    """
+    disconnected = store.labels.codes.get("disconnected")
+    if disconnected is None:
+        return {}
+    rows = np.flatnonzero(store.column("kind") == KIND_EVENT)
+    lanes = store.column("y")[rows]
+    moves = (lanes[1:] == disconnected) & (lanes[:-1] != disconnected) & _status_mask(store, DISCONNECT_STATUSES,
+                                                                                      rows[1:])
+    # The lane before the move is the one it left
+    counts = np.bincount(lanes[:-1][moves], minlength=len(store.labels.values))
+    order = np.argsort(-counts, kind="stable")
+    return {store.labels.values[code]: int(counts[code]) for code in order if counts[code]}
+
+
+def _summary(values):
+    if not len(values):
+        return {"count": 0}
+    values = np.asarray(values, dtype=np.float64)
+    summary = {"count": int(len(values)), "mean": round(float(values.mean()), 1),
+               "min": float(values.min()), "max": float(values.max())}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{percentile}"] = round(float(value), 1)
+    return summary
+
+
+def _sparse_histogram(bins, bin_count):
+    counts = np.bincount(bins, minlength=bin_count)
+    occupied = np.flatnonzero(counts)
+    return {"bins": occupied.tolist(), "counts": counts[occupied].tolist()}
+
+
+def log_kpis(store):
+    """
+    The KPIs of one log: exact statistics of every duration KPI (in ms) and of the RSSI at attempt,
+    the disconnects per BSSID, and the sparse histograms FleetKpis adds up.
+    """
+    rssi = rssi_at_attempt(store)
+    kpis = {}
+    histograms = {}
+    for kpi in DURATION_KPIS:
+        _, _, durations = session_rows(store, kpi)
+        kpis[kpi["id"]] = _summary(durations)
+        histograms[kpi["id"]] = _sparse_histogram(duration_bins(durations), DURATION_BIN_COUNT)
+    kpis[RSSI_KPI] = _summary(rssi)
+    histograms[RSSI_KPI] = _sparse_histogram(rssi_bins(rssi), RSSI_BIN_COUNT)
+    return {"kpis": kpis, "disconnects_per_bssid": disconnects_per_bssid(store), "kpi_histograms": histograms}
+
+
+class FleetKpis:
+    """
+    KPI percentiles across many logs, from the histograms of log_kpis: `add` folds one log in
+    and `summary` reads the percentiles off the summed histograms (durations to within 2%).
+    Memory is one fixed-size histogram per KPI and the disconnects are only totalled, so nothing
+    grows with the number of logs or sessions.
+    """
+
+    def __init__(self):
+        self.histograms = {kpi["id"]: np.zeros(DURATION_BIN_COUNT, dtype=np.int64) for kpi in DURATION_KPIS}
+        self.histograms[RSSI_KPI] = np.zeros(RSSI_BIN_COUNT, dtype=np.int64)
+        self.log_count = 0
+        self.disconnects = 0
+
+    def add(self, kpis):
+        """Fold in the log_kpis of one log."""
+        self.log_count += 1
+        self.disconnects += sum(kpis["disconnects_per_bssid"].values())
+        for kpi_id, histogram in kpis["kpi_histograms"].items():
+            if kpi_id in self.histograms:
+                np.add.at(self.histograms[kpi_id], histogram["bins"], histogram["counts"])
+
+    def summary(self):
+        fleet = {"logs": self.log_count, "disconnects": self.disconnects, "kpis": {}}
+        for kpi_id, counts in self.histograms.items():
+            total = int(counts.sum())
+            if not total:
+                fleet["kpis"][kpi_id] = {"count": 0}
+                continue
+            bin_values = rssi_bin_values if kpi_id == RSSI_KPI else duration_bin_values
+            cumulative = np.cumsum(counts)
+            summary = {"count": total}
+            for percentile in PERCENTILES:
+                # The bin holding the value of rank ceil(p% of total)
+                rank = max(1, math.ceil(percentile / 100 * total))
+                summary[f"p{percentile}"] = round(float(bin_values(np.searchsorted(cumulative, rank))), 1)
+            fleet["kpis"][kpi_id] = summary
+        return fleet
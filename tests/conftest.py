@@ -0,0 +1,29 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+@pytest.fixture
+def wifi_log(tmp_path):
+    """
+    A copy of a short log with two connections, a failed attempt, a suspend/resume and a link
+    switch, so the line index sidecars go to a temporary directory.
+    """
+    return shutil.copy(os.path.join(DATA_DIR, 'wifi.log'), str(tmp_path / 'wifi.log'))
+
+
+@pytest.fixture
+def small_time_blocks(monkeypatch):
+    """Index a time block every 2 lines instead of every 10000, so the fixture log spans many."""
+    import line_index
+    import log_parser
+
+    monkeypatch.setattr(line_index, 'TIME_BLOCK_INTERVAL', 2)
+    monkeypatch.setattr(log_parser, 'TIME_BLOCK_INTERVAL', 2)
@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import batch
+from event_export import EventExporter
+
+
+class FileOnlyExporter(EventExporter):
+    """An EventExporter whose writer is a plain file, so its clean-up runs without pyarrow."""
+
+    def __init__(self, path, log_name, export_format='parquet'):
+        self.path = path
+        self.row_group_size = 1 << 20
+        self.rows_exported = 0
+        self._store = None
+        self._writer = open(path, 'wb')
+
+    def write(self, store):
+        pass
+
+
+def test_process_log(tmp_path, wifi_log):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    summary = batch.process_log(wifi_log, str(output_dir), "wifi")
+    assert summary["status"] == "ok", summary.get("traceback")
+    assert summary["event_count"] > 0 and os.path.exists(summary["graph"])
+    assert (output_dir / "wifi_summary.json").exists()
+    # A batch parses every log once, so it leaves no line index next to it
+    assert not os.path.exists(wifi_log + ".glidx")
+
+
+def test_a_failing_log_does_not_stop_the_batch(tmp_path, wifi_log):
+    output_dir = str(tmp_path / "out")
+    missing_log = str(tmp_path / "missing.log")
+    summaries = batch.run_batch([wifi_log, missing_log], output_dir, workers=1)
+    assert [summary["status"] for summary in summaries] == ["ok", "error"]
+    assert summaries[1]["error"].startswith("FileNotFoundError")
+    assert os.path.exists(os.path.join(output_dir, "missing_summary.json"))
+
+
+def test_find_logs(tmp_path, wifi_log):
+    nested_log = tmp_path / "device" / "wifi.log"
+    nested_log.parent.mkdir()
+    shutil.copy(wifi_log, nested_log)
+    (tmp_path / "notes.txt").write_text("not a log\n")
+    assert batch.find_logs([str(tmp_path)]) == sorted([wifi_log, str(nested_log)])
+    assert batch.find_logs([str(tmp_path / "*.log"), wifi_log]) == [wifi_log]
+    assert list(batch.output_names([wifi_log, str(nested_log)]).values()) == ["wifi", "wifi_2"]
+
+
+def test_process_log_removes_a_partial_export(tmp_path, wifi_log, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("no timeline")
+
+    monkeypatch.setattr(batch, "EventExporter", FileOnlyExporter)
+    monkeypatch.setattr(batch, "create_timeline", fail)
+    summary = batch.process_log(wifi_log, str(tmp_path), "wifi", export_format="parquet")
+    assert summary["status"] == "error" and summary["error"] == "RuntimeError: no timeline"
+    assert not (tmp_path / "wifi_events.parquet").exists()
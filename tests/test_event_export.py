@@ -0,0 +1,49 @@
+import sys
+
+import pytest
+
+from event_export import EventExporter, check_export_format
+from log_parser import parse_log
+
+
+def test_exporting_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ValueError, match="pip install pyarrow"):
+        EventExporter(str(tmp_path / "events.parquet"), "wifi")
+    assert not (tmp_path / "events.parquet").exists()
+
+
+def test_a_missing_package_fails_before_the_parse(monkeypatch):
+    with pytest.raises(ValueError, match="one of parquet, arrow, excel"):
+        check_export_format('csv')
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    monkeypatch.setitem(sys.modules, 'openpyxl', None)
+    with pytest.raises(ValueError, match="pip install pyarrow"):
+        check_export_format('arrow')
+    with pytest.raises(ValueError, match="pip install openpyxl"):
+        check_export_format('excel')
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_export(tmp_path, wifi_log, export_format):
+    pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    event_store = parse_log(wifi_log, use_index=False)[0]
+    path = str(tmp_path / f"events.{export_format}")
+    exporter = EventExporter(path, "wifi", export_format, row_group_size=4)
+    exporter.write(event_store)
+    exporter.close(event_store)
+
+    if export_format == 'parquet':
+        table = pyarrow.parquet.read_table(path)
+    else:
+        with pyarrow.ipc.open_file(path) as reader:
+            table = reader.read_all()
+    # Every row but the "end" point
+    rows = list(event_store.iter_events(include_mac_rows=True))[:-1]
+    assert exporter.rows_exported == table.num_rows == len(rows)
+    assert table.column("line_number").to_pylist() == [row.line_number for row in rows]
+    assert table.column("status").to_pylist() == [row.status for row in rows]
+    assert set(table.column("log").to_pylist()) == {"wifi"}
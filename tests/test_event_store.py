@@ -0,0 +1,40 @@
+from event_store import KIND_END
+from log_parser import parse_log
+
+
+def test_texts_are_read_back_from_the_log(wifi_log):
+    event_store = parse_log(wifi_log, use_index=False)[0]
+    events = list(event_store.iter_events())
+    assert event_store.texts([events[-1].index, events[2].index]) == [
+        "End of Log", "Line 5: 03/05/2024-10:00:00.300 [mlme ] AUTH_REQ - sent to: AA:BB:CC:00:00:01"]
+    assert event_store.as_dicts()[2]["pattern"] == event_store.texts([events[2].index])[0]
+
+
+def test_finish_keeps_a_single_end_point(wifi_log):
+    event_store, _, last_log_timestamp = parse_log(wifi_log, use_index=False)
+    row_count = len(event_store)
+    event_store.finish(last_log_timestamp)
+    assert len(event_store) == row_count
+    assert (event_store.column("kind") == KIND_END).sum() == 1
+
+
+def test_to_dataframe(wifi_log):
+    event_store = parse_log(wifi_log, use_index=False)[0]
+    events = list(event_store.iter_events())
+    dataframe = event_store.to_dataframe()
+    assert len(dataframe) == len(event_store)
+    rows = dataframe.iloc[event_store.event_indices()]
+    assert rows["status"].tolist() == [event.status for event in events]
+    assert rows["y"].tolist() == [event.y for event in events]
+    assert rows["line_number"].tolist() == [event.line_number for event in events]
+
+
+def test_columns_grow_past_their_capacity(tmp_path):
+    log_path = str(tmp_path / "alive.log")
+    with open(log_path, 'w', encoding='utf-8') as file:
+        for n in range(3000):
+            file.write(f"03/05/2024-10:{n // 60000:02d}:{n // 1000 % 60:02d}.{n % 1000:03d} [core ] uCode is alive\n")
+    event_store = parse_log(log_path, use_index=False)[0]
+    assert len(event_store) == 3001
+    assert event_store.column("line_number").tolist() == list(range(3000)) + [-1]
+    assert event_store.column("timestamp_ms")[2999] - event_store.column("timestamp_ms")[0] == 2999
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+from flow_validator import check_flow_validity, flow_violations
+from log_parser import flow_rules, parse_log
+from parallel_parser import parse_log_parallel
+
+ATTEMPT = "{} [sme  ] [ATTEMPT_TO_CONNECT] Rssi:-45"
+AUTH_REQ = "{} [mlme ] AUTH_REQ - sent to: AA:BB:CC:00:00:01"
+CONNECTED = "{} [mlme ] ENCRYPTION READY!!! - For control flows only"
+MAC = "| 3 | 1 | 0 | BSS | LINK | Address(AA:BB:CC:00:00:01)"
+
+
+def write_log(tmp_path, lines):
+    log_path = tmp_path / "flow.log"
+    log_path.write_text("".join(line + "\n" for line in lines))
+    return str(log_path)
+
+
+def violations(event_store):
+    return [(line_number, rule_id) for _, line_number, rule_id in flow_violations(event_store, flow_rules)]
+
+
+def test_auth_req_without_attempt(tmp_path):
+    log_path = write_log(tmp_path, [
+        AUTH_REQ.format("03/05/2024-10:00:00.000"),
+        ATTEMPT.format("03/05/2024-10:00:01.000"),
+        AUTH_REQ.format("03/05/2024-10:00:01.500"),
+    ])
+    event_store = parse_log(log_path, use_index=False)[0]
+    assert violations(event_store) == [(0, "auth_req_without_attempt")]
+    assert check_flow_validity(event_store)
+
+
+def test_auth_req_not_after_the_attempt(tmp_path):
+    # As the original check did, an auth_req timestamped at or before the last Attempt_to_connect is flagged
+    log_path = write_log(tmp_path, [
+        ATTEMPT.format("03/05/2024-10:00:00.000"),
+        AUTH_REQ.format("03/05/2024-10:00:00.000"),
+        ATTEMPT.format("03/05/2024-10:00:01.000"),
+        AUTH_REQ.format("03/05/2024-10:00:00.500"),
+        ATTEMPT.format("03/05/2024-10:00:02.000"),
+        AUTH_REQ.format("03/05/2024-10:00:02.001"),
+    ])
+    event_store = parse_log(log_path, use_index=False)[0]
+    assert violations(event_store) == [(1, "auth_req_without_attempt"), (3, "auth_req_without_attempt")]
+
+
+def test_connected_while_disconnected(tmp_path):
+    log_path = write_log(tmp_path, [
+        CONNECTED.format("03/05/2024-10:00:00.000"),
+        MAC,
+        CONNECTED.format("03/05/2024-10:00:01.000"),
+    ])
+    event_store = parse_log(log_path, use_index=False)[0]
+    assert violations(event_store) == [(0, "connected_while_disconnected")]
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_time_window_starting_after_the_attempt(tmp_path, use_index):
+    # The Attempt_to_connect is outside the window, but the auth_req in it still follows one
+    log_path = write_log(tmp_path, [
+        ATTEMPT.format("03/05/2024-10:00:00.000"),
+        AUTH_REQ.format("03/05/2024-10:00:01.000"),
+        AUTH_REQ.format("03/05/2024-10:00:02.000"),
+        ATTEMPT.format("03/05/2024-10:00:03.000"),
+    ])
+    event_store = parse_log(log_path, use_index=use_index, start_time=datetime(2024, 3, 5, 10, 0, 0, 500000),
+                            end_time=datetime(2024, 3, 5, 10, 0, 2, 500000))[0]
+    assert event_store.column("line_number").tolist() == [1, 2, -1]
+    assert violations(event_store) == []
+
+
+@pytest.mark.parametrize("chunk_size", [60, 150, 400])
+def test_parallel_parse_decides_violations_across_chunks(tmp_path, chunk_size):
+    lines = []
+    for second in range(10):
+        lines += [ATTEMPT.format(f"03/05/2024-10:00:{second:02}.000"),
+                  AUTH_REQ.format(f"03/05/2024-10:00:{second:02}.{'000' if second % 3 else '100'}"),
+                  CONNECTED.format(f"03/05/2024-10:00:{second:02}.200")]
+        if second == 4:
+            lines.append(MAC)
+    log_path = write_log(tmp_path, lines)
+    expected = violations(parse_log(log_path, use_index=False)[0])
+    assert expected
+    assert violations(parse_log_parallel(log_path, workers=2, chunk_size=chunk_size)[0]) == expected
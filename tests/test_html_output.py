@@ -0,0 +1,41 @@
+import math
+from datetime import datetime
+
+import numpy as np
+import plotly.graph_objects as go
+
+from html_output import PLOTLYJS_NAME, plot_array, timeline_html, write_timeline_html
+from timestamp_parser import to_epoch_ms
+
+START = datetime(2024, 3, 5, 10, 0, 0)
+
+
+def test_plot_array():
+    x_values = plot_array([START, None, datetime(2024, 3, 5, 10, 0, 1)])
+    assert x_values.dtype == np.float64
+    assert x_values[0] == to_epoch_ms(START) and math.isnan(x_values[1]) and x_values[2] - x_values[0] == 1000
+    assert plot_array([0, 1, 2]).dtype == np.int32
+    assert plot_array([0.5, None]).dtype == np.float64
+    assert plot_array(["a", "b"]) == ["a", "b"]
+
+
+def figure(point_count=10):
+    return go.Figure(go.Scatter(x=plot_array([datetime.fromtimestamp(n) for n in range(point_count)]),
+                                y=plot_array([n % 3 for n in range(point_count)])))
+
+
+def test_plotlyjs_is_written_next_to_the_page(tmp_path):
+    output_filename = tmp_path / "graph.html"
+    write_timeline_html(figure(), str(output_filename))
+    page = output_filename.read_text(encoding='utf-8')
+    assert (tmp_path / PLOTLYJS_NAME).exists()
+    assert f'src="{PLOTLYJS_NAME}"' in page
+    # The arrays are embedded as typed arrays, not as lists of numbers
+    assert '"bdata"' in page
+
+
+def test_compressed_page():
+    fig = figure(20000)
+    page = timeline_html(fig, 'cdn', compress=True)
+    assert "DecompressionStream" in page
+    assert len(page) < len(timeline_html(fig, 'cdn')) / 2
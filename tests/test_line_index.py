@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+
+import pytest
+
+import line_index
+from line_index import INDEX_SUFFIX, LineIndex
+from log_parser import extend_index
+from log_reader import iter_log_lines
+
+MAC_1 = "AA:BB:CC:00:00:01"
+INTERVAL = 4
+
+# Checkpoints are taken at time block starts, so the blocks have to be smaller than INTERVAL
+pytestmark = pytest.mark.usefixtures("small_time_blocks")
+
+
+@pytest.fixture(autouse=True)
+def short_head_hash(monkeypatch):
+    # The whole fixture log is shorter than HEAD_HASH_SIZE, so growing it would change its head
+    monkeypatch.setattr(line_index, 'HEAD_HASH_SIZE', 64)
+
+
+def build_index(log_path):
+    index = LineIndex.load(log_path, 'utf-8', INTERVAL)
+    extend_index(index, None)
+    index.save()
+    return index
+
+
+def line_starts(log_path):
+    return [byte_offset for _, byte_offset, _ in iter_log_lines(log_path, 'utf-8')]
+
+
+def test_checkpoints(wifi_log):
+    index = build_index(wifi_log)
+    starts = line_starts(wifi_log)
+    assert [checkpoint.position for checkpoint in index.checkpoints] == \
+        [(line_number, starts[line_number]) for line_number in range(0, len(starts), INTERVAL)]
+    assert LineIndex.load(wifi_log, 'utf-8', INTERVAL).checkpoints[-1].position == index.checkpoints[-1].position
+
+    # The parser state reached at line 12, with the timestamp of line 10 carried over line 11
+    checkpoint = index.checkpoint_before(13)
+    assert checkpoint.line_number == 12
+    assert checkpoint.current_y == MAC_1
+    assert checkpoint.last_log_timestamp == datetime(2024, 3, 5, 10, 0, 5)
+
+
+def test_growth_keeps_the_checkpoints(wifi_log):
+    positions = [checkpoint.position for checkpoint in build_index(wifi_log).checkpoints]
+    with open(wifi_log, 'a', encoding='utf-8') as file:
+        for n in range(8):
+            file.write(f"03/05/2024-10:00:5{n}.000 [misc ] idle\n")
+
+    index = LineIndex.load(wifi_log, 'utf-8', INTERVAL)
+    assert [checkpoint.position for checkpoint in index.checkpoints] == positions
+    extend_index(index, None)
+    starts = line_starts(wifi_log)
+    assert [checkpoint.position for checkpoint in index.checkpoints] == \
+        [(line_number, starts[line_number]) for line_number in range(0, len(starts), INTERVAL)]
+
+
+def test_truncation_drops_the_checkpoints_past_the_end(wifi_log):
+    build_index(wifi_log)
+    size = line_starts(wifi_log)[10] + 5
+    with open(wifi_log, 'r+b') as file:
+        file.truncate(size)
+
+    index = LineIndex.load(wifi_log, 'utf-8', INTERVAL)
+    assert [checkpoint.line_number for checkpoint in index.checkpoints] == [0, 4, 8]
+    assert index.time_indexed_to[1] <= size
+    assert index.dirty
+
+
+def test_a_rewritten_head_rebuilds_the_index(wifi_log):
+    build_index(wifi_log)
+    assert len(LineIndex.load(wifi_log, 'utf-8', INTERVAL).checkpoints) > 1
+    with open(wifi_log, 'r+b') as file:
+        file.write(b"X")
+
+    index = LineIndex.load(wifi_log, 'utf-8', INTERVAL)
+    assert [checkpoint.position for checkpoint in index.checkpoints] == [(0, 0)]
+    assert index.time_blocks == []
+
+
+def test_an_index_of_another_interval_is_not_used(wifi_log):
+    build_index(wifi_log)
+    assert os.path.exists(wifi_log + INDEX_SUFFIX)
+    assert [checkpoint.position for checkpoint in LineIndex.load(wifi_log, 'utf-8', 8).checkpoints] == [(0, 0)]
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from log_follower import LiveTimeline, LogFollower
+from log_parser import parse_log
+
+
+def follow_result(follower):
+    event_store, mac_registry, last_log_timestamp = follower.result()
+    return event_store.as_dicts(), mac_registry.mac_addresses, mac_registry.mac_info, last_log_timestamp
+
+
+def parse_result(log_path):
+    event_store, mac_registry, last_log_timestamp = parse_log(log_path, use_index=False)
+    return event_store.as_dicts(), mac_registry.mac_addresses, mac_registry.mac_info, last_log_timestamp
+
+
+@pytest.fixture
+def wifi_text(wifi_log):
+    with open(wifi_log, 'rb') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("step", [7, 50, 333])
+def test_follow_growing_log(tmp_path, wifi_log, wifi_text, step):
+    log_path = str(tmp_path / "followed.log")
+    open(log_path, 'wb').close()
+    follower = LogFollower(log_path)
+    for position in range(0, len(wifi_text), step):
+        with open(log_path, 'ab') as file:
+            file.write(wifi_text[position:position + step])
+        follower.poll()
+    follower.poll()
+    assert follow_result(follower) == parse_result(wifi_log)
+
+
+def test_follow_leaves_an_unfinished_line(tmp_path, wifi_log, wifi_text):
+    lines = wifi_text.splitlines(keepends=True)
+    log_path = str(tmp_path / "followed.log")
+    with open(log_path, 'wb') as file:
+        file.write(b"".join(lines[:5]) + lines[5][:30])
+    follower = LogFollower(log_path)
+    update = follower.poll()
+    assert update == (False, 0)
+    assert follower.parser.next_line_number == 5
+    assert follower.poll() is None
+
+    with open(log_path, 'ab') as file:
+        file.write(b"".join(lines[5:])[30:])
+    update = follower.poll()
+    assert not update.reset and update.first_row > 0
+    assert follow_result(follower) == parse_result(wifi_log)
+
+
+def test_follow_truncated_log(tmp_path, wifi_text):
+    lines = wifi_text.splitlines(keepends=True)
+    log_path = str(tmp_path / "followed.log")
+    with open(log_path, 'wb') as file:
+        file.write(wifi_text)
+    follower = LogFollower(log_path)
+    follower.poll()
+
+    # Truncated and written again from the top, shorter than before
+    with open(log_path, 'wb') as file:
+        file.write(b"".join(lines[12:20]))
+    update = follower.poll()
+    assert update.reset and update.first_row == 0
+    assert follow_result(follower) == parse_result(log_path)
+
+
+def test_follow_rotated_log(tmp_path, wifi_text):
+    lines = wifi_text.splitlines(keepends=True)
+    log_path = str(tmp_path / "followed.log")
+    with open(log_path, 'wb') as file:
+        file.write(b"".join(lines[:12]))
+    follower = LogFollower(log_path)
+    follower.poll()
+
+    # A new file at the path, longer than the old one, so only its identity tells
+    os.rename(log_path, log_path + ".1")
+    assert follower.poll() is None
+    with open(log_path, 'wb') as file:
+        file.write(b"".join(lines[12:]) + b"".join(lines[12:]))
+    update = follower.poll()
+    assert update.reset
+    assert follow_result(follower) == parse_result(log_path)
+
+
+def test_follow_rejects_compressed_logs(tmp_path):
+    with pytest.raises(ValueError):
+        LogFollower(str(tmp_path / "wifi.log.gz"))
+
+
+def test_live_timeline_appends_chunks(tmp_path, wifi_text):
+    lines = wifi_text.splitlines(keepends=True)
+    log_path = str(tmp_path / "followed.log")
+    with open(log_path, 'wb') as file:
+        file.write(b"".join(lines[:12]))
+    output_filename = str(tmp_path / "followed_graph.html")
+    live_timeline = LiveTimeline(log_path, output_filename)
+    assert live_timeline.update()
+    with open(output_filename, encoding='utf-8') as file:
+        page = file.read()
+    assert not live_timeline.update()
+
+    with open(log_path, 'ab') as file:
+        file.write(b"".join(lines[12:]))
+    assert live_timeline.update()
+    # The page is left alone; the new events go to the next chunk only
+    with open(output_filename, encoding='utf-8') as file:
+        assert file.read() == page
+    chunk_dir = str(tmp_path / "followed_graph_live")
+    generation = live_timeline.generation
+    assert sorted(os.listdir(chunk_dir)) == sorted(["generation.js", f"{generation}_0.js", f"{generation}_1.js"])
+    with open(os.path.join(chunk_dir, f"{generation}_1.js"), encoding='utf-8') as file:
+        chunk = file.read()
+    assert "DEAUTH_REQ - sent" in chunk and "uCode is alive" not in chunk
@@ -0,0 +1,22 @@
+from benchmarks.log_generator import DEFAULT_EVENT_DENSITY, generate_log
+from log_parser import parse_log
+
+
+def test_generated_logs_are_reproducible(tmp_path):
+    paths = [tmp_path / name for name in ("a.log", "b.log", "c.log")]
+    line_count = generate_log(str(paths[0]), 0.05, seed=1)
+    generate_log(str(paths[1]), 0.05, seed=1)
+    generate_log(str(paths[2]), 0.05, seed=2)
+    assert paths[0].read_bytes() == paths[1].read_bytes() != paths[2].read_bytes()
+    assert paths[0].read_bytes().count(b"\n") == line_count
+
+
+def test_generated_log_exercises_the_parser(tmp_path):
+    log_path = str(tmp_path / "synthetic.log")
+    line_count = generate_log(log_path, 0.2, mac_count=4)
+    event_store, mac_registry, _ = parse_log(log_path, use_index=False)
+    events = list(event_store.iter_events())
+    assert {"Attempt_to_connect", "auth_req", "auth_rsp", "associated", "connected", "disconnected", "suspend",
+            "resume", "info"} <= {event.status for event in events}
+    assert 1 < len(mac_registry) <= 4 and mac_registry.mac_info
+    assert DEFAULT_EVENT_DENSITY / 2 < len(events) / line_count < DEFAULT_EVENT_DENSITY * 2
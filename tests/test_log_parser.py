@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from event_store import KIND_MAC
+from log_parser import matcher, parse_log, parse_window_input
+from parallel_parser import parse_log_parallel
+
+MAC_1 = "AA:BB:CC:00:00:01"
+MAC_2 = "AA:BB:CC:00:00:02"
+
+# (line number, status, lane) of every event of tests/data/wifi.log
+EXPECTED_EVENTS = [
+    (1, "info", "disconnected"),
+    (3, "Attempt_to_connect", "disconnected"),
+    (5, "auth_req", MAC_1),
+    (6, "auth_rsp", MAC_1),
+    (7, "associated", MAC_1),
+    (8, "connected", MAC_1),
+    (10, "info", MAC_1),
+    (12, "Deauth from Peer", MAC_1),
+    (13, "disconnected", "disconnected"),
+    (14, "Attempt_to_connect", "disconnected"),
+    (16, "auth_req", MAC_2),
+    (17, "connection_failed", "disconnected"),
+    (18, "Attempt_to_connect", "disconnected"),
+    (20, "auth_req", MAC_2),
+    (21, "auth_rsp", MAC_2),
+    (22, "associated", MAC_2),
+    (23, "connected", MAC_2),
+    (25, "suspend", MAC_2),
+    (26, "resume", MAC_2),
+    (27, "link_switch_start", MAC_2),
+    (28, "link_switch_end", MAC_2),
+    (29, "info", MAC_2),
+    (30, "Deauth by Driver", MAC_2),
+    (31, "disconnected", "disconnected"),
+    (-1, "end", "disconnected"),
+]
+
+
+def test_parse_log(wifi_log):
+    event_store, mac_registry, last_log_timestamp = parse_log(wifi_log, use_index=False)
+    events = list(event_store.iter_events())
+    assert [(event.line_number, event.status, event.y) for event in events] == EXPECTED_EVENTS
+    assert [event.rssi for event in events if event.status == "Attempt_to_connect"] == ["-52", "-61", "-58"]
+    assert [event.name for event in events if event.status == "info"] == ["uCode alive", "missed beacons",
+                                                                         "roam complete"]
+    assert events[2].timestamp == datetime(2024, 3, 5, 10, 0, 0, 300000)
+    assert not event_store.column("flow_violations").any()
+
+    assert mac_registry.y_labels() == ["disconnected", MAC_1, MAC_2]
+    assert mac_registry.mac_info == {MAC_1: {"ssid": "HomeNet", "band": "5.2GHz", "channel": "36"}}
+    assert last_log_timestamp == datetime(2024, 3, 5, 10, 0, 46)
+
+
+def test_parse_log_line_window(wifi_log):
+    event_store = parse_log(wifi_log, 14, 24, use_index=False)[0]
+    assert [(event.line_number, event.status) for event in event_store.iter_events()][:-1] == \
+        [(line_number, status) for line_number, status, _ in EXPECTED_EVENTS if 14 <= line_number < 24]
+
+
+def test_a_line_matching_two_rules_is_one_event(tmp_path):
+    log_path = str(tmp_path / "twice.log")
+    line = "03/05/2024-10:00:06.000 [mlme ] DEAUTH - received from AA:BB:CC:00:00:01; CONNECTION FAILED\n"
+    with open(log_path, 'w', encoding='utf-8') as file:
+        file.write(line * 2)
+    event_store = parse_log(log_path, use_index=False)[0]
+    assert [(event.line_number, event.status) for event in event_store.iter_events()] == [
+        (0, "Deauth from Peer"), (1, "Deauth from Peer"), (-1, "end")]
+
+
+def test_rows_carry_the_id_of_their_rule(wifi_log):
+    event_store = parse_log(wifi_log, use_index=False)[0]
+    kinds = event_store.column("kind").tolist()
+    pattern_ids = event_store.column("pattern_id").tolist()
+    for row in event_store.iter_events(include_mac_rows=True):
+        if row.status == "end":
+            assert pattern_ids[row.index] == -1
+            continue
+        pattern = matcher.pattern_table[pattern_ids[row.index]]
+        if kinds[row.index] == KIND_MAC:
+            assert pattern.kind == "mac"
+        else:
+            assert (pattern.status, pattern.name) == (row.status, row.name)
+
+
+def clock_jump_log(wifi_log, tmp_path):
+    """The fixture log, then the same session again on a clock that went back a minute."""
+    with open(wifi_log, encoding='utf-8') as file:
+        text = file.read()
+    log_path = str(tmp_path / "jump.log")
+    with open(log_path, 'w', encoding='utf-8', newline='') as file:
+        file.write(text + text.replace("10:00:", "09:59:"))
+    return log_path
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_time_window_after_a_clock_jump_back(tmp_path, wifi_log, small_time_blocks, use_index):
+    log_path = clock_jump_log(wifi_log, tmp_path)
+    start_time = datetime(2024, 3, 5, 9, 59, 5)
+    event_store = parse_log(log_path, use_index=use_index, start_time=start_time,
+                            end_time=start_time + timedelta(seconds=4))[0]
+    events = list(event_store.iter_events())
+    # Lines 10 to 24 of the second copy; the same times of the first copy are a minute later
+    assert [event.line_number for event in events] == [33 + line_number for line_number, _, _ in EXPECTED_EVENTS
+                                                       if 10 <= line_number < 24] + [-1]
+    # The lane the session before the window left it on
+    assert events[0].y == MAC_1
+
+
+def test_parse_window_input(wifi_log):
+    assert parse_window_input(wifi_log, " 10 ", "") == (10, None, None, None)
+    assert parse_window_input(wifi_log, "10:00:05", "03/05/2024-10:00:09.500") == (
+        0, None, datetime(2024, 3, 5, 10, 0, 5), datetime(2024, 3, 5, 10, 0, 9, 500000))
+    with pytest.raises(ValueError):
+        parse_window_input(wifi_log, "10", "10:00:09")
+
+
+@pytest.mark.parametrize("chunk_size", [64, 256, 1024, 1 << 20])
+def test_parse_log_parallel(wifi_log, chunk_size):
+    event_store, mac_registry, last_log_timestamp = parse_log(wifi_log, use_index=False)
+    parallel_store, parallel_registry, parallel_last = parse_log_parallel(wifi_log, workers=2, chunk_size=chunk_size)
+    assert parallel_store.as_dicts() == event_store.as_dicts()
+    assert [event.line_number for event in parallel_store.iter_events()] == \
+        [event.line_number for event in event_store.iter_events()]
+    assert parallel_registry.mac_addresses == mac_registry.mac_addresses
+    assert parallel_registry.mac_info == mac_registry.mac_info
+    assert parallel_last == last_log_timestamp
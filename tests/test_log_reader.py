@@ -0,0 +1,155 @@
+import gzip
+import os
+import zipfile
+
+import pytest
+
+from batch import find_logs
+from log_parser import parse_log
+from log_reader import (MEMBER_SEPARATOR, SAMPLE_BLOCK_SIZE, archive_members, detect_encoding, is_compressed,
+                        iter_log_lines, read_lines_at)
+from parallel_parser import parse_log_parallel
+
+
+def parse_result(log_path, start_line=0, end_line=None):
+    event_store, mac_registry, last_log_timestamp = parse_log(log_path, start_line, end_line, use_index=False)
+    return event_store.as_dicts(), mac_registry.mac_addresses, mac_registry.mac_info, last_log_timestamp
+
+
+def write_gz(wifi_log, directory):
+    log_path = os.path.join(directory, "wifi.log.gz")
+    with open(wifi_log, 'rb') as source, gzip.open(log_path, 'wb') as file:
+        file.write(source.read())
+    return log_path
+
+
+def write_zst(wifi_log, directory):
+    zstandard = pytest.importorskip("zstandard")
+    log_path = os.path.join(directory, "wifi.log.zst")
+    with open(wifi_log, 'rb') as source, open(log_path, 'wb') as file:
+        file.write(zstandard.ZstdCompressor().compress(source.read()))
+    return log_path
+
+
+def write_zip_member(wifi_log, directory):
+    archive_path = os.path.join(directory, "logs.zip")
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("readme.txt", "not a log\n")
+        archive.write(wifi_log, "device/wifi.log")
+    return archive_path + MEMBER_SEPARATOR + "device/wifi.log"
+
+
+def write_zip(wifi_log, directory):
+    archive_path = os.path.join(directory, "wifi.zip")
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(wifi_log, "wifi.log")
+    return archive_path
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-16-le"])
+def test_iter_log_lines(tmp_path, encoding):
+    lines = ["zero\n", "\u00e9\u00e9n\n", "\n", "three\n", "four"]
+    log_path = str(tmp_path / "lines.log")
+    with open(log_path, 'wb') as file:
+        file.write("".join(lines).encode(encoding))
+    offsets = [0]
+    for line in lines[:-1]:
+        offsets.append(offsets[-1] + len(line.encode(encoding)))
+    expected = list(zip(range(len(lines)), offsets, lines))
+
+    assert list(iter_log_lines(log_path, encoding)) == expected
+    assert list(iter_log_lines(log_path, encoding, 1, 3)) == expected[1:3]
+    assert list(iter_log_lines(log_path, encoding, 3)) == expected[3:]
+    assert list(iter_log_lines(log_path, encoding, 2, 2)) == []
+
+
+def write_sample_log(log_path, middle, encoding):
+    """A log over three sample blocks long, ASCII but for a stretch across its midpoint."""
+    line = b"03/05/2024-10:00:01.000 [misc ] rx stats: packets=1200 retries=3\n"
+    half = line * (2 * SAMPLE_BLOCK_SIZE // len(line))
+    with open(log_path, 'wb') as file:
+        file.write(half + middle.encode(encoding) + half)
+
+
+def test_detect_encoding_samples_the_middle(tmp_path):
+    # Only the middle block holds the non-ASCII text, and the block boundary cuts through it
+    latin1_path = str(tmp_path / "latin1.log")
+    write_sample_log(latin1_path, "SSID Caf\u00e9 " * 20 + "\n", 'latin-1')
+    assert detect_encoding(latin1_path).method == 'chardet-sample'
+
+    utf8_path = str(tmp_path / "utf8.log")
+    write_sample_log(utf8_path, "SSID Caf\u00e9 \u00ab\u20ac\u00bb " * 20 + "\n", 'utf-8')
+    assert detect_encoding(utf8_path) == ('utf-8', 1.0, 'utf-8-validation')
+
+
+@pytest.mark.parametrize("encoding", ["utf-16-le", "utf-16-be"])
+def test_detect_utf16_without_bom(tmp_path, wifi_log, encoding):
+    log_path = str(tmp_path / "utf16.log")
+    with open(wifi_log, encoding='utf-8') as source, open(log_path, 'w', encoding=encoding, newline='') as file:
+        file.write(source.read())
+    assert detect_encoding(log_path) == (encoding, 0.95, 'utf-16-validation')
+
+
+def test_detect_encoding_from_bom(tmp_path, wifi_log):
+    log_path = str(tmp_path / "bom.log")
+    with open(wifi_log, encoding='utf-8') as source, open(log_path, 'w', encoding='utf-8-sig', newline='') as file:
+        file.write(source.read())
+    assert detect_encoding(log_path) == ('utf-8-sig', 1.0, 'bom')
+
+
+def test_detected_encoding_is_cached_until_the_log_changes(tmp_path, wifi_log):
+    result = detect_encoding(wifi_log)
+    assert result.encoding == 'utf-8'
+    assert detect_encoding(wifi_log) is result
+
+    with open(wifi_log, encoding='utf-8') as file:
+        text = file.read()
+    with open(wifi_log, 'w', encoding='utf-16-le', newline='') as file:
+        file.write(text)
+    assert detect_encoding(wifi_log).encoding == 'utf-16-le'
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-16"])
+def test_lone_carriage_returns_end_lines(tmp_path, encoding):
+    log_path = str(tmp_path / "cr.log")
+    with open(log_path, 'wb') as file:
+        file.write("first\rsecond\r\nthird\n\rfifth\r".encode(encoding))
+    lines = list(iter_log_lines(log_path, encoding))
+    assert [(line_number, line) for line_number, _, line in lines] == [
+        (0, "first\r"), (1, "second\r\n"), (2, "third\n"), (3, "\r"), (4, "fifth\r")]
+    assert list(read_lines_at(log_path, encoding, [offset for _, offset, _ in lines])) == [line for _, _, line in lines]
+
+
+def test_parse_log_with_carriage_returns(tmp_path, wifi_log):
+    # Old Mac line ends, as the text-mode reading this replaced accepted them
+    log_path = str(tmp_path / "cr.log")
+    with open(wifi_log, 'rb') as source, open(log_path, 'wb') as file:
+        file.write(source.read().replace(b"\n", b"\r"))
+    assert parse_result(log_path) == parse_result(wifi_log)
+
+
+COMPRESSORS = [write_gz, write_zst, write_zip_member, write_zip]
+
+
+@pytest.mark.parametrize("compress", COMPRESSORS)
+def test_parse_compressed_log(tmp_path, wifi_log, compress):
+    log_path = compress(wifi_log, str(tmp_path))
+    assert is_compressed(log_path)
+    assert parse_result(log_path) == parse_result(wifi_log)
+    assert parse_result(log_path, 14, 24) == parse_result(wifi_log, 14, 24)
+
+
+@pytest.mark.parametrize("compress", COMPRESSORS)
+def test_parse_compressed_log_parallel(tmp_path, wifi_log, compress):
+    # A stream cannot be entered in the middle, so this falls back to the serial parser
+    log_path = compress(wifi_log, str(tmp_path))
+    event_store = parse_log_parallel(log_path, workers=2, chunk_size=64)[0]
+    assert event_store.as_dicts() == parse_log(wifi_log, use_index=False)[0].as_dicts()
+
+
+def test_find_logs_opens_archives(tmp_path, wifi_log):
+    member = write_zip_member(wifi_log, str(tmp_path))
+    gz_path = write_gz(wifi_log, str(tmp_path))
+    archive_path = member.partition(MEMBER_SEPARATOR)[0]
+    assert archive_members(archive_path, "*.log") == ["device/wifi.log"]
+    assert find_logs([str(tmp_path)]) == sorted([wifi_log, gz_path, member])
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime, timedelta
+
+from mac_registry import MacRegistry
+
+START = datetime(2024, 3, 5, 10, 0, 0)
+MAC_1 = "AA:BB:CC:00:00:01"
+MAC_2 = "AA:BB:CC:00:00:02"
+MAC_3 = "AA:BB:CC:00:00:03"
+MAC_4 = "AA:BB:CC:00:00:04"
+
+
+def seconds(n):
+    return START + timedelta(seconds=n)
+
+
+def mac_registry():
+    registry = MacRegistry()
+    for n, mac in enumerate([MAC_1, MAC_2, MAC_1, MAC_3]):
+        registry.touch(mac, seconds(n))
+    registry.set_info(MAC_2, "HomeNet", "5.2GHz", "36")
+    # Seen in a BEACON_RX only, so it gets no lane
+    registry.set_info(MAC_4, "Guest", "2.4GHz", "6")
+    return registry
+
+
+def test_lanes_follow_the_last_sighting():
+    registry = mac_registry()
+    assert registry.y_labels() == ["disconnected", MAC_2, MAC_1, MAC_3]
+    assert [registry.lane_of(mac) for mac in (MAC_1, MAC_2, MAC_3, MAC_4)] == [0, 1, 2, None]
+    assert registry.mac_addresses == [(seconds(1), MAC_2), (seconds(2), MAC_1), (seconds(3), MAC_3)]
+    assert registry.get(MAC_1).first_seen == seconds(0)
+    assert len(registry) == 3 and MAC_4 not in registry
+
+
+def test_beacon_info():
+    registry = mac_registry()
+    assert registry.mac_info == {MAC_2: {"ssid": "HomeNet", "band": "5.2GHz", "channel": "36"},
+                                 MAC_4: {"ssid": "Guest", "band": "2.4GHz", "channel": "6"}}
+    assert registry.label(MAC_2) == f"{MAC_2} (HomeNet, 5.2GHz, 36)"
+    assert registry.label(MAC_1) == MAC_1
+
+
+def test_copies_are_independent():
+    registry = mac_registry()
+    y_labels = registry.y_labels()
+    for clone in (registry.copy(), MacRegistry.from_json(json.loads(json.dumps(registry.to_json())))):
+        assert clone.y_labels() == y_labels
+        assert clone.mac_addresses == registry.mac_addresses
+        assert clone.mac_info == registry.mac_info
+        clone.touch(MAC_2, seconds(10))
+        clone.set_info(MAC_1, "Office", "6GHz", "5")
+        assert clone.y_labels() == ["disconnected", MAC_1, MAC_3, MAC_2]
+        assert registry.y_labels() == y_labels and MAC_1 not in registry.mac_info
@@ -0,0 +1,24 @@
+import re
+
+from log_parser import patterns
+from pattern_matcher import PatternMatcher, literal_anchor
+
+
+def test_literal_anchor():
+    assert literal_anchor(re.compile(r"(\d{2}:\d{2}).*AUTH_RSP - received  from:")) == "AUTH_RSP - received  from:"
+    assert literal_anchor(re.compile(r".*(?<!DE)AUTH_REQ - sent to:")) == "AUTH_REQ - sent to:"
+    assert literal_anchor(re.compile(r"SUSPEND|RESUME")) is None
+    assert literal_anchor(re.compile(r"uCode is alive", re.IGNORECASE)) is None
+
+
+def test_prefilter_keeps_every_matching_line(wifi_log):
+    matcher = PatternMatcher(patterns)
+    rules = matcher.mac_patterns + [matcher.beacon_pattern] + matcher.connectivity_patterns + matcher.info_patterns
+    with open(wifi_log, encoding='utf-8') as file:
+        lines = file.readlines()
+    for line in lines:
+        matches = [rule.regex.search(line) is not None for rule in rules]
+        assert [rule.search(line) is not None for rule in rules] == matches
+        if any(matches):
+            assert matcher.is_candidate(line), line
+    assert not matcher.is_candidate("03/05/2024-10:00:01.000 [misc ] rx stats: packets=1200 retries=3\n")
@@ -0,0 +1,23 @@
+from log_parser import matcher, parse_log
+from profiler import Profiler, profiled_matcher
+
+
+def test_profiler_counts_every_pattern(wifi_log):
+    assert profiled_matcher(matcher) is matcher
+    with Profiler() as profiler:
+        event_store = parse_log(wifi_log, use_index=False)[0]
+    assert profiled_matcher(matcher) is matcher
+    assert event_store.as_dicts() == parse_log(wifi_log, use_index=False)[0].as_dicts()
+
+    assert {"detect_encoding", "parse"} <= {stage["stage"] for stage in profiler.stages}
+    pattern_stats = profiler.pattern_stats()
+
+    def matched(kind, label):
+        return sum(stats["matched"] for stats in pattern_stats if (stats["kind"], stats["label"]) == (kind, label))
+
+    prefilter = next(stats for stats in pattern_stats if stats["kind"] == "prefilter")
+    assert prefilter["tried"] == 33
+    assert matched("connectivity", "connected") == 2
+    assert matched("connectivity", "auth_req") == 3
+    assert matched("info", "uCode alive") == 1
+    assert "prefilter" in profiler.report()
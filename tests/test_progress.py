@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+import progress
+from line_index import INDEX_SUFFIX
+from log_parser import parse_log
+from progress import ParseCancelled, ParseProgress
+
+
+@pytest.fixture(autouse=True)
+def short_progress_interval(monkeypatch):
+    monkeypatch.setattr(progress, 'PROGRESS_INTERVAL', 5)
+
+
+def test_progress_is_reported(wifi_log):
+    updates = []
+    parse_log(wifi_log, use_index=False, progress=ParseProgress(updates.append))
+    size = os.path.getsize(wifi_log)
+    # Every 5 lines from line 10 on; the first 5 only start the clock
+    assert len(updates) == 5
+    assert all(update.total_bytes == size and 0 < update.bytes_done < size for update in updates)
+    assert [update.bytes_done for update in updates] == sorted(update.bytes_done for update in updates)
+    assert [update.events for update in updates] == sorted(update.events for update in updates)
+
+
+def test_a_cancelled_parse_saves_nothing(wifi_log):
+    parse_progress = ParseProgress(lambda update: parse_progress.cancel())
+    with pytest.raises(ParseCancelled):
+        parse_log(wifi_log, progress=parse_progress)
+    assert parse_progress.cancelled
+    assert not os.path.exists(wifi_log + INDEX_SUFFIX)
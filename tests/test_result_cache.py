@@ -0,0 +1,79 @@
+import os
+
+from log_parser import parse_log
+from result_cache import ResultCache, cache_key, parse_log_cached
+
+
+class CountingParse:
+    """parse_log without the line index, recording the windows it was asked to parse."""
+
+    def __init__(self):
+        self.windows = []
+
+    def __call__(self, log_path, start_line, end_line, **options):
+        self.windows.append((start_line, end_line))
+        return parse_log(log_path, start_line, end_line, use_index=False)
+
+
+def test_a_hit_skips_the_parse(tmp_path, wifi_log):
+    cache = ResultCache(str(tmp_path / "cache"))
+    parse = CountingParse()
+    event_store, mac_registry, last_log_timestamp = parse_log_cached(wifi_log, parse=parse, cache=cache)
+    cached_store, cached_registry, cached_last = parse_log_cached(wifi_log, parse=parse, cache=cache)
+    assert parse.windows == [(0, None)]
+    assert cached_store.as_dicts() == event_store.as_dicts()
+    assert cached_registry.mac_addresses == mac_registry.mac_addresses
+    assert cached_registry.mac_info == mac_registry.mac_info
+    assert cached_last == last_log_timestamp
+
+
+def test_cache_key(wifi_log):
+    key = cache_key(wifi_log)
+    assert cache_key(wifi_log) == key
+    assert cache_key(wifi_log, 14, 24) != key
+
+    # Touching the log is enough to miss
+    stat = os.stat(wifi_log)
+    os.utime(wifi_log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    touched_key = cache_key(wifi_log)
+    assert touched_key != key
+
+    with open(wifi_log, 'a', encoding='utf-8') as file:
+        file.write("03/05/2024-10:00:47.000 [core ] uCode is alive\n")
+    os.utime(wifi_log, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache_key(wifi_log) not in (key, touched_key)
+
+
+def test_a_grown_log_is_parsed_again(tmp_path, wifi_log):
+    cache = ResultCache(str(tmp_path / "cache"))
+    parse = CountingParse()
+    parse_log_cached(wifi_log, parse=parse, cache=cache)
+    with open(wifi_log, 'a', encoding='utf-8') as file:
+        file.write("03/05/2024-10:00:47.000 [core ] uCode is alive\n")
+    event_store = parse_log_cached(wifi_log, parse=parse, cache=cache)[0]
+    assert parse.windows == [(0, None), (0, None)]
+    assert [event.line_number for event in event_store.iter_events()][-2:] == [33, -1]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, wifi_log):
+    cache = ResultCache(str(tmp_path / "cache"))
+    parse = CountingParse()
+
+    def entries():
+        return [os.path.join(cache.cache_dir, name) for name in os.listdir(cache.cache_dir)]
+
+    # Windows ending past the end of the log: different keys, entries of the same size
+    parse_log_cached(wifi_log, 0, 1000, parse, cache)
+    cache.max_bytes = 2.5 * os.path.getsize(entries()[0])
+    parse_log_cached(wifi_log, 0, 2000, parse, cache)
+    for path in entries():
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 3600 * 10 ** 9))
+
+    # A hit refreshes the entry, so the second one goes first
+    parse_log_cached(wifi_log, 0, 1000, parse, cache)
+    parse_log_cached(wifi_log, 0, 3000, parse, cache)
+    assert len(entries()) == 2
+    parse_log_cached(wifi_log, 0, 1000, parse, cache)
+    parse_log_cached(wifi_log, 0, 2000, parse, cache)
+    assert parse.windows == [(0, 1000), (0, 2000), (0, 3000), (0, 2000)]
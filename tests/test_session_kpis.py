@@ -0,0 +1,76 @@
+import pytest
+
+from benchmarks.log_generator import generate_log
+from log_parser import parse_log
+from session_kpis import DURATION_KPIS, RSSI_KPI, FleetKpis, log_kpis, pair_rows, session_rows
+
+KPIS = {kpi["id"]: kpi for kpi in DURATION_KPIS}
+
+
+def loop_pairs(event_store, kpi):
+    """The (start row, end row) pairs of kpi, found one event at a time."""
+    pairs = []
+    first_start = last_start = None
+    for event in event_store.iter_events():
+        if event.status in kpi["start"]:
+            last_start = event.index
+            if first_start is None:
+                first_start = event.index
+        elif event.status in kpi["end"]:
+            start = first_start if kpi.get("from_first_start") else last_start
+            if start is not None:
+                pairs.append((start, event.index))
+            first_start = last_start = None
+        elif event.status in kpi.get("abort", ()):
+            first_start = last_start = None
+    return pairs
+
+
+@pytest.mark.parametrize("kpi_id, start_lines, end_lines, durations", [
+    # The first attempt of the second connection failed, so its time to connect counts from the retry
+    ("time_to_connect", [3, 18], [8, 23], [300, 400]),
+    ("auth_rtt", [5, 20], [6, 21], [50, 80]),
+    ("link_switch", [27], [28], [250]),
+    ("suspend", [25], [26], [30000]),
+])
+def test_session_rows(wifi_log, kpi_id, start_lines, end_lines, durations):
+    event_store = parse_log(wifi_log, use_index=False)[0]
+    starts, ends, session_durations = session_rows(event_store, KPIS[kpi_id])
+    line_numbers = event_store.column("line_number")
+    assert line_numbers[starts].tolist() == start_lines
+    assert line_numbers[ends].tolist() == end_lines
+    assert session_durations.tolist() == durations
+
+
+def test_log_kpis(wifi_log):
+    kpis = log_kpis(parse_log(wifi_log, use_index=False)[0])
+    assert kpis["kpis"]["time_to_connect"]["count"] == 2
+    assert kpis["kpis"]["time_to_connect"]["mean"] == 350.0
+    assert kpis["kpis"][RSSI_KPI]["min"] == -61.0 and kpis["kpis"][RSSI_KPI]["max"] == -52.0
+    assert kpis["disconnects_per_bssid"] == {"AA:BB:CC:00:00:01": 1, "AA:BB:CC:00:00:02": 1}
+    assert sum(kpis["kpi_histograms"]["auth_rtt"]["counts"]) == 2
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_pair_rows_matches_a_loop(tmp_path, seed):
+    log_path = str(tmp_path / "generated.log")
+    generate_log(log_path, 0.05, event_density=0.5, seed=seed)
+    event_store = parse_log(log_path, use_index=False)[0]
+    for kpi in DURATION_KPIS:
+        starts, ends = pair_rows(event_store, kpi)
+        pairs = loop_pairs(event_store, kpi)
+        assert pairs
+        assert list(zip(starts.tolist(), ends.tolist())) == pairs
+
+
+def test_fleet_kpis(wifi_log):
+    kpis = log_kpis(parse_log(wifi_log, use_index=False)[0])
+    fleet = FleetKpis()
+    fleet.add(kpis)
+    fleet.add(kpis)
+    summary = fleet.summary()
+    assert summary["logs"] == 2 and summary["disconnects"] == 4
+    assert summary["kpis"]["suspend"]["count"] == 2
+    # The duration bins are 2% wide
+    assert summary["kpis"]["suspend"]["p50"] == pytest.approx(30000, rel=0.02)
+    assert summary["kpis"][RSSI_KPI]["p99"] == -52.0
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from log_parser import parse_log
+from timeline import SuspendWindows, create_timeline
+
+START = datetime(2024, 3, 5, 10, 0, 0)
+
+
+def seconds(n):
+    return START + timedelta(seconds=n)
+
+
+def connectivity_traces(wifi_log, output_filename, batch_traces=True):
+    event_store, mac_registry, last_log_timestamp = parse_log(wifi_log, use_index=False)
+    fig = create_timeline(event_store, mac_registry, last_log_timestamp, output_filename, batch_traces=batch_traces,
+                          auto_open=False)
+    return [trace for trace in fig.data if trace.name == 'Connectivity Events']
+
+
+def test_connectivity_traces_are_batched_per_style(tmp_path, wifi_log):
+    traces = connectivity_traces(wifi_log, str(tmp_path / "graph.html"))
+    lines, markers = traces[:-1], traces[-1]
+    point_count = len(markers.x)
+    # 21 connectivity events and the end point
+    assert point_count == 22
+    styles = [(trace.line.color, trace.line.dash) for trace in lines]
+    assert len(set(styles)) == len(styles)
+    # Each segment is its two ends and a break
+    assert sum(len(trace.x) for trace in lines) == 3 * (point_count - 1)
+    # Only the segment from the suspend to the resume is dashed
+    assert [(style, len(trace.x)) for style, trace in zip(styles, lines) if style[1] == 'dash'] == [
+        (("purple", "dash"), 3)]
+
+    assert len(connectivity_traces(wifi_log, str(tmp_path / "unbatched.html"), batch_traces=False)) == point_count
+
+
+def suspend_windows():
+    windows = SuspendWindows()
+    windows.suspend(seconds(10))
+    windows.resume(seconds(20))
+    # The first of two suspends in a row covers nothing
+    windows.suspend(seconds(30))
+    windows.suspend(seconds(35))
+    windows.resume(seconds(40))
+    # A second resume moves the end of the last window
+    windows.resume(seconds(45))
+    # The clock went back
+    windows.suspend(seconds(5))
+    windows.resume(seconds(8))
+    # Still suspended when the log ends
+    windows.suspend(seconds(60))
+    return windows
+
+
+def test_suspend_windows():
+    windows = suspend_windows()
+    assert len(windows) == 3
+    assert windows.starts == [seconds(5), seconds(10), seconds(35)]
+    covered = [(5, 8), (10, 20), (35, 45), (60, 1000)]
+    for n in range(70):
+        assert windows.contains(seconds(n)) == any(start <= n < end for start, end in covered), n
+
+
+def test_overlapping_suspend_windows():
+    windows = SuspendWindows()
+    windows.suspend(seconds(0))
+    windows.resume(seconds(100))
+    windows.suspend(seconds(10))
+    windows.resume(seconds(20))
+    # Past the end of the later window but still inside the earlier, longer one
+    assert windows.contains(seconds(50))
+    assert not windows.contains(seconds(100))
+
+
+def test_suspend_windows_tell_where_coverage_changed():
+    windows = SuspendWindows()
+    windows.suspend(seconds(10))
+    assert windows.changed_from == seconds(10)
+    windows.changed_from = None
+    windows.resume(seconds(20))
+    assert windows.changed_from == seconds(20)
+    windows.changed_from = None
+    # A late resume pulls the end of the window back
+    windows.resume(seconds(15))
+    assert windows.changed_from == seconds(15)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from timeline_lod import LevelOfDetail
+
+START = datetime(2024, 3, 5, 10, 0, 0)
+POINT_COUNT = 1000
+
+
+def level_of_detail():
+    """A dense run of points flapping between two lanes, with a single connect_failure in the middle."""
+    statuses = ["connected" if i % 2 else "associated" for i in range(POINT_COUNT)]
+    statuses[501] = "connect_failure"
+    return LevelOfDetail(
+        [START + timedelta(milliseconds=100 * i) for i in range(POINT_COUNT)],
+        [i % 2 for i in range(POINT_COUNT)],
+        statuses,
+        ["red" if i % 2 else "green" for i in range(POINT_COUNT)],
+        ["circle"] * POINT_COUNT,
+        [False] * POINT_COUNT,
+        [f"Line {2 * i}: text {i}" for i in range(POINT_COUNT)],
+        [""] * POINT_COUNT,
+        [2 * i for i in range(POINT_COUNT)],
+        [([START + timedelta(milliseconds=150 * i) for i in range(300)], [0] * 300,
+          [f"Line {2 * i + 1}: info {i}" for i in range(300)], [2 * i + 1 for i in range(300)], "missed beacons")],
+        pixels=10)
+
+
+def test_levels_get_finer_down_to_the_full_data():
+    lod = level_of_detail()
+    bins = [level["bin"] for level in lod.levels]
+    assert bins == sorted(bins, reverse=True) and bins[-1] == 0
+    assert lod.levels[-1]["points"] is None
+    coarse = lod.levels[0]
+    points = list(coarse["points"])
+    assert points[0] == 0 and points[-1] == POINT_COUNT - 1
+    # The first and the last point of each bin, and the kept states
+    span = int(lod.x[-1] - lod.x[0])
+    assert len(points) <= 2 * (span // coarse["bin"] + 1) + 1 < POINT_COUNT
+
+
+def test_collapsed_points_are_counted():
+    lod = level_of_detail()
+    for level in lod.levels[:-1]:
+        assert level["collapsed"]["count"].sum() == POINT_COUNT - len(level["points"])
+        (order, collapsed), = level["info"]
+        assert len(order) + (collapsed["count"] - 1).sum() == 300
+
+
+def test_connect_failure_is_kept():
+    lod = level_of_detail()
+    assert len(lod.levels) > 1
+    coarse = lod.levels[0]["points"].tolist()
+    assert 501 in coarse and 500 not in coarse and 502 not in coarse
+    for level in lod.levels[1:-1]:
+        assert 501 in level["points"].tolist()
+
+
+def test_only_the_coarsest_level_carries_line_text():
+    lod = level_of_detail()
+    coarse = set(lod.levels[0]["points"].tolist())
+    assert lod.point_text(501) == "Line 1002: text 501"
+    fine = next(i for i in lod.levels[-2]["points"].tolist() if i not in coarse)
+    timestamp = (START + timedelta(milliseconds=100 * fine)).isoformat(sep=" ", timespec="milliseconds")
+    assert lod.point_text(fine) == f"Line {2 * fine}: {timestamp} {lod.statuses[lod.status_codes[fine]]}"
+
+    _, marker = lod.level_points(lod.levels[0])
+    assert [text.split("<br>")[0] for text in marker["hovertext"]] == [f"Line {2 * i}: text {i}" for i in
+                                                                     lod.levels[0]["points"].tolist()]
+    traces = lod.level_info(lod.levels[-1])
+    assert traces[0][2][0] == "Line 1: info 0"
+
+    meta = lod.meta([0, 1], 2, [3])
+    assert "hover" not in meta["points"] and "hover" not in meta["info"][0]
+    assert meta["points"]["line"].tolist() == [2 * i for i in range(POINT_COUNT)]
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from timestamp_parser import TimestampParser, parse_time_bound, to_epoch_ms
+
+LOG_START = datetime(2024, 3, 5, 23, 59, 0, 68000)
+
+
+@pytest.mark.parametrize("text, layout", [
+    ("03/05/2024-10:00:00.300", "%m/%d/%Y-%H:%M:%S.%f"),
+    ("12/31/1999-23:59:59.999", "%m/%d/%Y-%H:%M:%S.%f"),
+    ("03/05/24-10:00:00.300", "%m/%d/%y-%H:%M:%S.%f"),
+    ("01/01/69-00:00:00.000", "%m/%d/%y-%H:%M:%S.%f"),
+    ("12/31/68-23:59:59.999", "%m/%d/%y-%H:%M:%S.%f"),
+])
+def test_parse_matches_strptime(text, layout):
+    expected = datetime.strptime(text, layout)
+    parser = TimestampParser()
+    assert parser.parse(text) == expected
+    assert parser.parse_epoch_ms(text) == to_epoch_ms(expected)
+
+
+def test_date_change_between_lines():
+    parser = TimestampParser()
+    assert parser.parse("03/05/2024-23:59:59.999") == datetime(2024, 3, 5, 23, 59, 59, 999000)
+    assert parser.parse("03/06/2024-00:00:00.000") == datetime(2024, 3, 6)
+    assert parser.parse_epoch_ms("03/05/2024-23:59:59.999") == to_epoch_ms(datetime(2024, 3, 5, 23, 59, 59, 999000))
+
+
+@pytest.mark.parametrize("text", ["2024-03-05 10:00:00.300", "03/05/2024 10:00:00.300", "03/05/2024-10:00:00",
+                                  "13/05/2024-10:00:00.300", "03/05/2024-24:00:00.000"])
+def test_other_layouts_and_out_of_range_fields_are_rejected(text):
+    with pytest.raises(ValueError):
+        TimestampParser().parse(text)
+    with pytest.raises(ValueError):
+        TimestampParser().parse_epoch_ms(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("03/06/2024-00:30:00.250", datetime(2024, 3, 6, 0, 30, 0, 250000)),
+    ("03/06/24-00:30:00", datetime(2024, 3, 6, 0, 30)),
+    ("2024-03-06 00:30:00", datetime(2024, 3, 6, 0, 30)),
+    ("2024-03-06T00:30:00.5", datetime(2024, 3, 6, 0, 30, 0, 500000)),
+    ("23:59:30", datetime(2024, 3, 5, 23, 59, 30)),
+    # A time of day before the log start is on the next day
+    (" 00:30 ", datetime(2024, 3, 6, 0, 30)),
+    # Typed to the second, 23:59:00 still covers a log starting at 23:59:00.068
+    ("23:59:00", datetime(2024, 3, 5, 23, 59)),
+    ("23:59:00.000", datetime(2024, 3, 6, 23, 59)),
+])
+def test_parse_time_bound(text, expected):
+    assert parse_time_bound(text, LOG_START) == expected
+
+
+def test_parse_time_bound_errors():
+    with pytest.raises(ValueError, match="no date"):
+        parse_time_bound("14:03:12")
+    with pytest.raises(ValueError):
+        parse_time_bound("yesterday", LOG_START)
@@ -0,0 +1,636 @@
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+import plotly.graph_objects as go
+
+from log_parser import flow_rules, info_patterns, matcher, status_styles
+from profiler import profile_stage
+from html_output import plot_array, write_timeline_html
+from timeline_lod import LOD_POINT_THRESHOLD, LevelOfDetail
+from timestamp_parser import to_epoch_ms
+
+# Above this many connectivity points the batched traces are drawn with WebGL
+WEBGL_POINT_THRESHOLD = 20000
+
+
+def _status_style(status):
+    """Return the (color, symbol) of a connectivity status, as set in status_styles of patterns.json."""
+    style = status_styles.get(status, {})
+    return style.get("color"), style.get("symbol", "circle")
+
+
+def _pattern_table(value, end_value):
+    # Indexed by pattern ID; the extra trailing entry is what the "end" point's NO_VALUE (-1) picks
+    return [value(pattern) for pattern in matcher.pattern_table] + [end_value]
+
+
+# Every event is drawn by looking its pattern ID up in these, so no line is matched again
+PATTERN_STYLES = _pattern_table(lambda pattern: _status_style(pattern.status), _status_style("end"))
+# The info series an info pattern's events go to, None for the other patterns
+PATTERN_INFO_SERIES = _pattern_table(lambda pattern: pattern.index if pattern.kind == "info" else None, None)
+# The line traces of a live page: every color a point can have, solid and dashed, so that a new
+# segment always has a trace to go to
+LIVE_LINE_STYLES = sorted({(color, dash) for color, _ in PATTERN_STYLES for dash in ('solid', 'dash')}, key=str)
+LIVE_LINE_INDEX = {style: i for i, style in enumerate(LIVE_LINE_STYLES)}
+
+
+class SuspendWindows:
+    """
+    The suspend/resume windows of a log as [start, end) intervals sorted by start, so telling
+    whether a timestamp is inside one is a bisect instead of a scan of every window.
+
+    A suspend opens a window and a resume closes the open one. A suspend while a window is open
+    leaves the earlier suspend unmatched: it covers nothing. A resume with no open window moves
+    the end of the last window closed to it. A window that is still open, because the log ended
+    (or has not yet) while suspended, covers every timestamp from its suspend on.
+
+    changed_from is the earliest timestamp whose coverage may have changed since it was last reset
+    to None, so a live page can tell whether the dashing it has already drawn still holds.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        # reach[i] is the latest end among windows 0..i, so overlapping windows need no merging
+        self._reach = []
+        self.open_start = None
+        self._last_closed = None
+        self.changed_from = None
+
+    def _changed(self, *timestamps):
+        timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+        if self.changed_from is not None:
+            timestamps.append(self.changed_from)
+        self.changed_from = min(timestamps) if timestamps else None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def suspend(self, timestamp):
+        # An earlier open window stops covering anything
+        self._changed(self.open_start, timestamp)
+        self.open_start = timestamp
+
+    def resume(self, timestamp):
+        """Close the open window at timestamp, or move the end of the last closed window to it."""
+        if self.open_start is not None:
+            self._changed(self.open_start if timestamp is None or timestamp < self.open_start else timestamp)
+            self._last_closed = (self.open_start, timestamp)
+            self.open_start = None
+            self._insert(*self._last_closed)
+        elif self._last_closed is not None:
+            start, end = self._last_closed
+            self._changed(min(end, timestamp) if None not in (end, timestamp) else start)
+            self._remove(start, end)
+            self._last_closed = (start, timestamp)
+            self._insert(start, timestamp)
+
+    def _insert(self, start, end):
+        # Windows are closed in time order unless the log clock went back, so this nearly always appends
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self._update_reach(i)
+
+    def _remove(self, start, end):
+        i = len(self.starts) - 1
+        if self.starts[i] != start or self.ends[i] != end:
+            i = bisect_left(self.starts, start)
+            while self.ends[i] != end:
+                i += 1
+        del self.starts[i], self.ends[i]
+        self._update_reach(i)
+
+    def _update_reach(self, i):
+        del self._reach[i:]
+        for end in self.ends[i:]:
+            self._reach.append(max(self._reach[-1], end) if self._reach else end)
+
+    def contains(self, timestamp):
+        if self.open_start is not None and timestamp >= self.open_start:
+            return True
+        i = bisect_right(self.starts, timestamp) - 1
+        return i >= 0 and timestamp < self._reach[i]
+
+
+def _epoch_ms(timestamp):
+    return to_epoch_ms(timestamp) if timestamp is not None else None
+
+
+class LiveProgress:
+    """How much of a TimelineBuilder a live page has been sent (see TimelineBuilder.live_update)."""
+    __slots__ = ("events", "segment_styles", "shapes", "info", "violations", "last_timestamp", "webgl")
+
+    def __init__(self, webgl=False):
+        self.events = 0
+        # The LIVE_LINE_STYLES index each segment sent was drawn with
+        self.segment_styles = []
+        self.shapes = 0
+        self.info = [0] * len(info_patterns)
+        self.violations = 0
+        self.last_timestamp = None
+        self.webgl = webgl
+
+
+class TimelineBuilder:
+    """
+    Collects the timeline points event by event and builds the figure from them.
+
+    `add_events` only decodes, reads the line text of and classifies the rows it is given, so a
+    followed log pays for its new events only. The trailing "end" point is replaced whenever more
+    events arrive. A resume can change the dashing of points added long before it, so which points
+    lie in a suspend/resume window (see SuspendWindows) is only looked up when the figure is
+    built. Y lanes are resolved then too, since the lane order changes as MACs are seen again.
+    The rows the parser flagged as breaking a flow rule are collected for the violations overlay.
+    """
+
+    def __init__(self):
+        self.connectivity_x_values = []
+        self.connectivity_lanes = []
+        self.connectivity_statuses = []
+        self.connectivity_colors = []
+        self.connectivity_hover_texts = []
+        self.connectivity_symbols = []
+        self.connectivity_rssi_texts = []
+        self.connectivity_line_numbers = []
+
+        self.info_x_values = [[] for _ in info_patterns]
+        self.info_lanes = [[] for _ in info_patterns]
+        self.info_hover_texts = [[] for _ in info_patterns]
+        self.info_line_numbers = [[] for _ in info_patterns]
+
+        self.violation_x_values = []
+        self.violation_lanes = []
+        self.violation_hover_texts = []
+
+        self.suspend_windows = SuspendWindows()
+
+        # Kept sorted, so the markers are drawn as one left-to-right line trace
+        self.vertical_line_timestamps = []
+
+        self.has_end_point = False
+
+    def _point_lists(self):
+        return (self.connectivity_x_values, self.connectivity_lanes, self.connectivity_statuses,
+                self.connectivity_colors, self.connectivity_hover_texts, self.connectivity_symbols,
+                self.connectivity_rssi_texts, self.connectivity_line_numbers)
+
+    def connectivity_dashed(self):
+        """Whether each point lies in a suspend/resume window, which dashes the segment it starts."""
+        contains = self.suspend_windows.contains
+        return [contains(timestamp) for timestamp in self.connectivity_x_values]
+
+    def add_events(self, event_store, start=0):
+        """Add the events of event_store from row start on (MAC-pattern hits are skipped)."""
+        if self.has_end_point:
+            for values in self._point_lists():
+                values.pop()
+            self.has_end_point = False
+
+        # Hover texts are the only place the line text is needed, so it is read back from the log here
+        events = list(event_store.iter_events(start=start))
+        hover_texts = event_store.texts([event.index for event in events])
+
+        for event, pattern in zip(events, hover_texts):
+            timestamp = event.timestamp
+            status = event.status
+
+            if event.flow_violations:
+                self.violation_x_values.append(timestamp)
+                self.violation_lanes.append(event.y)
+                self.violation_hover_texts.append("<br>".join(
+                    [pattern] + [f"Flow violation {rule.rule_id}: {rule.description}"
+                                 for rule in flow_rules if event.flow_violations & rule.bit]))
+
+            series = PATTERN_INFO_SERIES[event.pattern_id]
+            if series is not None:
+                self.info_x_values[series].append(timestamp)
+                self.info_lanes[series].append(event.y)
+                self.info_hover_texts[series].append(pattern)
+                self.info_line_numbers[series].append(event.line_number)
+                continue
+
+            color, symbol = PATTERN_STYLES[event.pattern_id]
+            if symbol == 'diamond':
+                insort(self.vertical_line_timestamps, timestamp)
+            # The parser only reads the RSSI of "Attempt_to_connect" lines
+            rssi_text = event.rssi or ""
+
+            self.connectivity_x_values.append(timestamp)
+            self.connectivity_lanes.append(event.y)
+            self.connectivity_statuses.append(status)
+            self.connectivity_hover_texts.append(pattern)
+            self.connectivity_rssi_texts.append(f"RSSI: {rssi_text}" if rssi_text else "")
+            self.connectivity_line_numbers.append(event.line_number)
+            self.connectivity_symbols.append(symbol)
+            self.connectivity_colors.append(color)
+
+            if status == "suspend":
+                self.suspend_windows.suspend(timestamp)
+            elif status == "resume":
+                self.suspend_windows.resume(timestamp)
+            elif status == "end":
+                self.has_end_point = True
+
+    def figure(self, mac_registry, title="WiFi Connectivity Timeline", batch_traces=True, level_of_detail=None):
+        """
+        Build the connectivity timeline figure from the points added so far.
+
+        With batch_traces, all connectivity segments are packed into one line trace per
+        color/dash style (segments separated by None) plus a single marker trace, and WebGL
+        traces are used above WEBGL_POINT_THRESHOLD points. Otherwise every pair of consecutive
+        events gets its own trace, which is only practical for small logs.
+
+        With level_of_detail the figure shows the coarsest level of a LevelOfDetail pyramid,
+        which is embedded in layout.meta for LOD_SCRIPT (see html_output.timeline_html) to redraw
+        the zoomed range from; it overrides batch_traces. None turns it on above
+        LOD_POINT_THRESHOLD connectivity and info points.
+        """
+        y_labels = mac_registry.y_labels()
+        y_positions = {label: i for i, label in enumerate(y_labels)}
+
+        connectivity_x_values = self.connectivity_x_values
+        connectivity_y_values = [y_positions[lane] for lane in self.connectivity_lanes]
+        connectivity_colors = self.connectivity_colors
+        connectivity_hover_texts = self.connectivity_hover_texts
+        connectivity_symbols = self.connectivity_symbols
+        connectivity_rssi_texts = self.connectivity_rssi_texts
+
+        info_symbols = [str(i) for i in range(len(info_patterns))]
+
+        fig = go.Figure()
+
+        point_count = len(connectivity_x_values)
+        connectivity_dashed = self.connectivity_dashed()
+        segment_line_styles = ['dash' if dashed else 'solid' for dashed in connectivity_dashed[:point_count - 1]]
+
+        info_y_values = [[y_positions[lane] for lane in lanes] for lanes in self.info_lanes]
+        info_x_values = self.info_x_values
+        info_hover_texts = self.info_hover_texts
+
+        if level_of_detail is None:
+            level_of_detail = point_count + sum(len(x_values) for x_values in info_x_values) > LOD_POINT_THRESHOLD
+        lod = None
+
+        if level_of_detail:
+            lod = LevelOfDetail(connectivity_x_values, connectivity_y_values, self.connectivity_statuses,
+                                connectivity_colors, connectivity_symbols, connectivity_dashed,
+                                connectivity_hover_texts, connectivity_rssi_texts, self.connectivity_line_numbers,
+                                [(info_x_values[i], info_y_values[i], info_hover_texts[i], self.info_line_numbers[i],
+                                  info_pattern["name"]) for i, info_pattern in enumerate(info_patterns)])
+            lines, marker = lod.level_points(lod.levels[0])
+
+            # The line traces are fixed per color/dash style, so every level redraws the same traces
+            for style, (color, dashed) in enumerate(lod.styles):
+                x_values, y_values = lines[style]
+                fig.add_trace(go.Scatter(
+                    x=plot_array(x_values),
+                    y=plot_array(y_values),
+                    mode='lines',
+                    line=dict(shape='hv', dash='dash' if dashed else 'solid', color=color),
+                    hoverinfo="skip",
+                    name='Connectivity Events',
+                    showlegend=False
+                ))
+
+            fig.add_trace(go.Scatter(
+                x=plot_array(marker["x"]),
+                y=plot_array(marker["y"]),
+                mode='markers+text',
+                marker=dict(color=marker["color"], symbol=marker["symbol"]),
+                hovertext=marker["hovertext"],
+                hoverinfo="text",
+                text=marker["text"],
+                textposition="top center",
+                name='Connectivity Events',
+                showlegend=False
+            ))
+            marker_trace = len(fig.data) - 1
+
+            # Thousands of shapes make every redraw slow, so the vertical lines are one line trace
+            timestamps = self.vertical_line_timestamps
+            if timestamps:
+                fig.add_trace(go.Scatter(
+                    x=plot_array([x for timestamp in timestamps for x in (timestamp, timestamp, None)]),
+                    y=plot_array([y for _ in timestamps for y in (0, -0.1, None)]),
+                    mode='lines',
+                    line=dict(color="black", width=2),
+                    hoverinfo="skip",
+                    showlegend=False
+                ))
+
+            level_info = lod.level_info(lod.levels[0])
+            info_x_values = [x_values for x_values, _, _ in level_info]
+            info_y_values = [y_values for _, y_values, _ in level_info]
+            info_hover_texts = [hover_texts for _, _, hover_texts in level_info]
+
+        elif batch_traces:
+            scatter = go.Scattergl if point_count > WEBGL_POINT_THRESHOLD else go.Scatter
+
+            # One line trace per color/dash style; the None after each segment keeps segments apart
+            segments_by_style = {}
+            for i, line_style in enumerate(segment_line_styles):
+                x_values, y_values = segments_by_style.setdefault((connectivity_colors[i], line_style), ([], []))
+                x_values += [connectivity_x_values[i], connectivity_x_values[i + 1], None]
+                y_values += [connectivity_y_values[i], connectivity_y_values[i + 1], None]
+
+            for (color, line_style), (x_values, y_values) in segments_by_style.items():
+                fig.add_trace(scatter(
+                    x=plot_array(x_values),
+                    y=plot_array(y_values),
+                    mode='lines',
+                    line=dict(shape='hv', dash=line_style, color=color),
+                    hoverinfo="skip",
+                    name='Connectivity Events',
+                    showlegend=False
+                ))
+
+            # The RSSI of an event is printed at the end of the segment it starts, as in the per-segment mode
+            fig.add_trace(scatter(
+                x=plot_array(connectivity_x_values),
+                y=plot_array(connectivity_y_values),
+                mode='markers+text',
+                marker=dict(color=connectivity_colors, symbol=connectivity_symbols),
+                hovertext=connectivity_hover_texts,
+                hoverinfo="text",
+                text=[""] + connectivity_rssi_texts[:-1],
+                textposition="top center",
+                name='Connectivity Events',
+                showlegend=False
+            ))
+
+        else:
+            for i in range(point_count):
+                if i < point_count - 1:
+                    line_style = segment_line_styles[i]
+
+                    fig.add_trace(go.Scatter(
+                        x=[connectivity_x_values[i], connectivity_x_values[i + 1]],
+                        y=[connectivity_y_values[i], connectivity_y_values[i + 1]],
+                        mode='lines+markers+text',
+                        marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
+                        line=dict(shape='hv', dash=line_style),
+                        hovertext=connectivity_hover_texts[i],
+                        hoverinfo="text",
+                        text=["", connectivity_rssi_texts[i]],
+                        textposition="top center",
+                        name='Connectivity Events',
+                        showlegend=False
+                    ))
+                else:
+                    fig.add_trace(go.Scatter(
+                        x=[connectivity_x_values[i]],
+                        y=[connectivity_y_values[i]],
+                        mode='markers+text',
+                        marker=dict(color=connectivity_colors[i], symbol=connectivity_symbols[i]),
+                        hovertext=connectivity_hover_texts[i],
+                        hoverinfo="text",
+                        text=["", connectivity_rssi_texts[i]],
+                        textposition="top center",
+                        name='Connectivity Events',
+                        showlegend=False
+                    ))
+
+        # Drawn over the connectivity points, and kept out of the info traces the buttons toggle
+        if self.violation_x_values:
+            fig.add_trace(go.Scatter(
+                x=plot_array(self.violation_x_values),
+                y=plot_array([y_positions[lane] for lane in self.violation_lanes]),
+                mode='markers',
+                marker=dict(color='red', symbol='x-open', size=14),
+                hovertext=self.violation_hover_texts,
+                hoverinfo="text",
+                name='Flow Violations',
+                showlegend=True
+            ))
+
+        connectivity_trace_count = len(fig.data)
+
+        for i, info_pattern in enumerate(info_patterns):
+            fig.add_trace(go.Scatter(
+                x=plot_array(info_x_values[i]),
+                y=plot_array(info_y_values[i]),
+                mode='markers',
+                marker=dict(color='black', symbol=info_symbols[i % len(info_symbols)]),
+                hovertext=info_hover_texts[i],
+                hoverinfo="text",
+                name=f'Info Events: {info_pattern["name"]}',
+                visible=True,
+                showlegend=True
+            ))
+
+        if lod is not None:
+            fig.update_layout(meta={"lod": lod.meta(list(range(len(lod.styles))), marker_trace,
+                                                    list(range(connectivity_trace_count, len(fig.data))))})
+        else:
+            # Set at once: every add_shape call copies all the shapes added before it
+            fig.update_layout(shapes=[dict(type="line", x0=timestamp, x1=timestamp, y0=0, y1=-0.1,
+                                           line=dict(color="black", width=2))
+                                      for timestamp in self.vertical_line_timestamps])
+
+        # Update the plot title based on flow validity
+        fig.update_layout(annotations=self._banner())
+        self._lay_out(fig, title, connectivity_trace_count,
+                      dict(tickvals=list(y_positions.values()), ticktext=[mac_registry.label(mac) for mac in y_labels]))
+        return fig
+
+    def live_figure(self, title="WiFi Connectivity Timeline", webgl=False):
+        """
+        The frame of a live page: the traces of `figure`, without points and in a fixed order that
+        `live_update` fills in. There is a line trace per LIVE_LINE_STYLES entry, then the event
+        markers, the segment to the "end" point (the only part that is ever redrawn), the flow
+        violations and the info traces. The y axis lists the lanes as categories, so reordering
+        them, which happens as MACs are seen again, only changes the layout.
+        """
+        scatter = go.Scattergl if webgl else go.Scatter
+        fig = go.Figure()
+        for color, dash in LIVE_LINE_STYLES:
+            fig.add_trace(scatter(x=[], y=[], mode='lines', line=dict(shape='hv', dash=dash, color=color),
+                                  hoverinfo="skip", name='Connectivity Events', showlegend=False))
+        fig.add_trace(scatter(x=[], y=[], mode='markers+text', marker=dict(color=[], symbol=[]), hovertext=[],
+                              hoverinfo="text", text=[], textposition="top center", name='Connectivity Events',
+                              showlegend=False))
+        fig.add_trace(go.Scatter(x=[], y=[], mode='lines+markers+text', line=dict(shape='hv'),
+                                 marker=dict(color=[], symbol=[]), hovertext=[], hoverinfo="text", text=[],
+                                 textposition="top center", name='Connectivity Events', showlegend=False))
+        fig.add_trace(scatter(x=[], y=[], mode='markers', marker=dict(color='red', symbol='x-open', size=14),
+                              hovertext=[], hoverinfo="text", name='Flow Violations', showlegend=True))
+        connectivity_trace_count = len(fig.data)
+
+        info_symbols = [str(i) for i in range(len(info_patterns))]
+        for i, info_pattern in enumerate(info_patterns):
+            fig.add_trace(scatter(x=[], y=[], mode='markers', marker=dict(color='black', symbol=info_symbols[i]),
+                                  hovertext=[], hoverinfo="text", name=f'Info Events: {info_pattern["name"]}',
+                                  visible=True, showlegend=True))
+        self._lay_out(fig, title, connectivity_trace_count, dict(type='category', categoryorder='array'))
+        return fig
+
+    def live_update(self, mac_registry, progress):
+        """
+        What a page built by `live_figure` needs to catch up from progress (a LiveProgress, which
+        is advanced): the new points of every trace, the new vertical marker shapes, the segment to
+        the "end" point and the lane order, as JSON-ready lists with timestamps in epoch ms. Takes
+        time in the number of new points only, apart from the lane order and the segments a
+        suspend/resume re-dashed (see SuspendWindows.changed_from), which "truncate" cuts the line
+        traces back to and that are sent again.
+        """
+        x_values = self.connectivity_x_values
+        lanes = self.connectivity_lanes
+        colors = self.connectivity_colors
+        rssi_texts = self.connectivity_rssi_texts
+        contains = self.suspend_windows.contains
+        event_count = len(x_values) - self.has_end_point
+        start = progress.events
+        # The first new segment starts at the last event sent
+        first = len(progress.segment_styles)
+        truncate = None
+        changed_from = self.suspend_windows.changed_from
+        self.suspend_windows.changed_from = None
+        if changed_from is not None and progress.last_timestamp is not None and changed_from <= progress.last_timestamp:
+            # A suspend/resume changed the dashing of segments already sent: the line traces are cut
+            # back to the first segment it can reach and the segments from there on are sent again
+            first = next((i for i, timestamp in enumerate(x_values[:first])
+                          if timestamp is not None and timestamp >= changed_from), first)
+            del progress.segment_styles[first:]
+            truncate = [3 * count for count in np.bincount(np.array(progress.segment_styles, dtype=np.int64),
+                                                            minlength=len(LIVE_LINE_STYLES)).tolist()]
+        epoch_ms = [_epoch_ms(timestamp) for timestamp in x_values[first:]]
+
+        lines = [([], []) for _ in LIVE_LINE_STYLES]
+        for i in range(first, event_count - 1):
+            style = LIVE_LINE_INDEX[colors[i], 'dash' if contains(x_values[i]) else 'solid']
+            progress.segment_styles.append(style)
+            x, y = lines[style]
+            x += [epoch_ms[i - first], epoch_ms[i + 1 - first], None]
+            y += [lanes[i], lanes[i + 1], None]
+
+        # The RSSI of an event is printed at the end of the segment it starts
+        markers = {"x": epoch_ms[start - first:event_count - first], "y": lanes[start:event_count],
+                   "marker.color": colors[start:event_count],
+                   "marker.symbol": self.connectivity_symbols[start:event_count],
+                   "hovertext": self.connectivity_hover_texts[start:event_count],
+                   "text": [rssi_texts[i - 1] if i else "" for i in range(start, event_count)]}
+
+        tail = {"x": [], "y": [], "marker.color": [], "marker.symbol": [], "hovertext": [], "text": []}
+        if self.has_end_point and event_count:
+            ends = [event_count - 1, event_count]
+            tail = {"x": [epoch_ms[i - first] for i in ends], "y": [lanes[i] for i in ends],
+                    "line.color": colors[ends[0]], "line.dash": 'dash' if contains(x_values[ends[0]]) else 'solid',
+                    "marker.color": [colors[i] for i in ends],
+                    "marker.symbol": [self.connectivity_symbols[i] for i in ends],
+                    "hovertext": [self.connectivity_hover_texts[i] for i in ends], "text": ["", rssi_texts[ends[0]]]}
+
+        # On a category axis, shapes are placed by lane index: 0 is the "disconnected" lane
+        shapes = [dict(type="line", x0=epoch_ms[i - first], x1=epoch_ms[i - first], y0=0, y1=-0.1,
+                       line=dict(color="black", width=2))
+                  for i in range(start, event_count) if self.connectivity_symbols[i] == 'diamond']
+        violations = {"x": [_epoch_ms(x) for x in self.violation_x_values[progress.violations:]],
+                      "y": self.violation_lanes[progress.violations:],
+                      "hovertext": self.violation_hover_texts[progress.violations:]}
+        info = [{"x": [_epoch_ms(x) for x in self.info_x_values[i][sent:]], "y": self.info_lanes[i][sent:],
+                 "hovertext": self.info_hover_texts[i][sent:]}
+                for i, sent in enumerate(progress.info)]
+
+        y_labels = mac_registry.y_labels()
+        layout = {"yaxis.categoryarray": y_labels, "yaxis.tickvals": y_labels,
+                  "yaxis.ticktext": [mac_registry.label(mac) for mac in y_labels], "annotations": self._banner()}
+        layout.update((f"shapes[{progress.shapes + i}]", shape) for i, shape in enumerate(shapes))
+
+        for timestamp in x_values[start:event_count]:
+            if timestamp is not None and (progress.last_timestamp is None or timestamp > progress.last_timestamp):
+                progress.last_timestamp = timestamp
+        progress.events = event_count
+        progress.shapes += len(shapes)
+        progress.violations = len(self.violation_x_values)
+        progress.info = [len(values) for values in self.info_x_values]
+        return {"truncate": truncate, "lines": [{"x": x, "y": y} for x, y in lines], "markers": markers, "tail": tail,
+                "violations": violations, "info": info, "layout": layout}
+
+    def _banner(self):
+        if not self.violation_x_values:
+            return []
+        return [dict(
+            text=f"***Please note,possible log corruption!*** ({len(self.violation_x_values)} flow violations)",
+            xref="paper", yref="paper",
+            x=0.5, y=1.1,  # Positioning the text above the main title
+            showarrow=False,
+            font=dict(size=16, color="red")
+        )]
+
+    def _lay_out(self, fig, title, connectivity_trace_count, yaxis):
+        fig.update_layout(
+            title=title,
+            xaxis_title="Time",
+            yaxis_title="Connectivity State",
+            yaxis=yaxis,
+            legend_title_text="Click an event to toggle it off/on",
+            updatemenus=[
+                {
+                    'type': 'buttons',
+                    'buttons': [
+                        {
+                            'label': 'Show All Info Events',
+                            'method': 'update',
+                            'args': [
+                                {'visible': [True] * connectivity_trace_count + [True] * len(info_patterns)},
+                            ]
+                        },
+                        {
+                            'label': 'Hide All Info Events',
+                            'method': 'update',
+                            'args': [
+                                {'visible': [True] * connectivity_trace_count + [False] * len(info_patterns)},
+                            ]
+                        }
+                    ],
+                    'direction': 'down',
+                    'x': 1.1,
+                    'y': 1.1,
+                    'xanchor': 'left',
+                    'yanchor': 'top'
+                }
+            ],
+            legend=dict(
+                x=1.05,
+                y=0.95,
+                traceorder='normal',
+                itemclick='toggle',
+                itemdoubleclick='toggle'
+            ),
+            dragmode='zoom',
+        )
+
+        fig.update_layout(
+            xaxis=dict(
+                rangeselector=dict(
+                    buttons=list([
+                        dict(count=1, label="1m", step="minute", stepmode="backward"),
+                        dict(count=5, label="5m", step="minute", stepmode="backward"),
+                        dict(count=1, label="1h", step="hour", stepmode="backward"),
+                        dict(step="all")
+                    ])
+                ),
+                rangeslider=dict(visible=True),
+                type="date"
+            )
+        )
+
+
+def create_timeline(event_store, mac_registry, last_log_timestamp, output_filename, title="WiFi Connectivity Timeline",
+                    batch_traces=True, auto_open=True, full_html=True, plotlyjs='directory', compress=False):
+    """
+    Build the connectivity timeline figure and write it to output_filename, once.
+    See TimelineBuilder.figure for batch_traces and html_output.timeline_html for plotlyjs and
+    compress. Headless callers pass auto_open=False to write the page without a browser.
+    """
+    with profile_stage("build_timeline"):
+        builder = TimelineBuilder()
+        builder.add_events(event_store)
+        fig = builder.figure(mac_registry, title, batch_traces)
+
+    # Use the output_filename for the HTML file
+    with profile_stage("write_html"):
+        write_timeline_html(fig, output_filename, auto_open, plotlyjs, full_html, compress=compress)
+
+    return fig
+
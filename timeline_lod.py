@@ -0,0 +1,425 @@
+import numpy as np
+
+# Above this many connectivity and info points the timeline is drawn from a level-of-detail pyramid
+LOD_POINT_THRESHOLD = 50000
+# Width in pixels the levels are made for: a level is drawn while its bins are at most a pixel wide
+LOD_PIXELS = 2000
+# Bin width ratio between two consecutive levels
+LOD_LEVEL_RATIO = 4
+# A level keeping this fraction of the points is dropped for the full data, which costs no indexes
+LOD_FULL_FRACTION = 0.9
+# State changes that are never collapsed into their neighbours
+KEPT_STATUSES = frozenset(["disconnected", "connection_failed", "connect_failure", "Deauth by Driver",
+                           "Deauth from Peer", "end"])
+
+# Redraws the timeline from the pyramid in layout.meta.lod whenever the x-axis range changes
+LOD_SCRIPT = """
+(function () {
+var plot = document.getElementById('{plot_id}');
+
+// Numeric arrays are embedded as base64 typed array specs
+var TYPED_ARRAYS = {f8: Float64Array, f4: Float32Array, i4: Int32Array, i2: Int16Array, i1: Int8Array,
+                    u4: Uint32Array, u2: Uint16Array, u1: Uint8Array};
+function decode(value) {
+    if (value === null || typeof value !== 'object' || ArrayBuffer.isView(value)) {
+        return value;
+    }
+    if (value.bdata !== undefined) {
+        var binary = atob(value.bdata);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return new TYPED_ARRAYS[value.dtype](bytes.buffer);
+    }
+    for (var key in value) {
+        value[key] = decode(value[key]);
+    }
+    return value;
+}
+
+var lod = decode(plot.layout.meta.lod);
+var points = lod.points;
+
+function lookup(positions) {
+    var found = {};
+    for (var k = 0; k < positions.length; k++) {
+        found[positions[k]] = k;
+    }
+    return found;
+}
+
+// Only the markers the page starts with, the coarsest level, come with their line text: it is taken
+// from them before the first redraw. The other points get theirs from the typed columns, as
+// LevelOfDetail.point_text words it.
+function startTexts(trace, order, collapsed, unwrap) {
+    var hovertext = plot.data[trace].hovertext, collapsedAt = lookup(collapsed.at), texts = {};
+    for (var j = 0; j < hovertext.length; j++) {
+        var k = collapsedAt[j];
+        texts[order ? order[j] : j] = k !== undefined ? unwrap(hovertext[j], k) : hovertext[j];
+    }
+    return texts;
+}
+var pointTexts = startTexts(lod.marker_trace, lod.levels[0].points, lod.levels[0].collapsed, function (text) {
+    return text.slice(0, text.lastIndexOf('<br><i>+'));
+});
+var eventTexts = lod.info.map(function (events, p) {
+    var level = lod.levels[0].info[p];
+    return startTexts(lod.info_traces[p], level[0], level[1], function (text, k) {
+        return text.slice((level[1].count[k] + ' x ' + events.name + '<br>').length);
+    });
+});
+
+function builtText(line, x, name) {
+    return 'Line ' + line + ': ' + new Date(x).toISOString().slice(0, 23).replace('T', ' ') + ' ' + name;
+}
+
+function pointText(i) {
+    var text = pointTexts[i];
+    return text !== undefined ? text : builtText(points.line[i], points.x[i], lod.statuses[points.status[i]]);
+}
+
+function eventText(p, e) {
+    var events = lod.info[p], text = eventTexts[p][e];
+    return text !== undefined ? text : builtText(events.line[e], events.x[e], events.name);
+}
+
+function toMs(value) {
+    if (typeof value === 'number') {
+        return value;
+    }
+    var parts = String(value).split(/[ T]/);
+    var date = parts[0].split('-');
+    var time = (parts[1] || '0').split(':');
+    return Date.UTC(+date[0], +date[1] - 1, +(date[2] || 1), +time[0], +(time[1] || 0), 0)
+        + parseFloat(time[2] || '0') * 1000;
+}
+
+function pickLevel(span) {
+    for (var i = 0; i < lod.levels.length; i++) {
+        if (lod.levels[i].bin <= span / lod.pixels) {
+            return lod.levels[i];
+        }
+    }
+    return lod.levels[lod.levels.length - 1];
+}
+
+function collapsedText(i, collapsed, k) {
+    var states = [], total = 0;
+    for (var s = collapsed.start[k]; s < collapsed.start[k + 1]; s++) {
+        states.push([collapsed.count[s], lod.statuses[collapsed.state[s]]]);
+        total += collapsed.count[s];
+    }
+    states.sort(function (a, b) { return b[0] - a[0]; });
+    return pointText(i) + '<br><i>+' + total + ' collapsed before: '
+        + states.map(function (state) { return state[0] + ' ' + state[1]; }).join(', ') + '</i>';
+}
+
+function render(range) {
+    var level = range ? pickLevel(range[1] - range[0]) : lod.levels[0];
+    var low = -Infinity, high = Infinity;
+    if (range) {
+        // Half a screen on each side, so a short pan does not show an empty edge
+        var margin = (range[1] - range[0]) / 2;
+        low = range[0] - margin;
+        high = range[1] + margin;
+    }
+
+    var order = level.points;
+    var count = order ? order.length : points.x.length;
+    var collapsed = level.collapsed;
+    var collapsedAt = lookup(collapsed.at);
+    function at(j) { return order ? order[j] : j; }
+    function inside(j) {
+        if (j < 0 || j >= count) { return false; }
+        var x = points.x[at(j)];
+        return x >= low && x <= high;
+    }
+
+    var lines = lod.styles.map(function () { return {x: [], y: []}; });
+    var marker = {x: [], y: [], hovertext: [], text: [], color: [], symbol: []};
+    var previous = -2;
+    for (var j = 0; j < count; j++) {
+        if (!(inside(j) || inside(j - 1) || inside(j + 1))) {
+            continue;
+        }
+        var i = at(j);
+        if (previous === j - 1) {
+            var h = at(previous);
+            var line = lines[points.style[h]];
+            line.x.push(points.x[h], points.x[i], null);
+            line.y.push(points.y[h], points.y[i], null);
+        }
+        marker.x.push(points.x[i]);
+        marker.y.push(points.y[i]);
+        var k = collapsedAt[j];
+        marker.hovertext.push(k !== undefined ? collapsedText(i, collapsed, k) : pointText(i));
+        marker.text.push(j > 0 ? points.rssi[at(j - 1)] : '');
+        marker.color.push(lod.colors[points.color[i]]);
+        marker.symbol.push(lod.symbols[points.symbol[i]]);
+        previous = j;
+    }
+    Plotly.restyle(plot, {x: lines.map(function (l) { return l.x; }), y: lines.map(function (l) { return l.y; })},
+                   lod.line_traces);
+    Plotly.restyle(plot, {x: [marker.x], y: [marker.y], hovertext: [marker.hovertext], text: [marker.text],
+                          'marker.color': [marker.color], 'marker.symbol': [marker.symbol]}, [lod.marker_trace]);
+
+    var info = {x: [], y: [], hovertext: []};
+    for (var p = 0; p < lod.info.length; p++) {
+        var events = lod.info[p];
+        var infoOrder = level.info[p][0];
+        var infoCollapsed = level.info[p][1];
+        var infoCollapsedAt = lookup(infoCollapsed.at);
+        var infoCount = infoOrder ? infoOrder.length : events.x.length;
+        var x = [], y = [], hovertext = [];
+        for (var n = 0; n < infoCount; n++) {
+            var e = infoOrder ? infoOrder[n] : n;
+            if (events.x[e] >= low && events.x[e] <= high) {
+                x.push(events.x[e]);
+                y.push(events.y[e]);
+                var c = infoCollapsedAt[n];
+                var text = eventText(p, e);
+                hovertext.push(c !== undefined ? infoCollapsed.count[c] + ' x ' + events.name + '<br>' + text : text);
+            }
+        }
+        info.x.push(x);
+        info.y.push(y);
+        info.hovertext.push(hovertext);
+    }
+    if (lod.info_traces.length) {
+        Plotly.restyle(plot, info, lod.info_traces);
+    }
+}
+
+plot.on('plotly_relayout', function (update) {
+    if (update['xaxis.range[0]'] !== undefined) {
+        render([toMs(update['xaxis.range[0]']), toMs(update['xaxis.range[1]'])]);
+    } else if (update['xaxis.range'] !== undefined) {
+        render([toMs(update['xaxis.range'][0]), toMs(update['xaxis.range'][1])]);
+    } else if (update['xaxis.autorange']) {
+        render(null);
+    }
+});
+})();
+"""
+
+
+def epoch_ms(timestamps):
+    return np.array(timestamps, dtype='datetime64[ms]').astype(np.int64)
+
+
+def _palette(values):
+    """(distinct values in first-seen order, index of each value in them)"""
+    palette = list(dict.fromkeys(values))
+    positions = {value: i for i, value in enumerate(palette)}
+    return palette, np.array([positions[value] for value in values], dtype=np.int32)
+
+
+def _no_collapsed_points():
+    empty = np.empty(0, dtype=np.int64)
+    return {"at": empty, "start": np.zeros(1, dtype=np.int64), "state": empty, "count": empty}
+
+
+def _no_collapsed_events():
+    empty = np.empty(0, dtype=np.int64)
+    return {"at": empty, "count": empty}
+
+
+class LevelOfDetail:
+    """
+    Multi-resolution pyramid of the timeline points, built once and embedded in the page.
+
+    Level k puts the points into bins of span / (LOD_PIXELS * LOD_LEVEL_RATIO**k) and keeps, of
+    every run of consecutive connectivity points falling into one bin, only the first and the
+    last, plus every KEPT_STATUSES point; the kept point after a gap gets the number and the
+    states of the collapsed points in its hover text. Info events are binned per event type
+    and lane, one marker per bin, with the count in its hover text. Levels get finer until one
+    would keep LOD_FULL_FRACTION of the points, and the last level is the full data.
+
+    Levels only hold indexes into the full-resolution arrays and the counts of what each kept
+    point stands for, so the pyramid adds little to the page. LOD_SCRIPT draws the coarsest level whose bins fit
+    in a pixel of the visible range, for the visible range only, so zooming in brings the
+    full detail back without reparsing. Only the markers of the coarsest level, which the figure
+    starts with, carry their line text into the page; a finer point's hover text is built from its
+    line number, timestamp and status (see point_text), as the line texts of every point would
+    dwarf the rest of the page.
+    """
+
+    def __init__(self, x_values, y_values, statuses, colors, symbols, dashed, hover_texts, rssi_texts, line_numbers,
+                 info, pixels=LOD_PIXELS):
+        """info: one (x_values, y_values, hover_texts, line_numbers, name) tuple per info event type."""
+        self.pixels = pixels
+        self.x = epoch_ms(x_values)
+        self.y = np.asarray(y_values, dtype=np.int32)
+        self.statuses, self.status_codes = _palette(statuses)
+        self.colors, self.color_codes = _palette(colors)
+        self.symbols, self.symbol_codes = _palette(symbols)
+        self.dashed = np.asarray(dashed, dtype=bool)
+        # One line trace per color and dash style, in a fixed order, so every level maps onto the same traces
+        self.styles = [(color, dash) for color in self.colors for dash in (False, True)]
+        self.style_codes = self.color_codes * 2 + self.dashed
+        self.hover_texts = list(hover_texts)
+        self.rssi_texts = list(rssi_texts)
+        self.line_numbers = np.asarray(line_numbers, dtype=np.int32)
+        self.info = [(epoch_ms(x), np.asarray(y, dtype=np.int32), list(hover), np.asarray(lines, dtype=np.int32), name)
+                     for x, y, hover, lines, name in info]
+
+        all_x = np.concatenate([self.x] + [x for x, _, _, _, _ in self.info])
+        span = int(all_x.max() - all_x.min()) if len(all_x) else 0
+        self.levels = []
+        bin_ms = span / pixels
+        point_count = len(self.x) + sum(len(x) for x, _, _, _, _ in self.info)
+        while bin_ms >= 1:
+            level = self._level(int(bin_ms))
+            if len(level["points"]) + sum(len(order) for order, _ in level["info"]) >= LOD_FULL_FRACTION * point_count:
+                break
+            self.levels.append(level)
+            bin_ms /= LOD_LEVEL_RATIO
+        self.levels.append({"bin": 0, "points": None, "collapsed": _no_collapsed_points(),
+                            "info": [(None, _no_collapsed_events()) for _ in self.info]})
+
+        # Which points and info events of the full data are on the coarsest level
+        self.point_has_text = self._on_coarsest(self.levels[0]["points"], len(self.x))
+        self.event_has_text = [self._on_coarsest(order, len(x))
+                               for (order, _), (x, _, _, _, _) in zip(self.levels[0]["info"], self.info)]
+
+    @staticmethod
+    def _on_coarsest(order, count):
+        found = np.zeros(count, dtype=bool)
+        found[order if order is not None else slice(None)] = True
+        return found
+
+    def _level(self, bin_ms):
+        bins = self.x // bin_ms
+        point_count = len(bins)
+        keep = np.ones(point_count, dtype=bool)
+        if point_count > 2:
+            inside_run = (bins[1:-1] == bins[:-2]) & (bins[1:-1] == bins[2:])
+            important = np.isin(self.status_codes[1:-1],
+                                [i for i, status in enumerate(self.statuses) if status in KEPT_STATUSES])
+            keep[1:-1] = ~inside_run | important
+        kept = np.flatnonzero(keep)
+
+        # Per gap, how many points of each state were collapsed into the kept point after it. Flat
+        # arrays rather than a list per point, as there are many: the kept point at level position
+        # at[k] stands for count[start[k]:start[k + 1]] points of state[start[k]:start[k + 1]].
+        dropped = np.flatnonzero(~keep)
+        collapsed = _no_collapsed_points()
+        if len(dropped):
+            gaps = np.searchsorted(kept, dropped)
+            state_count = len(self.statuses)
+            pairs, counts = np.unique(gaps * state_count + self.status_codes[dropped], return_counts=True)
+            at, start = np.unique(pairs // state_count, return_index=True)
+            collapsed = {"at": at, "start": np.append(start, len(pairs)), "state": pairs % state_count,
+                         "count": counts}
+
+        info = []
+        for x, y, _, _, _ in self.info:
+            if not len(x):
+                info.append((np.empty(0, dtype=np.int64), _no_collapsed_events()))
+                continue
+            keys = np.stack([y.astype(np.int64), x // bin_ms], axis=1)
+            _, first, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+            order = np.argsort(first)
+            first, counts = first[order], counts[order]
+            # The kept event at level position at[k] stands for count[k] events of its bin
+            binned = counts > 1
+            info.append((first, {"at": np.flatnonzero(binned), "count": counts[binned]}))
+
+        return {"bin": bin_ms, "points": kept, "collapsed": collapsed, "info": info}
+
+    def _built_text(self, line_number, x, name):
+        timestamp = str(np.datetime64(int(x), 'ms')).replace('T', ' ')
+        return f"Line {line_number}: {timestamp} {name}"
+
+    def point_text(self, i):
+        """Hover text of connectivity point i as LOD_SCRIPT has it: its line text on the coarsest level only."""
+        if self.point_has_text[i]:
+            return self.hover_texts[i]
+        return self._built_text(self.line_numbers[i], self.x[i], self.statuses[self.status_codes[i]])
+
+    def event_text(self, series, e):
+        """Hover text of event e of an info event type, like point_text."""
+        x, _, hover_texts, line_numbers, name = self.info[series]
+        if self.event_has_text[series][e]:
+            return hover_texts[e]
+        return self._built_text(line_numbers[e], x[e], name)
+
+    def collapsed_text(self, i, collapsed, k):
+        """Hover text of point i standing for the k-th collapsed run of a level, as LOD_SCRIPT words it."""
+        start, end = collapsed["start"][k], collapsed["start"][k + 1]
+        states = sorted(zip(collapsed["count"][start:end].tolist(), collapsed["state"][start:end].tolist()),
+                        key=lambda state: -state[0])
+        detail = ", ".join(f"{count} {self.statuses[state]}" for count, state in states)
+        total = sum(count for count, _ in states)
+        return f"{self.point_text(i)}<br><i>+{total} collapsed before: {detail}</i>"
+
+    def level_points(self, level):
+        """
+        The connectivity traces of a level over the whole time range, like LOD_SCRIPT draws them:
+        ({style: (x_values, y_values)}, marker dict of x/y/hovertext/text/color/symbol lists).
+        """
+        order = level["points"] if level["points"] is not None else range(len(self.x))
+        collapsed = level["collapsed"]
+        collapsed_at = {position: k for k, position in enumerate(collapsed["at"].tolist())}
+        x_values, y_values = self.x.tolist(), self.y.tolist()
+        lines = {style: ([], []) for style in range(len(self.styles))}
+        marker = {"x": [], "y": [], "hovertext": [], "text": [], "color": [], "symbol": []}
+        previous = None
+        for j, i in enumerate(order):
+            if previous is not None:
+                line_x, line_y = lines[int(self.style_codes[previous])]
+                line_x += [x_values[previous], x_values[i], None]
+                line_y += [y_values[previous], y_values[i], None]
+            marker["x"].append(x_values[i])
+            marker["y"].append(y_values[i])
+            k = collapsed_at.get(j)
+            marker["hovertext"].append(self.collapsed_text(i, collapsed, k) if k is not None else self.point_text(i))
+            marker["text"].append(self.rssi_texts[previous] if previous is not None else "")
+            marker["color"].append(self.colors[self.color_codes[i]])
+            marker["symbol"].append(self.symbols[self.symbol_codes[i]])
+            previous = i
+        return lines, marker
+
+    def level_info(self, level):
+        """The info traces of a level, one (x_values, y_values, hover_texts) per info event type."""
+        traces = []
+        for series, ((order, collapsed), (x, y, _, _, name)) in enumerate(zip(level["info"], self.info)):
+            order = order if order is not None else range(len(x))
+            collapsed = dict(zip(collapsed["at"].tolist(), collapsed["count"].tolist()))
+            x_values, y_values = x.tolist(), y.tolist()
+            hover_texts = [self.event_text(series, i) for i in order]
+            traces.append(([x_values[i] for i in order], [y_values[i] for i in order],
+                           [f"{collapsed[n]} x {name}<br>{text}" if n in collapsed else text
+                            for n, text in enumerate(hover_texts)]))
+        return traces
+
+    def meta(self, line_traces, marker_trace, info_traces):
+        """
+        The pyramid as layout.meta.lod for LOD_SCRIPT, given the indexes of the traces it redraws.
+        Its numeric arrays stay numpy arrays, which plotly embeds as typed arrays.
+        The line texts are left out: LOD_SCRIPT reads those of the coarsest level from the traces.
+        """
+        return {
+            "pixels": self.pixels,
+            "colors": self.colors,
+            "symbols": self.symbols,
+            "statuses": self.statuses,
+            "styles": [[color, 'dash' if dashed else 'solid'] for color, dashed in self.styles],
+            "points": {
+                "x": self.x.astype(np.float64),
+                "y": self.y,
+                "style": self.style_codes,
+                "color": self.color_codes,
+                "symbol": self.symbol_codes,
+                "status": self.status_codes,
+                "line": self.line_numbers,
+                "rssi": self.rssi_texts,
+            },
+            "info": [{"x": x.astype(np.float64), "y": y, "line": line_numbers, "name": name}
+                     for x, y, _, line_numbers, name in self.info],
+            "levels": self.levels,
+            "line_traces": line_traces,
+            "marker_trace": marker_trace,
+            "info_traces": info_traces,
+        }
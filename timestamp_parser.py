@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+MS_PER_DAY = 86400000
+ONE_MS = timedelta(milliseconds=1)
+
+# Formats accepted for a time window bound typed by the user
+TIME_BOUND_FORMATS = ("%m/%d/%Y-%H:%M:%S.%f", "%m/%d/%Y-%H:%M:%S", "%m/%d/%y-%H:%M:%S.%f", "%m/%d/%y-%H:%M:%S",
+                      "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S")
+# Times of day, with the precision they are given at
+TIME_OF_DAY_FORMATS = (("%H:%M:%S.%f", ONE_MS), ("%H:%M:%S", timedelta(seconds=1)), ("%H:%M", timedelta(minutes=1)))
+
+
+class TimestampParser:
+    """
+    Parser for the fixed driver-log layout MM/DD/YYYY-HH:MM:SS.mmm, also accepting the
+    two-digit-year form MM/DD/YY-HH:MM:SS.mmm that the patterns allow.
+
+    Fields are read from fixed slice positions instead of going through strptime, and the
+    date part is cached since consecutive lines almost always share it. Two-digit years
+    follow strptime's %y convention (69-99 -> 1969-1999, 00-68 -> 2000-2068).
+    """
+    __slots__ = ("_date_text", "_date", "_date_epoch_ms", "_last_text", "_last_timestamp")
+
+    def __init__(self):
+        self._date_text = None
+        self._date = None
+        self._date_epoch_ms = None
+        self._last_text = None
+        self._last_timestamp = None
+
+    def _split(self, text):
+        # "MM/DD/YYYY" or "MM/DD/YY", then "-HH:MM:SS.mmm" (13 characters)
+        date_length = len(text) - 13
+        if date_length not in (8, 10) or text[date_length] != '-':
+            raise ValueError(f"time data {text!r} does not match format 'MM/DD/YYYY-HH:MM:SS.mmm'")
+        date_text = text[:date_length]
+        if date_text != self._date_text:
+            year = int(date_text[6:])
+            if date_length == 8:
+                year += 1900 if year >= 69 else 2000
+            date = datetime(year, int(date_text[:2]), int(date_text[3:5]))
+            self._date_text = date_text
+            self._date = date
+            self._date_epoch_ms = (date - EPOCH).days * MS_PER_DAY
+        return date_length + 1
+
+    def parse(self, text):
+        """Return the timestamp as a naive datetime, like strptime(text, "%m/%d/%Y-%H:%M:%S.%f")."""
+        if text == self._last_text:
+            return self._last_timestamp
+        t = self._split(text)
+        date = self._date
+        timestamp = datetime(date.year, date.month, date.day,
+                             int(text[t:t + 2]), int(text[t + 3:t + 5]), int(text[t + 6:t + 8]),
+                             int(text[t + 9:t + 12]) * 1000)
+        self._last_text = text
+        self._last_timestamp = timestamp
+        return timestamp
+
+    def parse_epoch_ms(self, text):
+        """Return the timestamp as integer milliseconds since the epoch (naive, no timezone shift)."""
+        t = self._split(text)
+        hours, minutes, seconds = int(text[t:t + 2]), int(text[t + 3:t + 5]), int(text[t + 6:t + 8])
+        if hours > 23 or minutes > 59 or seconds > 59:
+            raise ValueError(f"time data {text!r} is out of range")
+        return self._date_epoch_ms + ((hours * 60 + minutes) * 60 + seconds) * 1000 + int(text[t + 9:t + 12])
+
+
+def to_epoch_ms(timestamp):
+    return (timestamp - EPOCH) // ONE_MS
+
+
+def parse_time_bound(text, after=None):
+    """
+    Parse a time window bound: a full timestamp, in the log's MM/DD/YYYY-HH:MM:SS.mmm layout or
+    ISO, or a bare time of day such as "14:03:12" as bug reports give it. A time of day is taken
+    on its first occurrence at or after `after` (e.g. the first timestamp of the log), so a log
+    that starts before midnight still finds "00:30" on the next day. Raises ValueError.
+    """
+    text = text.strip()
+    for time_format in TIME_BOUND_FORMATS:
+        try:
+            return datetime.strptime(text, time_format)
+        except ValueError:
+            continue
+    for time_format, precision in TIME_OF_DAY_FORMATS:
+        try:
+            time_of_day = datetime.strptime(text, time_format).time()
+        except ValueError:
+            continue
+        if after is None:
+            raise ValueError(f"{text!r} has no date and there is no timestamp to take it from")
+        bound = datetime.combine(after.date(), time_of_day)
+        # Compared at the precision it was typed with: "23:59:00" still matches a log starting at 23:59:00.068
+        if bound + precision <= after:
+            bound += timedelta(days=1)
+        return bound
+    raise ValueError(f"time data {text!r} is not a timestamp or a time of day")